@@ -2,16 +2,64 @@
 from django_fsm_log.admin import StateLogInline
 from fsm_admin.mixins import FSMTransitionMixin
 from reversion.admin import VersionAdmin
+from reversion.models import Version
 
 # Django
 from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.http import JsonResponse
+from django.urls import path
 
 # Local
 from .models import Group
 from .models import Person
+from .versioning import FORMAT
+from .versioning import get_changes
+
+
+class DiffVersionAdmin(VersionAdmin):
+    """Store versions as field-level diffs and expose them as JSON."""
+
+    def reversion_register(self, model, **options):
+        options['format'] = FORMAT
+        super().reversion_register(model, **options)
+
+    def get_urls(self):
+        opts = self.model._meta
+        urls = [
+            path(
+                '<path:object_id>/changes/',
+                self.admin_site.admin_view(self.changes_view),
+                name='{0}_{1}_changes'.format(opts.app_label, opts.model_name),
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def changes_view(self, request, object_id):
+        if not self.has_view_or_change_permission(request):
+            raise PermissionDenied
+        versions = Version.objects.get_for_object_reference(
+            self.model,
+            object_id,
+        ).select_related(
+            'revision',
+            'revision__user',
+        ).order_by('pk')
+        changes = [
+            {
+                'version': version.pk,
+                'date': version.revision.date_created,
+                'user': str(version.revision.user or ''),
+                'comment': version.revision.get_comment(),
+                'changes': fields,
+            } for version, fields in get_changes(versions.iterator())
+        ]
+        changes.reverse()
+        return JsonResponse({'changes': changes})
+
 
 @admin.register(Group)
-class GroupAdmin(VersionAdmin, FSMTransitionMixin):
+class GroupAdmin(DiffVersionAdmin, FSMTransitionMixin):
     save_on_top = True
     fsm_field = [
         'status',
@@ -70,7 +118,7 @@ class GroupAdmin(VersionAdmin, FSMTransitionMixin):
 
 
 @admin.register(Person)
-class PersonAdmin(VersionAdmin, FSMTransitionMixin):
+class PersonAdmin(DiffVersionAdmin, FSMTransitionMixin):
     fields = [
         'id',
         'status',
@@ -0,0 +1,313 @@
+# Standard Library
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Third-Party
+import jwt
+import requests
+from django_redis import get_redis_connection
+from jwt.algorithms import RSAAlgorithm
+from jwt.exceptions import PyJWTError
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.authentication import BasicAuthentication
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authentication import get_authorization_header
+from rest_framework.exceptions import AuthenticationFailed
+
+# Django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+# Local
+from . import metrics
+
+log = logging.getLogger(__name__)
+
+USER_KEY = 'legacy:jwt:user:{0}'
+CREDENTIAL_KEY = 'legacy:auth:credential:{0}:{1}'
+USER_CREDENTIALS_KEY = 'legacy:auth:user:{0}'
+
+
+class JWKSError(Exception):
+    pass
+
+
+class JWKS(object):
+    """Auth0 signing keys held in process and refreshed in the background."""
+
+    # Missing keys, whether unknown ids or a failed load, trigger a fetch
+    # at most this often.
+    MIN_REFETCH = 60
+
+    def __init__(self, url, refresh):
+        self.url = url
+        self.refresh = refresh
+        self.keys = {}
+        self.attempted = None
+        self.pid = None
+        self.lock = threading.Lock()
+
+    def fetch(self):
+        self.attempted = time.monotonic()
+        try:
+            if self.url.startswith('file://'):
+                with open(self.url[len('file://'):]) as f:
+                    data = json.load(f)
+            else:
+                response = requests.get(self.url, timeout=5)
+                response.raise_for_status()
+                data = response.json()
+            keys = {
+                key['kid']: RSAAlgorithm.from_jwk(json.dumps(key))
+                for key in data['keys'] if key.get('kty') == 'RSA'
+            }
+        except (OSError, ValueError, KeyError, TypeError, PyJWTError) as e:
+            # requests exceptions are OSErrors, JSON decode errors ValueErrors.
+            raise JWKSError("Could not load JWKS from {0}: {1}".format(self.url, e)) from e
+        self.keys = keys
+
+    def run(self):
+        while True:
+            time.sleep(self.refresh)
+            try:
+                self.fetch()
+            except Exception:
+                log.exception("Could not refresh JWKS from %s", self.url)
+
+    def start(self):
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            thread = threading.Thread(target=self.run, name='jwks-refresh', daemon=True)
+            thread.start()
+            self.pid = os.getpid()
+
+    def refetch(self):
+        with self.lock:
+            if self.attempted is not None and time.monotonic() - self.attempted < self.MIN_REFETCH:
+                return
+            self.fetch()
+
+    def get_key(self, kid):
+        if self.pid != os.getpid():
+            self.start()
+        key = self.keys.get(kid)
+        if key is None:
+            self.refetch()
+            key = self.keys.get(kid)
+        if key is None and not self.keys:
+            raise JWKSError("No keys loaded from {0}".format(self.url))
+        return key
+
+
+class ClaimsCache(object):
+    """LRU of verified token claims, evicted at the token's expiry."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            claims = self.data.get(key)
+            if claims is None:
+                return None
+            if claims.get('exp', 0) <= time.time():
+                del self.data[key]
+                return None
+            self.data.move_to_end(key)
+            return claims
+
+    def set(self, key, claims):
+        with self.lock:
+            self.data[key] = claims
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+
+jwks = JWKS(settings.JWKS_URL, settings.JWKS_REFRESH_SECONDS)
+claims_cache = ClaimsCache(settings.JWT_CLAIMS_CACHE_SIZE)
+
+
+def get_user_key(subject):
+    digest = hashlib.sha1(subject.encode('utf-8')).hexdigest()
+    return USER_KEY.format(digest)
+
+
+class CachedJSONWebTokenAuthentication(BaseAuthentication):
+    """Auth0 JWT authentication with cached keys, claims and users."""
+
+    keywords = (
+        b'bearer',
+        b'jwt',
+    )
+    www_authenticate_realm = 'api'
+
+    def get_token(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() not in self.keywords:
+            return None
+        if len(auth) != 2:
+            raise AuthenticationFailed('Invalid Authorization header.')
+        return auth[1].decode('utf-8')
+
+    def decode(self, token):
+        digest = hashlib.sha256(token.encode('utf-8')).hexdigest()
+        claims = claims_cache.get(digest)
+        metrics.observe_cache('jwt_claims', claims is not None)
+        if claims is not None:
+            return claims
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.InvalidTokenError:
+            raise AuthenticationFailed('Error decoding signature.')
+        try:
+            key = jwks.get_key(header.get('kid'))
+        except JWKSError:
+            log.exception("Signing keys are unavailable")
+            raise AuthenticationFailed('Signing keys are unavailable.')
+        if key is None:
+            raise AuthenticationFailed('Unknown signing key.')
+        try:
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=['RS256'],
+                audience=[
+                    settings.JWT_AUTH['JWT_AUDIENCE'],
+                    settings.JWT_AUTH['AUTH0_AUDIENCE'],
+                ],
+                issuer="https://{0}/".format(settings.JWT_AUTH['AUTH0_DOMAIN']),
+            )
+        except jwt.ExpiredSignatureError:
+            raise AuthenticationFailed('Signature has expired.')
+        except jwt.InvalidTokenError:
+            raise AuthenticationFailed('Error decoding signature.')
+        claims_cache.set(digest, claims)
+        return claims
+
+    def get_user(self, subject):
+        key = get_user_key(subject)
+        user = cache.get(key)
+        metrics.observe_cache('jwt_user', user is not None)
+        if user is None:
+            User = get_user_model()
+            try:
+                user = User._default_manager.get_by_natural_key(subject)
+            except User.DoesNotExist:
+                raise AuthenticationFailed('Invalid signature.')
+            cache.set(key, user, settings.JWT_USER_CACHE_TTL)
+        if not user.is_active:
+            raise AuthenticationFailed('User account is disabled.')
+        return user
+
+    def authenticate(self, request):
+        token = self.get_token(request)
+        if token is None:
+            return None
+        claims = self.decode(token)
+        subject = claims.get('sub')
+        if not subject:
+            raise AuthenticationFailed('Token has no subject.')
+        return (self.get_user(subject), token)
+
+    def authenticate_header(self, request):
+        return 'Bearer realm="{0}"'.format(self.www_authenticate_realm)
+
+
+def get_credential_key(scheme, credentials):
+    # Keyed with the secret so cache keys reveal nothing about credentials.
+    digest = hmac.new(
+        settings.SECRET_KEY.encode('utf-8'),
+        credentials.encode('utf-8'),
+        hashlib.sha256,
+    ).hexdigest()
+    return CREDENTIAL_KEY.format(scheme, digest)
+
+
+def remember(key, user, value):
+    cache.set(key, value, settings.AUTH_CACHE_TTL)
+    index = USER_CREDENTIALS_KEY.format(user.pk)
+    pipe = get_redis_connection('default').pipeline(transaction=False)
+    pipe.sadd(index, key)
+    pipe.expire(index, settings.AUTH_CACHE_TTL)
+    pipe.execute()
+
+
+def revoke(user):
+    """Drop every cached credential verification for ``user``."""
+    index = USER_CREDENTIALS_KEY.format(user.pk)
+    redis = get_redis_connection('default')
+    keys = [key.decode('utf-8') for key in redis.smembers(index)]
+    if keys:
+        cache.delete_many(keys)
+    redis.delete(index)
+
+
+class CachedBasicAuthentication(BasicAuthentication):
+    """Basic authentication that skips password hashing on repeat requests."""
+
+    def authenticate_credentials(self, userid, password, request=None):
+        key = get_credential_key('basic', "{0}:{1}".format(userid, password))
+        user = cache.get(key)
+        metrics.observe_cache('basic_auth', user is not None)
+        if user is None:
+            user, auth = super().authenticate_credentials(userid, password, request)
+            remember(key, user, user)
+        return (user, None)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that skips the token lookup on repeat requests."""
+
+    def authenticate_credentials(self, key):
+        cache_key = get_credential_key('token', key)
+        result = cache.get(cache_key)
+        metrics.observe_cache('token_auth', result is not None)
+        if result is None:
+            result = super().authenticate_credentials(key)
+            remember(cache_key, result[0], result)
+        return result
+
+
+class DispatchingAuthentication(BaseAuthentication):
+    """Pick the single relevant authenticator for a request.
+
+    The Authorization scheme selects Basic, Token or JWT; without a header
+    a session cookie selects session authentication."""
+
+    def __init__(self):
+        self.basic = CachedBasicAuthentication()
+        self.token = CachedTokenAuthentication()
+        self.jwt = CachedJSONWebTokenAuthentication()
+        self.session = SessionAuthentication()
+        self.schemes = {
+            b'basic': self.basic,
+            b'token': self.token,
+            b'bearer': self.jwt,
+            b'jwt': self.jwt,
+        }
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if auth:
+            authenticator = self.schemes.get(auth[0].lower())
+            if authenticator is None:
+                return None
+            return authenticator.authenticate(request)
+        if settings.SESSION_COOKIE_NAME in request._request.COOKIES:
+            return self.session.authenticate(request)
+        return None
+
+    def authenticate_header(self, request):
+        return self.basic.authenticate_header(request)
@@ -0,0 +1,217 @@
+# Standard Library
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+# Third-Party
+import psycopg2 as Database
+from psycopg2 import extensions
+
+# Django
+from django.db.backends.postgresql import base
+
+# First-Party
+from apps.legacy import metrics
+
+log = logging.getLogger(__name__)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool(object):
+    """Thread-safe, bounded pool of psycopg2 connections for one alias."""
+
+    def __init__(self, alias, connect, min_size=1, max_size=10, timeout=10,
+                 check_after=30, max_idle=300):
+        self.alias = alias
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_after = check_after
+        self.max_idle = max_idle
+        self.pid = os.getpid()
+        self.idle = deque()
+        self.size = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.condition = threading.Condition()
+
+    def fill(self):
+        while self.size < self.min_size:
+            connection = self.connect()
+            with self.condition:
+                self.size += 1
+                self.idle.append((connection, time.monotonic()))
+
+    def is_healthy(self, connection, since):
+        if connection.closed:
+            return False
+        if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if time.monotonic() - since < self.check_after:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return True
+        except Database.Error:
+            return False
+
+    def getconn(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        connection = since = None
+        with self.condition:
+            while True:
+                if self.idle:
+                    # LIFO keeps the warmest connections in rotation.
+                    connection, since = self.idle.pop()
+                    break
+                if self.size < self.max_size:
+                    self.size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise Database.OperationalError(
+                        "Connection pool for '{0}' exhausted after {1}s".format(
+                            self.alias,
+                            self.timeout,
+                        )
+                    )
+                self.waiting += 1
+                self.condition.wait(remaining)
+                self.waiting -= 1
+            self.in_use += 1
+        metrics.observe(
+            'legacy_db_pool_wait_seconds',
+            time.monotonic() - start,
+            db=self.alias,
+        )
+        try:
+            if connection is not None and not self.is_healthy(connection, since):
+                self.close(connection)
+                connection = None
+            if connection is None:
+                connection = self.connect()
+        except Exception:
+            with self.condition:
+                self.size -= 1
+                self.in_use -= 1
+                self.condition.notify()
+            raise
+        return connection
+
+    def putconn(self, connection):
+        discard = connection.closed
+        if not discard:
+            try:
+                status = connection.get_transaction_status()
+                if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                    discard = True
+                elif status != extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            except Database.Error:
+                discard = True
+        now = time.monotonic()
+        expired = []
+        with self.condition:
+            self.in_use -= 1
+            if discard:
+                self.size -= 1
+                expired.append(connection)
+            else:
+                self.idle.append((connection, now))
+            while len(self.idle) > 1 and self.size > self.min_size:
+                oldest, since = self.idle[0]
+                if now - since < self.max_idle:
+                    break
+                self.idle.popleft()
+                self.size -= 1
+                expired.append(oldest)
+            self.condition.notify()
+        for connection in expired:
+            self.close(connection)
+
+    @staticmethod
+    def close(connection):
+        try:
+            connection.close()
+        except Database.Error:
+            pass
+
+    def stats(self):
+        labels = {'db': self.alias}
+        return [
+            (dict(labels, state='in_use'), self.in_use),
+            (dict(labels, state='idle'), len(self.idle)),
+            (dict(labels, state='waiting'), self.waiting),
+            (dict(labels, state='max'), self.max_size),
+        ]
+
+
+def pool_stats():
+    samples = []
+    for pool in list(_pools.values()):
+        if pool.pid == os.getpid():
+            samples.extend(pool.stats())
+    return samples
+
+
+metrics.register_gauge('legacy_db_pool_connections', pool_stats)
+
+
+def get_pool(alias, settings_dict, connect):
+    pool = _pools.get(alias)
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+    with _pools_lock:
+        pool = _pools.get(alias)
+        # Connections inherited across a fork belong to the parent; leave them.
+        if pool is None or pool.pid != os.getpid():
+            options = settings_dict.get('POOL', {})
+            pool = ConnectionPool(
+                alias,
+                connect,
+                min_size=options.get('MIN_SIZE', 1),
+                max_size=options.get('MAX_SIZE', 10),
+                timeout=options.get('TIMEOUT', 10),
+                check_after=options.get('CHECK_AFTER', 30),
+                max_idle=options.get('MAX_IDLE', 300),
+            )
+            pool.fill()
+            _pools[alias] = pool
+    return pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL backend that borrows connections from a process-wide pool.
+
+    Use with ``CONN_MAX_AGE = 0`` so Django hands the connection back at the
+    end of every request instead of keeping one per thread."""
+
+    def get_new_connection(self, conn_params):
+        options = self.settings_dict['OPTIONS']
+
+        def connect():
+            connection = Database.connect(**conn_params)
+            isolation_level = options.get('isolation_level')
+            if isolation_level is not None and isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=isolation_level)
+            return connection
+
+        connection = get_pool(self.alias, self.settings_dict, connect).getconn()
+        self.isolation_level = options.get('isolation_level', connection.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = _pools.get(self.alias)
+        with self.wrap_database_errors:
+            if pool is None or pool.pid != os.getpid():
+                return self.connection.close()
+            return pool.putconn(self.connection)
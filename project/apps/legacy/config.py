@@ -6,4 +6,5 @@ class LegacyConfig(AppConfig):
     verbose_name = 'Legacy'
 
     def ready(self):
+        from . import signals  # noqa: F401
         return
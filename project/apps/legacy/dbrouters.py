@@ -0,0 +1,105 @@
+# Standard Library
+import logging
+import random
+import threading
+import time
+from contextlib import ContextDecorator
+
+# Django
+from django.conf import settings
+from django.db import DatabaseError
+from django.db import connections
+
+log = logging.getLogger(__name__)
+
+_state = threading.local()
+_health = {}
+_health_lock = threading.Lock()
+
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+def get_replicas():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica_')]
+
+
+class use_replica(ContextDecorator):
+    """Route reads inside the block to a healthy replica.
+
+    Used by the replica middleware for safe requests and as a decorator on
+    read-only jobs such as exports and reindexing."""
+
+    enabled = True
+
+    def __enter__(self):
+        self.previous = getattr(_state, 'replica', False)
+        _state.replica = self.enabled
+        return self
+
+    def __exit__(self, *exc):
+        _state.replica = self.previous
+        return False
+
+
+class use_primary(use_replica):
+    """Force reads inside the block back onto the primary."""
+
+    enabled = False
+
+
+def get_lag(alias):
+    with connections[alias].cursor() as cursor:
+        cursor.execute(LAG_SQL)
+        return float(cursor.fetchone()[0])
+
+
+def is_healthy(alias):
+    """Check replica lag at most once per interval per process."""
+    now = time.monotonic()
+    with _health_lock:
+        checked, healthy = _health.get(alias, (None, True))
+        if checked is not None and now - checked < settings.REPLICA_CHECK_INTERVAL:
+            return healthy
+        # Claim the check so other threads keep the previous answer meanwhile.
+        _health[alias] = (now, healthy)
+    try:
+        lag = get_lag(alias)
+        healthy = lag <= settings.REPLICA_MAX_LAG
+        if not healthy:
+            log.warning("Replica %s is %.1fs behind", alias, lag)
+    except DatabaseError:
+        log.exception("Replica %s is unavailable", alias)
+        connections[alias].close()
+        healthy = False
+    with _health_lock:
+        _health[alias] = (time.monotonic(), healthy)
+    return healthy
+
+
+class ReplicaRouter(object):
+    """Send reads to replicas only when explicitly enabled and safe."""
+
+    def db_for_read(self, model, **hints):
+        if not getattr(_state, 'replica', False):
+            return 'default'
+        if connections['default'].in_atomic_block:
+            return 'default'
+        replicas = [alias for alias in get_replicas() if is_healthy(alias)]
+        if not replicas:
+            return 'default'
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
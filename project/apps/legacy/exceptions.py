@@ -0,0 +1,31 @@
+# Third-Party
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'The resource was modified since it was read.'
+    default_code = 'precondition_failed'
+
+
+class StreamsBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many change streams are open; retry later.'
+    default_code = 'streams_busy'
+
+    def __init__(self, wait, detail=None, code=None):
+        super().__init__(detail, code)
+        # Sent as Retry-After.
+        self.wait = wait
+
+
+class ResultPending(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The result is still being computed; retry later.'
+    default_code = 'result_pending'
+
+    def __init__(self, wait, detail=None, code=None):
+        super().__init__(detail, code)
+        # Sent as Retry-After.
+        self.wait = wait
@@ -1,15 +1,96 @@
 # Third-Party
+from django_filters.rest_framework import BooleanFilter
+from django_filters.rest_framework import CharFilter
 from django_filters.rest_framework import FilterSet
+from django_filters.rest_framework import NumberFilter
+from rest_framework.exceptions import ValidationError
+
+# Django
+from django.conf import settings
+from django.http import QueryDict
 
 # Local
+from .geo import get_airport_coordinates
+from .geo import within
 from .models import Group
 from .models import Person
 
 
-class GroupFilterset(FilterSet):
+class OwnedFilterset(FilterSet):
+    mine = BooleanFilter(
+        method='filter_mine',
+    )
+
+    def filter_mine(self, queryset, name, value):
+        if not value:
+            return queryset
+        user = getattr(self.request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return queryset.none()
+        # Joins through the owners table on its indexed user_id column.
+        return queryset.filter(owners=user)
+
+    @classmethod
+    def from_lookup(cls, body, queryset, request):
+        """Build a filterset from a POSTed ``{"filter": {...}}`` body.
+
+        Lists are accepted for ``__in`` filters, so large id sets do not
+        have to fit in a query string."""
+        filters = body.get('filter') if isinstance(body, dict) else None
+        if not isinstance(filters, dict):
+            raise ValidationError({'filter': 'Expected an object of filters.'})
+        data = QueryDict(mutable=True)
+        for name, value in filters.items():
+            name = name.replace('.', '__')
+            if isinstance(value, list):
+                if len(value) > settings.LOOKUP_MAX_VALUES:
+                    raise ValidationError({
+                        name: 'At most {0} values are allowed.'.format(
+                            settings.LOOKUP_MAX_VALUES,
+                        ),
+                    })
+                value = ','.join(str(x) for x in value)
+            data[name] = value
+        filterset = cls(data, queryset=queryset, request=request)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        return filterset
+
+
+class ProximityFilterset(FilterSet):
+    near = CharFilter(
+        method='filter_near',
+        help_text="Airport code to search around; rows without coordinates never match.",
+    )
+    radius = NumberFilter(
+        method='filter_radius',
+        help_text="Search radius in miles around ``near``.",
+    )
+
+    def filter_radius(self, queryset, name, value):
+        # Applied by filter_near.
+        return queryset
+
+    def filter_near(self, queryset, name, value):
+        coordinates = get_airport_coordinates(value)
+        if coordinates is None:
+            return queryset.none()
+        radius = self.form.cleaned_data.get('radius') or settings.NEAR_DEFAULT_RADIUS
+        return within(queryset, coordinates[0], coordinates[1], float(radius))
+
+
+class GroupFilterset(ProximityFilterset, OwnedFilterset):
     class Meta:
         model = Group
         fields = {
+            'id': [
+                'exact',
+                'in',
+            ],
+            'bhs_id': [
+                'exact',
+                'in',
+            ],
             'owners': [
                 'exact',
             ],
@@ -18,8 +99,15 @@ class GroupFilterset(FilterSet):
                 'gt',
             ],
             'kind': [
+                'exact',
                 'gt',
             ],
+            'gender': [
+                'exact',
+            ],
+            'email': [
+                'iexact',
+            ],
             'created': [
                 'gt',
             ],
@@ -29,7 +117,16 @@ class GroupFilterset(FilterSet):
         }
 
 
-class PersonFilterset(FilterSet):
+class PersonFilterset(ProximityFilterset, OwnedFilterset):
+    airport = CharFilter(
+        method='filter_airport',
+        help_text="Persons listing this airport.",
+    )
+
+    def filter_airport(self, queryset, name, value):
+        # Array containment (@>) is served by the GIN index.
+        return queryset.filter(airports__contains=[value.upper()])
+
     class Meta:
         model = Person
         fields = {
@@ -39,9 +136,29 @@ class PersonFilterset(FilterSet):
             # 'user__username': [
             #     'exact',
             # ],
+            'id': [
+                'exact',
+                'in',
+            ],
+            'bhs_id': [
+                'exact',
+                'in',
+            ],
             'status': [
                 'exact',
             ],
+            'gender': [
+                'exact',
+            ],
+            'part': [
+                'exact',
+            ],
+            'last_name': [
+                'startswith',
+            ],
+            'email': [
+                'iexact',
+            ],
             'created': [
                 'gt',
             ],
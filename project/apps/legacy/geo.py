@@ -0,0 +1,172 @@
+"""
+Coordinates for airports and free-text locations, and radius search.
+
+Locations are geocoded against the bundled airport table by city and
+region, so no external geocoder or PostGIS is needed.  Only locations in
+a city with a bundled airport (or, for persons, with a home airport) get
+coordinates; the rest stay null and never match a radius search.  Radius
+searches narrow on an indexed bounding box before the exact haversine
+check.
+"""
+
+# Standard Library
+import csv
+import hashlib
+import math
+import os
+
+# Django
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import ExpressionWrapper
+from django.db.models import F
+from django.db.models import FloatField
+from django.db.models import Value
+from django.db.models.functions import ASin
+from django.db.models.functions import Cos
+from django.db.models.functions import Least
+from django.db.models.functions import Power
+from django.db.models.functions import Radians
+from django.db.models.functions import Sin
+from django.db.models.functions import Sqrt
+
+# Local
+from . import metrics
+
+AIRPORTS_CSV = os.path.join(os.path.dirname(__file__), 'data', 'airports.csv')
+GEOCODE_KEY = 'legacy:geocode:{0}'
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE = 69.0
+# OurAirports types worth keeping when a full export is loaded.
+AIRPORT_TYPES = (
+    'large_airport',
+    'medium_airport',
+)
+
+
+def read_airports(path=AIRPORTS_CSV):
+    """Yield airport rows from the bundled file or an OurAirports export."""
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            code = (row.get('iata_code') or '').strip().upper()
+            if len(code) != 3:
+                continue
+            if 'type' in row and row['type'] not in AIRPORT_TYPES:
+                continue
+            yield {
+                'code': code,
+                'name': row['name'],
+                'city': row['municipality'] or '',
+                'region': row['iso_region'] or '',
+                'country': row['iso_country'] or '',
+                'latitude': float(row['latitude_deg']),
+                'longitude': float(row['longitude_deg']),
+            }
+
+
+def load_airports(path=AIRPORTS_CSV, apps=django_apps):
+    """Insert or update airports from ``path``; returns the row count."""
+    Airport = apps.get_model('legacy', 'Airport')
+    rows = {row['code']: row for row in read_airports(path)}
+    existing = Airport.objects.in_bulk(list(rows))
+    created = []
+    for code, row in rows.items():
+        airport = existing.get(code)
+        if airport is None:
+            created.append(Airport(**row))
+            continue
+        for name, value in row.items():
+            setattr(airport, name, value)
+    Airport.objects.bulk_create(created, batch_size=1000)
+    Airport.objects.bulk_update(
+        list(existing.values()),
+        ['name', 'city', 'region', 'country', 'latitude', 'longitude'],
+        batch_size=1000,
+    )
+    if apps is django_apps:
+        # Cached misses may now resolve.
+        cache.delete_pattern(GEOCODE_KEY.format('*'))
+    return len(rows)
+
+
+def parse_location(location):
+    """Split "City, ST" style text into a city and an optional region."""
+    parts = [part.strip() for part in location.split(',') if part.strip()]
+    if not parts:
+        return None, None
+    region = None
+    if len(parts) > 1 and len(parts[1]) == 2:
+        region = parts[1].upper()
+    return parts[0], region
+
+
+def lookup(location):
+    Airport = django_apps.get_model('legacy', 'Airport')
+    city, region = parse_location(location)
+    if not city:
+        return None
+    airports = Airport.objects.filter(city__iexact=city)
+    if region:
+        airports = airports.filter(region__iendswith='-' + region)
+    airport = airports.order_by('code').first()
+    if airport is None:
+        return None
+    return (airport.latitude, airport.longitude)
+
+
+def geocode(location):
+    """Return ``(latitude, longitude)`` for free text, or None."""
+    location = ' '.join(location.split()).lower()
+    if not location:
+        return None
+    key = GEOCODE_KEY.format(hashlib.sha1(location.encode('utf-8')).hexdigest())
+    cached = cache.get(key)
+    metrics.observe_cache('geocode', cached is not None)
+    if cached is None:
+        # Misses are cached too, as an empty tuple.
+        cached = lookup(location) or ()
+        cache.set(key, cached, settings.GEOCODE_CACHE_TTL)
+    return tuple(cached) or None
+
+
+def get_airport_coordinates(code):
+    Airport = django_apps.get_model('legacy', 'Airport')
+    airport = Airport.objects.filter(code=code.upper()).first()
+    if airport is None:
+        return None
+    return (airport.latitude, airport.longitude)
+
+
+def get_bounds(latitude, longitude, miles):
+    """Latitude and longitude ranges enclosing a radius around a point."""
+    dlat = miles / MILES_PER_DEGREE
+    # Clamped so the box stays finite near the poles.
+    dlon = miles / (MILES_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+    return (latitude - dlat, latitude + dlat, longitude - dlon, longitude + dlon)
+
+
+def get_distance(latitude, longitude):
+    """Haversine distance in miles from a point to each row."""
+    half_dlat = Radians(F('latitude') - latitude) / 2
+    half_dlon = Radians(F('longitude') - longitude) / 2
+    a = (
+        Power(Sin(half_dlat), 2) +
+        Cos(Radians(F('latitude'))) * math.cos(math.radians(latitude)) * Power(Sin(half_dlon), 2)
+    )
+    return ExpressionWrapper(
+        2 * EARTH_RADIUS_MILES * ASin(Least(Sqrt(a), Value(1.0))),
+        output_field=FloatField(),
+    )
+
+
+def within(queryset, latitude, longitude, miles):
+    min_lat, max_lat, min_lon, max_lon = get_bounds(latitude, longitude, miles)
+    return queryset.filter(
+        latitude__range=(min_lat, max_lat),
+        longitude__range=(min_lon, max_lon),
+    ).annotate(
+        distance=get_distance(latitude, longitude),
+    ).filter(
+        distance__lte=miles,
+    )
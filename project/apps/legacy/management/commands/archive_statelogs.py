@@ -0,0 +1,40 @@
+# Django
+from django.core.management.base import BaseCommand
+
+# First-Party
+from apps.legacy.tasks import archive_statelogs
+
+
+class Command(BaseCommand):
+    help = "Move old state logs into the time-partitioned archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help="Retention window in days (defaults to STATELOG_RETENTION_DAYS).",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+        )
+        parser.add_argument(
+            '--enqueue',
+            action='store_true',
+            help="Run on the low RQ queue instead of inline.",
+        )
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            archive_statelogs.delay(
+                days=options['days'],
+                batch_size=options['batch_size'],
+            )
+            self.stdout.write("Enqueued state log archiving.")
+            return
+        moved = archive_statelogs(
+            days=options['days'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write("Archived {0} state logs.".format(moved))
@@ -0,0 +1,79 @@
+# Standard Library
+import json
+import time
+from functools import partial
+
+# Third-Party
+import msgpack
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework_json_api.renderers import JSONRenderer
+
+# Django
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+
+# First-Party
+from apps.legacy.renderers import MessagePackRenderer
+from apps.legacy.views import PersonViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare JSON and MessagePack rendering of person list pages. "
+        "Serializes existing persons; load some with seed_legacy first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            nargs='+',
+            default=[100, 10000],
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+        )
+
+    def best(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings) * 1000
+
+    def get_view(self):
+        view = PersonViewSet(action_map={'get': 'list'}, kwargs={}, format_kwarg=None)
+        view.request = view.initialize_request(APIRequestFactory().get('/legacy/person'))
+        view.request.user = AnonymousUser()
+        return view
+
+    def handle(self, *args, **options):
+        renderers = [
+            ('json', JSONRenderer(), json.loads),
+            ('msgpack', MessagePackRenderer(), partial(msgpack.unpackb, raw=False)),
+        ]
+        view = self.get_view()
+        for rows in options['rows']:
+            # Serialized once; only the renderers are timed.
+            data = view.get_serializer(view.get_queryset()[:rows], many=True).data
+            if len(data) < rows:
+                self.stderr.write("Only {0} persons to render.".format(len(data)))
+            context = {
+                'view': view,
+                'request': view.request,
+                'response': Response(data),
+            }
+            for name, renderer, decode in renderers:
+                render = partial(renderer.render, data, renderer.media_type, context)
+                body = render()
+                render_ms = self.best(render, options['repeat'])
+                decode_ms = self.best(partial(decode, body), options['repeat'])
+                self.stdout.write(
+                    "{0:>6} rows  {1:<8} {2:>10} bytes  render {3:8.2f} ms  decode {4:8.2f} ms".format(
+                        len(data), name, len(body), render_ms, decode_ms,
+                    )
+                )
@@ -0,0 +1,37 @@
+# Django
+from django.core.management.base import BaseCommand
+
+# First-Party
+from apps.legacy.outbox import retry_dead
+from apps.legacy.tasks import drain_outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver pending outbox events; safe to run periodically as a backstop."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+        )
+        parser.add_argument(
+            '--retry-dead',
+            action='store_true',
+            help="First give events that ran out of attempts another round.",
+        )
+        parser.add_argument(
+            '--enqueue',
+            action='store_true',
+            help="Run on the default RQ queue instead of inline.",
+        )
+
+    def handle(self, *args, **options):
+        if options['retry_dead']:
+            revived = retry_dead()
+            self.stdout.write("Revived {0} dead outbox events.".format(revived))
+        if options['enqueue']:
+            drain_outbox.delay(batch_size=options['batch_size'])
+            self.stdout.write("Enqueued outbox drain.")
+            return
+        delivered = drain_outbox(batch_size=options['batch_size'])
+        self.stdout.write("Delivered {0} outbox events.".format(delivered))
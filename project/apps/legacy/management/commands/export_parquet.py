@@ -0,0 +1,70 @@
+# Standard Library
+import os
+
+# Django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# First-Party
+from apps.legacy.dbrouters import use_replica
+from apps.legacy.models import Group
+from apps.legacy.models import Person
+from apps.legacy.tasks import export_snapshot
+
+
+class Command(BaseCommand):
+    help = "Export Group and Person snapshots as Parquet or Arrow IPC files."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default='.',
+            help="Directory to write the files to.",
+        )
+        parser.add_argument(
+            '--models',
+            nargs='+',
+            choices=['group', 'person'],
+            default=['group', 'person'],
+        )
+        parser.add_argument(
+            '--format',
+            choices=['arrow', 'parquet'],
+            default='parquet',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.EXPORT_BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--enqueue',
+            action='store_true',
+            help="Run on the low RQ queue and save to EXPORT_STORAGE instead.",
+        )
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            export_snapshot.delay(
+                models=options['models'],
+                fmt=options['format'],
+                batch_size=options['batch_size'],
+            )
+            self.stdout.write("Enqueued export.")
+            return
+        from apps.legacy.exports import FORMATS
+        from apps.legacy.exports import Exporter
+        for model in [Group, Person]:
+            if model._meta.model_name not in options['models']:
+                continue
+            path = os.path.join(
+                options['output'],
+                "{0}.{1}".format(model._meta.model_name, FORMATS[options['format']]),
+            )
+            with use_replica():
+                rows = Exporter(model).write(
+                    path,
+                    fmt=options['format'],
+                    batch_size=options['batch_size'],
+                )
+            self.stdout.write("Wrote {0} rows to {1}.".format(rows, path))
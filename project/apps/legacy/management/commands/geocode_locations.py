@@ -0,0 +1,82 @@
+# Django
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+# First-Party
+from apps.legacy.geo import geocode
+from apps.legacy.geo import get_airport_coordinates
+from apps.legacy.models import Group
+from apps.legacy.models import Person
+from apps.legacy.objectcache import object_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Geocode Group and Person locations into latitude and longitude. "
+        "Only cities with an airport in the bundled table are found."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help="Recompute rows that already have coordinates.",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+        )
+
+    def update(self, model, batch):
+        # bulk_update sends no signals, so bump ``modified`` (the ETag) and
+        # invalidate cached copies here.
+        modified = timezone.now()
+        for instance in batch:
+            instance.modified = modified
+        model.objects.bulk_update(batch, ['latitude', 'longitude', 'modified'])
+        for instance in batch:
+            object_cache.invalidate(model, instance.pk)
+        return len(batch)
+
+    def geocode(self, model, fields, options):
+        queryset = model.objects.only(*fields)
+        if not options['all']:
+            queryset = queryset.filter(latitude__isnull=True)
+        batch = []
+        checked = 0
+        updated = 0
+        for instance in queryset.iterator(chunk_size=options['batch_size']):
+            checked += 1
+            coordinates = geocode(instance.location)
+            airports = getattr(instance, 'airports', None)
+            if coordinates is None and airports:
+                coordinates = get_airport_coordinates(airports[0])
+            if coordinates is None:
+                continue
+            instance.latitude, instance.longitude = coordinates
+            batch.append(instance)
+            if len(batch) >= options['batch_size']:
+                updated += self.update(model, batch)
+                batch = []
+        if batch:
+            updated += self.update(model, batch)
+        missing = model.objects.filter(latitude__isnull=True).count()
+        self.stdout.write(
+            "{0}: geocoded {1} of {2} rows checked; {3} rows have no "
+            "coordinates and are excluded from near= searches.".format(
+                model._meta.verbose_name_plural.capitalize(),
+                updated,
+                checked,
+                missing,
+            )
+        )
+
+    def handle(self, *args, **options):
+        # Only cities in the bundled airport table can be geocoded.
+        self.geocode(Group, ['id', 'modified', 'location', 'latitude', 'longitude'], options)
+        self.geocode(
+            Person,
+            ['id', 'modified', 'location', 'airports', 'latitude', 'longitude'],
+            options,
+        )
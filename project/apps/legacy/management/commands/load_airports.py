@@ -0,0 +1,22 @@
+# Django
+from django.core.management.base import BaseCommand
+
+# First-Party
+from apps.legacy.geo import AIRPORTS_CSV
+from apps.legacy.geo import load_airports
+
+
+class Command(BaseCommand):
+    help = "Load airport coordinates from the bundled or an OurAirports CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=AIRPORTS_CSV,
+            help="CSV to load (defaults to the bundled airports).",
+        )
+
+    def handle(self, *args, **options):
+        count = load_airports(options['path'])
+        self.stdout.write("Loaded {0} airports.".format(count))
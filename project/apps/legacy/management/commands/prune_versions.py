@@ -0,0 +1,34 @@
+# Django
+from django.core.management.base import BaseCommand
+
+# First-Party
+from apps.legacy.tasks import prune_versions
+
+
+class Command(BaseCommand):
+    help = "Prune reversion history past the retention window."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help="Retention window in days (defaults to VERSION_RETENTION_DAYS).",
+        )
+        parser.add_argument(
+            '--keep',
+            type=int,
+            help="Versions always kept per object (defaults to VERSION_KEEP_MIN).",
+        )
+        parser.add_argument(
+            '--enqueue',
+            action='store_true',
+            help="Run on the low RQ queue instead of inline.",
+        )
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            prune_versions.delay(days=options['days'], keep=options['keep'])
+            self.stdout.write("Enqueued version pruning.")
+            return
+        pruned = prune_versions(days=options['days'], keep=options['keep'])
+        self.stdout.write("Pruned {0} versions.".format(pruned))
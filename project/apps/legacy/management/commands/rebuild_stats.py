@@ -0,0 +1,13 @@
+# Django
+from django.core.management.base import BaseCommand
+
+# First-Party
+from apps.legacy.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recount the Group and Person summary statistics."
+
+    def handle(self, *args, **options):
+        rows = rebuild()
+        self.stdout.write("Rebuilt {0} summary rows.".format(rows))
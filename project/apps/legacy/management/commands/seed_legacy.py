@@ -0,0 +1,132 @@
+# Standard Library
+import multiprocessing
+import os
+
+# Third-Party
+from django_fsm_log.models import StateLog
+
+# Django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db import connections
+
+# First-Party
+from apps.legacy.models import Group
+from apps.legacy.models import Person
+from apps.legacy.seeding import get_context
+from apps.legacy.seeding import seed_chunk
+from apps.legacy.stats import rebuild
+
+SEED_USERNAME = 'seed-{0:06d}@example.com'
+
+
+class Command(BaseCommand):
+    help = "Load synthetic Groups, Persons, owners and StateLogs with COPY."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--groups',
+            type=int,
+            default=10000,
+        )
+        parser.add_argument(
+            '--persons',
+            type=int,
+            default=100000,
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=1000,
+            help="Owners to spread over the seeded rows.",
+        )
+        parser.add_argument(
+            '--statelogs',
+            type=int,
+            default=2,
+            help="Average transitions logged per row.",
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=20000,
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help="Allow seeding when DEBUG is off.",
+        )
+
+    def get_users(self, count):
+        # Reused across runs, so owners stay the same for a given count.
+        User = get_user_model()
+        usernames = [SEED_USERNAME.format(i) for i in range(count)]
+        field = User.USERNAME_FIELD
+        existing = set(User.objects.filter(**{
+            "{0}__in".format(field): usernames,
+        }).values_list(field, flat=True))
+        users = []
+        for username in usernames:
+            if username in existing:
+                continue
+            user = User(**{field: username})
+            user.set_unusable_password()
+            users.append(user)
+        User.objects.bulk_create(users, batch_size=1000)
+        return list(User.objects.filter(**{
+            "{0}__in".format(field): usernames,
+        }).order_by(field).values_list('pk', flat=True))
+
+    def get_tasks(self, model, total, users, options):
+        context = get_context(model, users, options['statelogs'])
+        size = options['chunk_size']
+        for chunk, start in enumerate(range(0, total, size)):
+            yield (
+                model._meta.model_name,
+                options['seed'],
+                chunk,
+                start,
+                min(size, total - start),
+                context,
+            )
+
+    def handle(self, *args, **options):
+        if not (settings.DEBUG or options['force']):
+            raise CommandError("Refusing to seed with DEBUG off; pass --force.")
+        users = self.get_users(options['users'])
+        tasks = list(self.get_tasks(Group, options['groups'], users, options))
+        tasks += list(self.get_tasks(Person, options['persons'], users, options))
+        # Forked workers must open their own connections.
+        connections.close_all()
+        totals = {}
+        with multiprocessing.get_context('fork').Pool(options['workers']) as pool:
+            for model_name, *counts in pool.imap_unordered(seed_chunk, tasks):
+                total = totals.setdefault(model_name, [0, 0, 0])
+                for i, count in enumerate(counts):
+                    total[i] += count
+                self.stdout.write("{0}: {1} rows, {2} owners, {3} statelogs".format(
+                    model_name,
+                    *total
+                ))
+        rebuild()
+        with connection.cursor() as cursor:
+            for model in [Group, Person, Group.owners.through, Person.owners.through, StateLog]:
+                cursor.execute("ANALYZE {0}".format(connection.ops.quote_name(model._meta.db_table)))
+        self.stdout.write("Seeded {0} users, {1} groups and {2} persons.".format(
+            len(users),
+            options['groups'],
+            options['persons'],
+        ))
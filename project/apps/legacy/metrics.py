@@ -0,0 +1,228 @@
+# Standard Library
+import atexit
+import logging
+import os
+import socket
+import threading
+import time
+from collections import defaultdict
+
+# Third-Party
+from django_redis import get_redis_connection
+
+log = logging.getLogger(__name__)
+
+METRICS_KEY = 'legacy:metrics'
+WORKER_KEY = 'legacy:metrics:worker:{0}'
+WORKER_TTL = 300
+# How long observations made outside a request or job may wait for a flush.
+UNSCOPED_FLUSH_INTERVAL = 10
+
+BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+TYPES = {
+    'legacy_requests_total': 'counter',
+    'legacy_request_duration_seconds': 'histogram',
+    'legacy_render_duration_seconds': 'histogram',
+    'legacy_serializer_duration_seconds': 'histogram',
+    'legacy_db_queries_total': 'counter',
+    'legacy_db_query_duration_seconds': 'histogram',
+    'legacy_db_pool_wait_seconds': 'histogram',
+    'legacy_cache_requests_total': 'counter',
+    'legacy_task_duration_seconds': 'histogram',
+    'legacy_n_plus_one_total': 'counter',
+    'legacy_redis_keyspace_hits_total': 'counter',
+    'legacy_redis_keyspace_misses_total': 'counter',
+}
+
+_local = threading.local()
+_gauges = []
+
+
+class Recorder(object):
+    """Collects observations for one request or job until flushed."""
+
+    def __init__(self):
+        self.created = time.monotonic()
+        self.counters = defaultdict(float)
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+    def inc(self, name, value=1, **labels):
+        self.counters[sample(name, labels)] += value
+
+    def observe(self, name, value, **labels):
+        for bucket in BUCKETS:
+            if value <= bucket:
+                self.inc(name + '_bucket', le=bucket, **labels)
+        self.inc(name + '_bucket', le='+Inf', **labels)
+        self.inc(name + '_sum', value, **labels)
+        self.inc(name + '_count', **labels)
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def sample(name, labels):
+    if not labels:
+        return name
+    pairs = ','.join(
+        '{0}="{1}"'.format(key, escape(value)) for key, value in sorted(labels.items())
+    )
+    return "{0}{{{1}}}".format(name, pairs)
+
+
+def get_recorder():
+    recorder = getattr(_local, 'recorder', None)
+    if recorder is None:
+        recorder = _local.recorder = Recorder()
+    return recorder
+
+
+def begin():
+    """Mark the start of a request or job, which flushes when it ends."""
+    _local.scoped = True
+
+
+def flush_unscoped(recorder):
+    # Commands and plain RQ jobs have no end of request to flush at.
+    if getattr(_local, 'scoped', False):
+        return
+    if time.monotonic() - recorder.created >= UNSCOPED_FLUSH_INTERVAL:
+        flush()
+
+
+def inc(name, value=1, **labels):
+    recorder = get_recorder()
+    recorder.inc(name, value, **labels)
+    flush_unscoped(recorder)
+
+
+def observe(name, value, **labels):
+    recorder = get_recorder()
+    recorder.observe(name, value, **labels)
+    flush_unscoped(recorder)
+
+
+class SerializerTimingMixin(object):
+    """Accumulate the outermost ``to_representation`` time of a request."""
+
+    def to_representation(self, instance):
+        recorder = get_recorder()
+        if recorder.serializer_depth:
+            return super().to_representation(instance)
+        recorder.serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            recorder.serializer_time += time.perf_counter() - start
+            recorder.serializer_depth -= 1
+
+
+def observe_cache(cache, hit):
+    inc('legacy_cache_requests_total', cache=cache, result='hit' if hit else 'miss')
+
+
+def register_gauge(name, callback, kind='gauge'):
+    """Register a callback returning ``[(labels, value), ...]``.
+
+    Gauges are per worker, so they are snapshotted on every flush and
+    expire with the worker rather than being summed."""
+    TYPES[name] = kind
+    _gauges.append((name, callback))
+
+
+def worker_id():
+    return "{0}:{1}".format(socket.gethostname(), os.getpid())
+
+
+def flush():
+    """Write the pending observations to Redis in a single round trip."""
+    recorder = get_recorder()
+    _local.recorder = None
+    _local.scoped = False
+    snapshot = {}
+    for name, callback in _gauges:
+        try:
+            for labels, value in callback():
+                snapshot[sample(name, labels)] = value
+        except Exception:
+            log.exception("Gauge %s failed", name)
+    if not recorder.counters and not snapshot:
+        return
+    try:
+        pipe = get_redis_connection('default').pipeline(transaction=False)
+        for field, value in recorder.counters.items():
+            pipe.hincrbyfloat(METRICS_KEY, field, value)
+        if snapshot:
+            key = WORKER_KEY.format(worker_id())
+            for field, value in snapshot.items():
+                pipe.hset(key, field, value)
+            pipe.expire(key, WORKER_TTL)
+        pipe.execute()
+    except Exception:
+        log.exception("Could not flush metrics")
+
+
+# Whatever a command recorded on the main thread since its last flush.
+atexit.register(flush)
+
+
+def _decode(value):
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    return value
+
+
+def _with_worker(field, worker):
+    label = 'worker="{0}"'.format(escape(worker))
+    if field.endswith('}'):
+        return "{0},{1}}}".format(field[:-1], label)
+    return "{0}{{{1}}}".format(field, label)
+
+
+def _family(field):
+    name = field.split('{', 1)[0]
+    for suffix in ('_bucket', '_sum', '_count'):
+        if name.endswith(suffix) and name[:-len(suffix)] in TYPES:
+            return name[:-len(suffix)]
+    return name
+
+
+def render():
+    """Render every worker's metrics in the Prometheus text format."""
+    redis = get_redis_connection('default')
+    lines = {}
+    for field, value in redis.hgetall(METRICS_KEY).items():
+        lines[_decode(field)] = float(value)
+    for key in redis.scan_iter(WORKER_KEY.format('*')):
+        worker = _decode(key).rsplit(':', 2)[-2:]
+        for field, value in redis.hgetall(key).items():
+            lines[_with_worker(_decode(field), ':'.join(worker))] = float(value)
+    stats = redis.info('stats')
+    lines['legacy_redis_keyspace_hits_total'] = float(stats.get('keyspace_hits', 0))
+    lines['legacy_redis_keyspace_misses_total'] = float(stats.get('keyspace_misses', 0))
+    families = defaultdict(list)
+    for field in sorted(lines):
+        families[_family(field)].append(field)
+    output = []
+    for family in sorted(families):
+        output.append("# TYPE {0} {1}".format(family, TYPES.get(family, 'untyped')))
+        for field in families[family]:
+            output.append("{0} {1}".format(field, repr(lines[field])))
+    output.append('')
+    return '\n'.join(output)
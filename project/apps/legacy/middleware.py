@@ -0,0 +1,394 @@
+# Standard Library
+import hashlib
+import logging
+import random
+import re
+import time
+import traceback
+import zlib
+from collections import Counter
+from contextlib import ExitStack
+from functools import partial
+
+# Third-Party
+import brotli
+import sentry_sdk
+
+# Django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.urls import Resolver404
+from django.urls import resolve
+from django.utils.cache import patch_vary_headers
+
+# Local
+from . import metrics
+from .dbrouters import get_replicas
+from .dbrouters import use_replica
+
+log = logging.getLogger(__name__)
+
+
+class QueryTimer(object):
+    """Execute wrapper counting and timing the queries of one request."""
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class MetricsMiddleware(object):
+    """Record per view and action latency, query and render metrics."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics.begin()
+        start = time.perf_counter()
+        request._metrics_labels = {
+            'view': 'unresolved',
+            'action': request.method.lower(),
+        }
+        timers = [QueryTimer(connection.alias) for connection in connections.all()]
+        with ExitStack() as stack:
+            for connection, timer in zip(connections.all(), timers):
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        labels = request._metrics_labels
+        recorder = metrics.get_recorder()
+        recorder.observe(
+            'legacy_request_duration_seconds',
+            time.perf_counter() - start,
+            **labels
+        )
+        recorder.inc(
+            'legacy_requests_total',
+            status="{0}xx".format(response.status_code // 100),
+            **labels
+        )
+        for timer in timers:
+            if not timer.count:
+                continue
+            recorder.inc('legacy_db_queries_total', timer.count, db=timer.alias, **labels)
+            recorder.observe(
+                'legacy_db_query_duration_seconds',
+                timer.duration,
+                db=timer.alias,
+                **labels
+            )
+        if recorder.serializer_time:
+            recorder.observe(
+                'legacy_serializer_duration_seconds',
+                recorder.serializer_time,
+                **labels
+            )
+        metrics.flush()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, 'cls', None)
+        if view is not None:
+            name = getattr(view, 'resource_name', None) or view.__name__
+        else:
+            name = request.resolver_match.url_name or view_func.__name__
+        actions = getattr(view_func, 'actions', None) or {}
+        request._metrics_labels = {
+            'view': name,
+            'action': actions.get(request.method.lower(), request.method.lower()),
+        }
+
+    def process_template_response(self, request, response):
+        start = time.perf_counter()
+        labels = request._metrics_labels
+
+        def rendered(response):
+            metrics.observe(
+                'legacy_render_duration_seconds',
+                time.perf_counter() - start,
+                **labels
+            )
+        response.add_post_render_callback(rendered)
+        return response
+
+
+class QueryShapeCounter(object):
+    """Execute wrapper counting normalized query shapes of one request."""
+
+    LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+    IN_LISTS = re.compile(r"\bIN \((?:[^()]*)\)", re.IGNORECASE)
+    SPACES = re.compile(r"\s+")
+
+    def __init__(self):
+        self.counts = Counter()
+        self.origins = {}
+
+    @classmethod
+    def normalize(cls, sql):
+        sql = cls.LITERALS.sub('?', sql)
+        sql = cls.IN_LISTS.sub('IN (...)', sql)
+        return cls.SPACES.sub(' ', sql).strip()
+
+    @staticmethod
+    def origin():
+        for frame in reversed(traceback.extract_stack()):
+            if not frame.filename.startswith(settings.BASE_DIR):
+                continue
+            if frame.filename == __file__:
+                continue
+            return "{0}:{1} in {2}: {3}".format(
+                frame.filename[len(settings.BASE_DIR) + 1:],
+                frame.lineno,
+                frame.name,
+                frame.line,
+            )
+        return 'unknown'
+
+    def __call__(self, execute, sql, params, many, context):
+        shape = self.normalize(sql)
+        self.counts[shape] += 1
+        # Only pay for the stack walk once a shape starts repeating.
+        if self.counts[shape] == 2:
+            self.origins[shape] = self.origin()
+        return execute(sql, params, many, context)
+
+
+class NPlusOneMiddleware(object):
+    """Report repeated query shapes on a sample of requests to Sentry."""
+
+    def __init__(self, get_response):
+        if not settings.NPLUSONE_SAMPLE_RATE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.rate = settings.NPLUSONE_SAMPLE_RATE
+        self.threshold = settings.NPLUSONE_THRESHOLD
+
+    def __call__(self, request):
+        if random.random() >= self.rate:
+            return self.get_response(request)
+        counter = QueryShapeCounter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        for shape, count in counter.counts.items():
+            if count >= self.threshold:
+                self.report(request, shape, count, counter.origins.get(shape))
+        return response
+
+    def report(self, request, shape, count, origin):
+        labels = getattr(request, '_metrics_labels', {})
+        view = "{0}.{1}".format(
+            labels.get('view', request.path),
+            labels.get('action', request.method.lower()),
+        )
+        digest = hashlib.sha1(shape.encode('utf-8')).hexdigest()[:12]
+        log.warning("N+1 in %s: %s x %s (%s)", view, count, shape, origin)
+        metrics.inc('legacy_n_plus_one_total', **labels)
+        with sentry_sdk.push_scope() as scope:
+            scope.fingerprint = ['n-plus-one', view, digest]
+            scope.set_tag('n_plus_one.view', view)
+            scope.set_extra('query', shape)
+            scope.set_extra('count', count)
+            scope.set_extra('origin', origin)
+            sentry_sdk.capture_message(
+                "N+1 query in {0}: {1} x {2}".format(view, count, shape[:120]),
+                level='warning',
+            )
+
+
+class ReplicaMiddleware(object):
+    """Route safe requests to replicas unless the client just wrote.
+
+    Unsafe requests to actions a view lists in ``replica_safe_actions``
+    only read, so they are routed like safe ones and pin nothing."""
+
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        if not get_replicas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    @staticmethod
+    def get_pin_key(request):
+        client = (
+            request.META.get('HTTP_AUTHORIZATION') or
+            request.COOKIES.get(settings.SESSION_COOKIE_NAME) or
+            request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')[0] or
+            request.META.get('REMOTE_ADDR', '')
+        )
+        digest = hashlib.sha1(client.encode('utf-8')).hexdigest()
+        return "legacy:pin:{0}".format(digest)
+
+    @staticmethod
+    def is_read_only(request):
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return False
+        action = getattr(match.func, 'actions', {}).get(request.method.lower())
+        view = getattr(match.func, 'cls', None)
+        return action in getattr(view, 'replica_safe_actions', ())
+
+    def __call__(self, request):
+        key = self.get_pin_key(request)
+        if request.method not in self.SAFE_METHODS and not self.is_read_only(request):
+            response = self.get_response(request)
+            if response.status_code < 400:
+                cache.set(key, 1, settings.REPLICA_PIN_SECONDS)
+            return response
+        if cache.get(key):
+            return self.get_response(request)
+        with use_replica():
+            return self.get_response(request)
+
+
+class RateLimitHeadersMiddleware(object):
+    """Report the tightest throttle quota recorded for the request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        quota = getattr(request, '_throttle_quota', None)
+        if quota is not None:
+            limit, remaining, reset = quota
+            response['X-RateLimit-Limit'] = limit
+            response['X-RateLimit-Remaining'] = remaining
+            response['X-RateLimit-Reset'] = reset
+        return response
+
+
+def parse_accept_encoding(header):
+    """Return the acceptable codings of an Accept-Encoding header."""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        if coding and quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def get_compressor(encoding):
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        return compressor.process, compressor.flush, compressor.finish
+    # 16 + MAX_WBITS selects the gzip container rather than raw zlib.
+    compressor = zlib.compressobj(
+        settings.COMPRESSION_GZIP_LEVEL,
+        zlib.DEFLATED,
+        16 + zlib.MAX_WBITS,
+    )
+    return (
+        compressor.compress,
+        partial(compressor.flush, zlib.Z_SYNC_FLUSH),
+        compressor.flush,
+    )
+
+
+def compress(content, encoding):
+    process, flush, finish = get_compressor(encoding)
+    return process(content) + finish()
+
+
+def compress_stream(chunks, encoding):
+    # Each chunk is flushed as it comes, so a client sees every event of a
+    # stream at once instead of when the compressor's buffer fills.
+    process, flush, finish = get_compressor(encoding)
+    for chunk in chunks:
+        data = process(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+
+class CompressionMiddleware(object):
+    """Brotli or gzip compress API responses the client accepts.
+
+    Large bodies, such as list pages clients fetch repeatedly, are cached
+    compressed by the hash of the uncompressed body, so they are compressed
+    once across requests and workers.  Anything smaller compresses faster
+    than a Redis round trip."""
+
+    CONTENT_TYPES = (
+        'application/json',
+        'application/vnd.api+json',
+        'application/msgpack',
+        'application/vnd.api+msgpack',
+    )
+    ENCODINGS = (
+        'br',
+        'gzip',
+    )
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def get_encoding(self, request):
+        accepted = parse_accept_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        for encoding in self.ENCODINGS:
+            if encoding in accepted:
+                return encoding
+        return None
+
+    def get_compressed(self, response, encoding):
+        content = response.content
+        if len(content) < settings.COMPRESSION_CACHE_MIN_SIZE:
+            return compress(content, encoding)
+        key = "legacy:compressed:{0}:{1}".format(
+            encoding,
+            hashlib.sha1(content).hexdigest(),
+        )
+        compressed = cache.get(key)
+        metrics.observe_cache('compression', compressed is not None)
+        if compressed is None:
+            compressed = compress(content, encoding)
+            cache.set(key, compressed, settings.COMPRESSION_CACHE_TTL)
+        return compressed
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if content_type not in self.CONTENT_TYPES or response.has_header('Content-Encoding'):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self.get_encoding(request)
+        if encoding is None:
+            return response
+        if response.streaming:
+            response.streaming_content = compress_stream(response.streaming_content, encoding)
+            del response['Content-Length']
+        else:
+            if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+                return response
+            compressed = self.get_compressed(response, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+        # The body is no longer byte for byte what a strong ETag promised.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # Indexes are built concurrently so the hot table is never locked.
+    atomic = False
+
+    dependencies = [
+        ('legacy', '0002_remove_person_mon'),
+        ('django_fsm_log', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS legacy_statelog_history_idx
+                ON django_fsm_log_statelog (content_type_id, object_id, "timestamp" DESC, id DESC)
+            """,
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS legacy_statelog_history_idx",
+        ),
+        migrations.RunSQL(
+            sql="""
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS legacy_statelog_timestamp_idx
+                ON django_fsm_log_statelog ("timestamp")
+            """,
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS legacy_statelog_timestamp_idx",
+        ),
+        migrations.RunSQL(
+            sql="""
+                CREATE TABLE IF NOT EXISTS legacy_statelog_archive (
+                    LIKE django_fsm_log_statelog
+                ) PARTITION BY RANGE ("timestamp")
+            """,
+            reverse_sql="DROP TABLE IF EXISTS legacy_statelog_archive",
+        ),
+    ]
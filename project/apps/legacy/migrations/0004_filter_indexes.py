@@ -0,0 +1,55 @@
+from django.db import migrations
+from django.db import models
+
+
+def create_index(table, name, columns, field_names=None, opclasses=()):
+    """Build an index concurrently while recording it in the model state."""
+    state_operations = []
+    if field_names is not None:
+        state_operations.append(migrations.AddIndex(
+            model_name=table.split('_', 1)[1],
+            index=models.Index(
+                fields=field_names,
+                name=name,
+                opclasses=list(opclasses),
+            ),
+        ))
+    return migrations.RunSQL(
+        sql="CREATE INDEX CONCURRENTLY IF NOT EXISTS {0} ON {1} ({2})".format(
+            name,
+            table,
+            columns,
+        ),
+        reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS {0}".format(name),
+        state_operations=state_operations,
+    )
+
+
+class Migration(migrations.Migration):
+
+    # Indexes are built concurrently so the hot tables are never locked.
+    atomic = False
+
+    dependencies = [
+        ('legacy', '0003_statelog_history'),
+    ]
+
+    operations = [
+        create_index('legacy_group', 'legacy_group_kind_idx', 'kind', ['kind']),
+        create_index('legacy_group', 'legacy_group_gender_idx', 'gender', ['gender']),
+        create_index('legacy_group', 'legacy_group_status_idx', 'status', ['status']),
+        # Matches the UPPER(email::text) that iexact lookups compile to.
+        create_index('legacy_group', 'legacy_group_email_upper_idx', 'UPPER(email::text)'),
+        create_index('legacy_person', 'legacy_person_bhs_id_idx', 'bhs_id', ['bhs_id']),
+        create_index('legacy_person', 'legacy_person_gender_idx', 'gender', ['gender']),
+        create_index('legacy_person', 'legacy_person_part_idx', 'part', ['part']),
+        create_index('legacy_person', 'legacy_person_status_idx', 'status', ['status']),
+        create_index(
+            'legacy_person',
+            'legacy_person_last_name_idx',
+            'last_name varchar_pattern_ops',
+            ['last_name'],
+            ['varchar_pattern_ops'],
+        ),
+        create_index('legacy_person', 'legacy_person_email_upper_idx', 'UPPER(email::text)'),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+from django.db import models
+
+
+def rebuild_stats(apps, schema_editor):
+    from apps.legacy.stats import rebuild
+    rebuild(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('legacy', '0004_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Stat',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=50)),
+                ('dimension', models.CharField(max_length=50)),
+                ('value', models.CharField(blank=True, default='', help_text='\n            The stored value; blank when unset.', max_length=50)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('model', 'dimension', 'value')},
+            },
+        ),
+        migrations.RunPython(
+            rebuild_stats,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,56 @@
+from django.db import migrations
+from django.db import models
+
+
+def load_airports(apps, schema_editor):
+    from apps.legacy.geo import load_airports
+    load_airports(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('legacy', '0005_stat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Airport',
+            fields=[
+                ('code', models.CharField(help_text='\n            The IATA code.', max_length=3, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255)),
+                ('city', models.CharField(blank=True, default='', max_length=255)),
+                ('region', models.CharField(blank=True, default='', help_text='\n            ISO 3166-2 region, eg US-TN.', max_length=10)),
+                ('country', models.CharField(blank=True, default='', max_length=2)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+            ],
+            options={
+                'ordering': ['code'],
+            },
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, help_text='\n            Geocoded from the location.', null=True),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, help_text='\n            Geocoded from the location.', null=True),
+        ),
+        migrations.AddField(
+            model_name='person',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, help_text='\n            Geocoded from the location.', null=True),
+        ),
+        migrations.AddField(
+            model_name='person',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, help_text='\n            Geocoded from the location.', null=True),
+        ),
+        migrations.RunPython(
+            load_airports,
+            migrations.RunPython.noop,
+        ),
+    ]
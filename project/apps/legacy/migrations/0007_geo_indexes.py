@@ -0,0 +1,55 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.db import migrations
+from django.db import models
+
+
+class Migration(migrations.Migration):
+
+    # Indexes are built concurrently so the hot tables are never locked.
+    atomic = False
+
+    dependencies = [
+        ('legacy', '0006_airport'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS legacy_person_airports_idx
+                ON legacy_person USING gin (airports)
+            """,
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS legacy_person_airports_idx",
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='person',
+                    index=GinIndex(fields=['airports'], name='legacy_person_airports_idx'),
+                ),
+            ],
+        ),
+        migrations.RunSQL(
+            sql="""
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS legacy_person_latlon_idx
+                ON legacy_person (latitude, longitude)
+            """,
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS legacy_person_latlon_idx",
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='person',
+                    index=models.Index(fields=['latitude', 'longitude'], name='legacy_person_latlon_idx'),
+                ),
+            ],
+        ),
+        migrations.RunSQL(
+            sql="""
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS legacy_group_latlon_idx
+                ON legacy_group (latitude, longitude)
+            """,
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS legacy_group_latlon_idx",
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='group',
+                    index=models.Index(fields=['latitude', 'longitude'], name='legacy_group_latlon_idx'),
+                ),
+            ],
+        ),
+    ]
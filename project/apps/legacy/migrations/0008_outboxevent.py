@@ -0,0 +1,30 @@
+import django.contrib.postgres.fields.jsonb
+import django.utils.timezone
+from django.db import migrations
+from django.db import models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('legacy', '0007_geo_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('topic', models.CharField(help_text='\n            The model of the changed object, eg group.', max_length=50)),
+                ('action', models.CharField(help_text='\n            created, updated, deleted, transition or owners.', max_length=20)),
+                ('object_id', models.CharField(max_length=36)),
+                ('data', django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('available', models.DateTimeField(default=django.utils.timezone.now, help_text='\n            Not delivered before this time; pushed back after failures.')),
+                ('attempts', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['available', 'id'], name='legacy_outbox_available_idx')],
+            },
+        ),
+    ]
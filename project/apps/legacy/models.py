@@ -1,4 +1,5 @@
 # Standard Library
+import copy
 import datetime
 import uuid
 
@@ -11,6 +12,7 @@ from django_fsm_log.models import StateLog
 from dry_rest_permissions.generics import allow_staff_or_superuser
 from dry_rest_permissions.generics import authenticated_users
 from model_utils import Choices
+from model_utils.fields import AutoLastModifiedField
 from model_utils.models import TimeStampedModel
 from openpyxl import Workbook
 from openpyxl.writer.excel import save_virtual_workbook
@@ -21,16 +23,118 @@ from django.apps import apps
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericRelation
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.fields import JSONField
+from django.contrib.postgres.indexes import GinIndex
 from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
 from django.db import models
+from django.utils import timezone
 from django.utils.functional import cached_property
 
 # Local
+from .exceptions import PreconditionFailed
 from .fields import ImageUploadPath
+from .geo import geocode
+from .geo import get_airport_coordinates
+from .ownership import is_owner
+
+
+class LoadedValuesMixin(object):
+    """Remember the field values an instance was loaded or last saved with.
+
+    Saves of loaded instances write only the changed columns; with none
+    changed, ``save`` returns without a query or the save signals.  When
+    ``_expected_modified`` is set the UPDATE only applies if the row still
+    has that ``modified``, raising PreconditionFailed otherwise."""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: copy.copy(value) for name, value in zip(field_names, values)
+        }
+        return instance
+
+    def get_changed_fields(self):
+        """Names of fields changed since loading, or None if unknown."""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return None
+        deferred = self.get_deferred_fields()
+        return [
+            field.name for field in self._meta.concrete_fields
+            if field.attname not in deferred and
+            field.attname in loaded and
+            getattr(self, field.attname) != loaded[field.attname]
+        ]
+
+    def save(self, *args, **kwargs):
+        if not args and not self._state.adding and not kwargs.get('force_insert') \
+                and kwargs.get('update_fields') is None:
+            changed = self.get_changed_fields()
+            if changed is not None:
+                if not changed:
+                    return
+                kwargs['update_fields'] = changed + [
+                    field.name for field in self._meta.concrete_fields
+                    if isinstance(field, AutoLastModifiedField) and field.name not in changed
+                ]
+        super().save(*args, **kwargs)
+        if getattr(self, '_expected_modified', None) is not None:
+            self._expected_modified = self.modified
+        update_fields = kwargs.get('update_fields')
+        deferred = self.get_deferred_fields()
+        loaded = getattr(self, '_loaded_values', None) or {}
+        for field in self._meta.concrete_fields:
+            if field.attname in deferred:
+                continue
+            if update_fields is not None and field.name not in update_fields:
+                continue
+            loaded[field.attname] = copy.copy(getattr(self, field.attname))
+        self._loaded_values = loaded
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        expected = getattr(self, '_expected_modified', None)
+        if expected is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        updated = super()._do_update(
+            base_qs.filter(modified=expected),
+            using,
+            pk_val,
+            values,
+            update_fields,
+            forced_update,
+        )
+        if not updated and base_qs.filter(pk=pk_val).exists():
+            raise PreconditionFailed()
+        return updated
+
+
+class LocatedMixin(object):
+    """Keep ``latitude``/``longitude`` geocoded from ``location``.
+
+    Falls back to the first listed airport where the model has them."""
+
+    def locate(self):
+        loaded = getattr(self, '_loaded_values', None) or {}
+        if (
+            self.latitude is not None and
+            loaded.get('location') == self.location and
+            loaded.get('airports') == getattr(self, 'airports', None)
+        ):
+            return
+        coordinates = geocode(self.location)
+        airports = getattr(self, 'airports', None)
+        if coordinates is None and airports:
+            coordinates = get_airport_coordinates(airports[0])
+        self.latitude, self.longitude = coordinates or (None, None)
+
+    def save(self, *args, **kwargs):
+        self.locate()
+        super().save(*args, **kwargs)
 
 
-class Group(TimeStampedModel):
+class Group(LocatedMixin, LoadedValuesMixin, TimeStampedModel):
     id = models.UUIDField(
         primary_key=True,
         default=uuid.uuid4,
@@ -151,6 +255,22 @@ class Group(TimeStampedModel):
         default='',
     )
 
+    latitude = models.FloatField(
+        help_text="""
+            Geocoded from the location.""",
+        blank=True,
+        null=True,
+        editable=False,
+    )
+
+    longitude = models.FloatField(
+        help_text="""
+            Geocoded from the location.""",
+        blank=True,
+        null=True,
+        editable=False,
+    )
+
     facebook = models.URLField(
         help_text="""
             The facebook URL of the resource.""",
@@ -309,6 +429,12 @@ class Group(TimeStampedModel):
 
     class Meta:
         verbose_name_plural = 'Groups'
+        indexes = [
+            models.Index(fields=['kind'], name='legacy_group_kind_idx'),
+            models.Index(fields=['gender'], name='legacy_group_gender_idx'),
+            models.Index(fields=['status'], name='legacy_group_status_idx'),
+            models.Index(fields=['latitude', 'longitude'], name='legacy_group_latlon_idx'),
+        ]
 
     class JSONAPIMeta:
         resource_name = "group"
@@ -331,6 +457,13 @@ class Group(TimeStampedModel):
     def has_object_read_permission(self, request):
         return True
 
+    @staticmethod
+    @allow_staff_or_superuser
+    @authenticated_users
+    def has_lookup_permission(request):
+        # A POSTed bulk read; without this DRY treats it as a write.
+        return True
+
     @staticmethod
     @allow_staff_or_superuser
     @authenticated_users
@@ -353,7 +486,7 @@ class Group(TimeStampedModel):
                 'Librarian' in request.user.roles.values_list('name'),
             ]),
             all([
-                self.owners.filter(id__contains=request.user.id),
+                is_owner(self, request.user),
             ]),
         ])
 
@@ -397,7 +530,7 @@ class Group(TimeStampedModel):
         return
 
 
-class Person(TimeStampedModel):
+class Person(LocatedMixin, LoadedValuesMixin, TimeStampedModel):
     id = models.UUIDField(
         primary_key=True,
         default=uuid.uuid4,
@@ -479,6 +612,22 @@ class Person(TimeStampedModel):
         default='',
     )
 
+    latitude = models.FloatField(
+        help_text="""
+            Geocoded from the location.""",
+        blank=True,
+        null=True,
+        editable=False,
+    )
+
+    longitude = models.FloatField(
+        help_text="""
+            Geocoded from the location.""",
+        blank=True,
+        null=True,
+        editable=False,
+    )
+
     PART = Choices(
         (1, 'tenor', 'Tenor'),
         (2, 'lead', 'Lead'),
@@ -718,6 +867,20 @@ class Person(TimeStampedModel):
 
     class Meta:
         verbose_name_plural = 'Persons'
+        indexes = [
+            models.Index(fields=['bhs_id'], name='legacy_person_bhs_id_idx'),
+            models.Index(fields=['gender'], name='legacy_person_gender_idx'),
+            models.Index(fields=['part'], name='legacy_person_part_idx'),
+            models.Index(fields=['status'], name='legacy_person_status_idx'),
+            # Serves prefix (LIKE 'x%') matches whatever the collation.
+            models.Index(
+                fields=['last_name'],
+                name='legacy_person_last_name_idx',
+                opclasses=['varchar_pattern_ops'],
+            ),
+            GinIndex(fields=['airports'], name='legacy_person_airports_idx'),
+            models.Index(fields=['latitude', 'longitude'], name='legacy_person_latlon_idx'),
+        ]
 
     class JSONAPIMeta:
         resource_name = "person"
@@ -740,6 +903,13 @@ class Person(TimeStampedModel):
     def has_object_read_permission(self, request):
         return True
 
+    @staticmethod
+    @allow_staff_or_superuser
+    @authenticated_users
+    def has_lookup_permission(request):
+        # A POSTed bulk read; without this DRY treats it as a write.
+        return True
+
     @staticmethod
     @allow_staff_or_superuser
     @authenticated_users
@@ -765,3 +935,138 @@ class Person(TimeStampedModel):
     def deactivate(self, description=None, *args, **kwargs):
         """Deactivate the Person."""
         return
+
+
+class Airport(models.Model):
+    code = models.CharField(
+        help_text="""
+            The IATA code.""",
+        primary_key=True,
+        max_length=3,
+    )
+
+    name = models.CharField(
+        max_length=255,
+    )
+
+    city = models.CharField(
+        max_length=255,
+        blank=True,
+        default='',
+    )
+
+    region = models.CharField(
+        help_text="""
+            ISO 3166-2 region, eg US-TN.""",
+        max_length=10,
+        blank=True,
+        default='',
+    )
+
+    country = models.CharField(
+        max_length=2,
+        blank=True,
+        default='',
+    )
+
+    latitude = models.FloatField()
+
+    longitude = models.FloatField()
+
+    class Meta:
+        ordering = ['code']
+
+    def __str__(self):
+        return self.code
+
+
+class Stat(models.Model):
+    """Row count of a model for one value of one dimension."""
+
+    model = models.CharField(
+        max_length=50,
+    )
+
+    dimension = models.CharField(
+        max_length=50,
+    )
+
+    value = models.CharField(
+        help_text="""
+            The stored value; blank when unset.""",
+        max_length=50,
+        blank=True,
+        default='',
+    )
+
+    count = models.IntegerField(
+        default=0,
+    )
+
+    class Meta:
+        unique_together = (
+            ('model', 'dimension', 'value'),
+        )
+
+    def __str__(self):
+        return "{0}.{1}={2}".format(self.model, self.dimension, self.value)
+
+
+class OutboxEvent(models.Model):
+    """A change event written in the changing transaction, drained by RQ."""
+
+    id = models.BigAutoField(
+        primary_key=True,
+    )
+
+    topic = models.CharField(
+        help_text="""
+            The model of the changed object, eg group.""",
+        max_length=50,
+    )
+
+    action = models.CharField(
+        help_text="""
+            created, updated, deleted, transition or owners.""",
+        max_length=20,
+    )
+
+    object_id = models.CharField(
+        max_length=36,
+    )
+
+    data = JSONField(
+        blank=True,
+        default=dict,
+    )
+
+    created = models.DateTimeField(
+        default=timezone.now,
+    )
+
+    available = models.DateTimeField(
+        help_text="""
+            Not delivered before this time; pushed back after failures.""",
+        default=timezone.now,
+    )
+
+    attempts = models.IntegerField(
+        default=0,
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['available', 'id'], name='legacy_outbox_available_idx'),
+        ]
+
+    def __str__(self):
+        return "{0}.{1} {2}".format(self.topic, self.action, self.object_id)
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'type': "{0}.{1}".format(self.topic, self.action),
+            'object_id': self.object_id,
+            'data': self.data,
+            'created': self.created.isoformat(),
+        }
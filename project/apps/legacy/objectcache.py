@@ -0,0 +1,207 @@
+"""
+Two-tier read-through cache of Group and Person instances.
+
+Each worker keeps a bounded LRU in front of a shared Redis copy.  Writes
+invalidate after commit: the Redis copy is replaced by a short-lived
+tombstone, so readers that loaded before the commit cannot put the old
+row back, and a pub/sub message tells every worker to evict its copy.
+A worker that is not subscribed, say while reconnecting, bypasses its
+LRU until it is again.  Prefetched relations are not cached, so callers
+prefetch them afresh, and keys carry a digest of the model's columns so
+a deploy that changes them never unpickles an old row.
+"""
+
+# Standard Library
+import copy
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+
+# Third-Party
+import redis
+from django_redis import get_redis_connection
+
+# Django
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# Local
+from . import metrics
+
+log = logging.getLogger(__name__)
+
+OBJECT_KEY = 'legacy:object:{0}:{1}:{2}'
+CHANNEL = 'legacy:object:invalidate'
+TOMBSTONE = '-'
+# Longer than any read of an object takes, so stale loads are refused.
+TOMBSTONE_TTL = 10
+
+
+_versions = {}
+
+
+def get_version(model):
+    """Short digest of the model's columns, which pickled rows depend on."""
+    version = _versions.get(model)
+    if version is None:
+        columns = ','.join(field.column for field in model._meta.concrete_fields)
+        version = hashlib.sha1(columns.encode('utf-8')).hexdigest()[:8]
+        _versions[model] = version
+    return version
+
+
+def get_key(model, pk):
+    return OBJECT_KEY.format(model._meta.model_name, get_version(model), pk)
+
+
+def clone(instance):
+    """Shallow copy that shares no mutable state with ``instance``."""
+    clone = copy.copy(instance)
+    clone._state = copy.copy(instance._state)
+    clone._state.fields_cache = dict(instance._state.fields_cache)
+    for name in ('_prefetched_objects_cache', '_loaded_values'):
+        if name in instance.__dict__:
+            setattr(clone, name, dict(instance.__dict__[name]))
+    return clone
+
+
+def strip(instance):
+    """Copy of ``instance`` fit to cache, without prefetched relations."""
+    stripped = clone(instance)
+    stripped.__dict__.pop('_prefetched_objects_cache', None)
+    return stripped
+
+
+class ObjectCache(object):
+
+    def __init__(self, maxsize, ttl, local_ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.pid = None
+        self.listening = False
+        # Bumped on every eviction so loads racing one are not kept.
+        self.generation = 0
+
+    def listen(self):
+        while True:
+            try:
+                # Its own connection: a subscriber holds one for good, which
+                # would starve the cache's bounded pool.
+                pubsub = redis.Redis.from_url(
+                    settings.CACHES['default']['LOCATION'],
+                    health_check_interval=30,
+                ).pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CHANNEL)
+                self.listening = True
+                for message in pubsub.listen():
+                    self.evict(message['data'].decode('utf-8'))
+            except Exception:
+                log.exception("Object cache invalidation listener failed")
+            # Messages may have been missed; start again from empty.
+            self.listening = False
+            self.clear()
+            time.sleep(1)
+
+    def start(self):
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            # A forked worker inherits the parent's entries but not its thread.
+            self.data.clear()
+            self.listening = False
+            thread = threading.Thread(target=self.listen, name='object-cache', daemon=True)
+            thread.start()
+            self.pid = os.getpid()
+
+    def evict(self, key):
+        with self.lock:
+            self.generation += 1
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.data.clear()
+
+    def get_local(self, key):
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                return None
+            instance, expires = entry
+            if expires <= time.monotonic():
+                del self.data[key]
+                return None
+            self.data.move_to_end(key)
+            return instance
+
+    def set_local(self, key, instance, generation):
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.data[key] = (instance, time.monotonic() + self.local_ttl)
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def get(self, model, pk, load):
+        """Return a copy of the ``model`` row ``pk``, calling ``load`` on a miss.
+
+        Only a freshly loaded copy keeps the relations ``load`` prefetched."""
+        if self.pid != os.getpid():
+            self.start()
+        key = get_key(model, pk)
+        local = self.listening and self.maxsize > 0
+        if local:
+            instance = self.get_local(key)
+            metrics.observe_cache('object_local', instance is not None)
+            if instance is not None:
+                return clone(instance)
+        generation = self.generation
+        cached = cache.get(key)
+        metrics.observe_cache('object', cached is not None and cached != TOMBSTONE)
+        if cached is None or cached == TOMBSTONE:
+            instance = load()
+            stripped = strip(instance)
+            if cached is None:
+                # Never overwrites a tombstone written since the miss.
+                cache.add(key, stripped, self.ttl)
+        else:
+            instance = stripped = cached
+        if local:
+            self.set_local(key, stripped, generation)
+        return clone(instance)
+
+    def invalidate(self, model, pk):
+        key = get_key(model, pk)
+        try:
+            cache.set(key, TOMBSTONE, TOMBSTONE_TTL)
+            get_redis_connection('default').publish(CHANNEL, key)
+        except Exception:
+            log.exception("Could not invalidate %s", key)
+        self.evict(key)
+
+    def invalidate_on_commit(self, instance):
+        transaction.on_commit(partial(self.invalidate, type(instance), instance.pk))
+
+    def size(self):
+        if self.pid != os.getpid():
+            return []
+        return [({}, len(self.data))]
+
+
+object_cache = ObjectCache(
+    settings.OBJECT_CACHE_SIZE,
+    settings.OBJECT_CACHE_TTL,
+    settings.OBJECT_CACHE_LOCAL_TTL,
+)
+
+metrics.register_gauge('legacy_object_cache_entries', object_cache.size)
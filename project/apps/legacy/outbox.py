@@ -0,0 +1,180 @@
+"""
+Transactional outbox for Group and Person change events.
+
+Events are inserted by signal receivers inside the changing transaction,
+so they exist exactly when the change commits.  After commit a drain is
+enqueued on RQ; it claims batches with ``SKIP LOCKED`` and hands them to
+every configured sink.  Delivery is at least once: a failing sink pushes
+the whole batch back with exponential backoff, and events carry their
+id so consumers can drop repeats.  Each drain schedules the next one for
+when the earliest backed-off event is due, so retries do not wait for
+another write.  Events that fail OUTBOX_MAX_ATTEMPTS times are kept but
+no longer drained; ``drain_outbox --retry-dead`` puts them back.
+"""
+
+# Standard Library
+import datetime
+import hashlib
+import hmac
+import json
+import logging
+
+# Third-Party
+import requests
+
+# Django
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+# Local
+from . import metrics
+from .models import OutboxEvent
+
+log = logging.getLogger(__name__)
+
+
+class DeliveryError(Exception):
+    pass
+
+
+class LoggingSink(object):
+    """Write each event to the log; useful locally and as a template."""
+
+    def deliver(self, events):
+        for event in events:
+            log.info("Outbox event %s", json.dumps(event, cls=DjangoJSONEncoder))
+
+
+class WebhookSink(object):
+    """POST batches to each of OUTBOX_WEBHOOK_URLS.
+
+    Bodies are signed with OUTBOX_WEBHOOK_SECRET when it is set."""
+
+    def __init__(self):
+        self.urls = settings.OUTBOX_WEBHOOK_URLS
+        self.session = requests.Session()
+
+    def sign(self, body):
+        if not settings.OUTBOX_WEBHOOK_SECRET:
+            return {}
+        digest = hmac.new(
+            settings.OUTBOX_WEBHOOK_SECRET.encode('utf-8'),
+            body,
+            hashlib.sha256,
+        ).hexdigest()
+        return {'X-Legacy-Signature': "sha256={0}".format(digest)}
+
+    def deliver(self, events):
+        body = json.dumps({'events': events}, cls=DjangoJSONEncoder).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        headers.update(self.sign(body))
+        for url in self.urls:
+            try:
+                response = self.session.post(
+                    url,
+                    data=body,
+                    headers=headers,
+                    timeout=settings.OUTBOX_WEBHOOK_TIMEOUT,
+                )
+                response.raise_for_status()
+            except requests.RequestException as e:
+                raise DeliveryError("Webhook {0} failed: {1}".format(url, e)) from e
+
+
+_sinks = None
+
+
+def get_sinks():
+    global _sinks
+    if _sinks is None:
+        _sinks = [import_string(path)() for path in settings.OUTBOX_SINKS]
+    return _sinks
+
+
+def schedule_drain():
+    from .tasks import drain_outbox
+    drain_outbox.delay()
+
+
+def record(instance, action, **data):
+    """Write an event for ``instance`` in the current transaction."""
+    OutboxEvent.objects.create(
+        topic=instance._meta.model_name,
+        action=action,
+        object_id=str(instance.pk),
+        data=data,
+    )
+    # One drain per transaction, however many events it writes.
+    if not any(func is schedule_drain for sids, func in connection.run_on_commit):
+        transaction.on_commit(schedule_drain)
+
+
+def get_backoff(attempts):
+    return datetime.timedelta(
+        seconds=min(settings.OUTBOX_BACKOFF * 2 ** attempts, settings.OUTBOX_BACKOFF_MAX),
+    )
+
+
+def drain(batch_size=None):
+    """Deliver pending events in id order; returns the number delivered.
+
+    Stops at the first failing batch so a slow or broken downstream
+    holds events back instead of being hammered."""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    sinks = get_sinks()
+    delivered = 0
+    while True:
+        with transaction.atomic():
+            events = list(OutboxEvent.objects.select_for_update(
+                skip_locked=True,
+            ).filter(
+                available__lte=timezone.now(),
+                attempts__lt=settings.OUTBOX_MAX_ATTEMPTS,
+            ).order_by('id')[:batch_size])
+            if not events:
+                return delivered
+            payload = [event.as_dict() for event in events]
+            try:
+                for sink in sinks:
+                    sink.deliver(payload)
+            except Exception:
+                log.exception("Outbox delivery of %s events failed", len(events))
+                for event in events:
+                    event.attempts += 1
+                    event.available = timezone.now() + get_backoff(event.attempts)
+                    if event.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                        log.error(
+                            "Outbox event %s (%s) is dead after %s attempts",
+                            event.pk,
+                            event,
+                            event.attempts,
+                        )
+                        metrics.inc('legacy_outbox_dead_total', topic=event.topic)
+                OutboxEvent.objects.bulk_update(events, ['attempts', 'available'])
+                failed = True
+            else:
+                OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).delete()
+                delivered += len(events)
+                failed = False
+        if failed:
+            # Raised outside the block so the backoff is committed.
+            raise DeliveryError("Outbox delivery failed; will retry")
+
+
+def get_next_due():
+    """When the earliest undelivered, live event is due, or None."""
+    return OutboxEvent.objects.filter(
+        attempts__lt=settings.OUTBOX_MAX_ATTEMPTS,
+    ).aggregate(due=Min('available'))['due']
+
+
+def retry_dead():
+    """Make events that ran out of attempts deliverable again; returns the count."""
+    return OutboxEvent.objects.filter(
+        attempts__gte=settings.OUTBOX_MAX_ATTEMPTS,
+    ).update(attempts=0, available=timezone.now())
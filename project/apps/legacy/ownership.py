@@ -0,0 +1,76 @@
+# Third-Party
+from django_redis import get_redis_connection
+
+# Local
+from . import metrics
+
+OWNED_KEY = 'legacy:owned:{0}:{1}'
+OWNED_TTL = 60 * 60 * 24
+# Marks a set as loaded, so an empty ownership set is still a cache hit.
+LOADED = '-'
+
+
+def get_key(model, user_id):
+    return OWNED_KEY.format(model._meta.model_name, user_id)
+
+
+def load(model, user_id):
+    ids = [str(x) for x in model.objects.filter(
+        owners__id=user_id,
+    ).values_list('id', flat=True)]
+    key = get_key(model, user_id)
+    pipe = get_redis_connection('default').pipeline()
+    pipe.delete(key)
+    pipe.sadd(key, LOADED, *ids)
+    pipe.expire(key, OWNED_TTL)
+    pipe.execute()
+    return set(ids)
+
+
+def get_owned_ids(model, user):
+    """Return the ids of ``model`` rows owned by ``user`` as strings."""
+    members = get_redis_connection('default').smembers(get_key(model, user.pk))
+    ids = set(x.decode('utf-8') for x in members)
+    hit = LOADED in ids
+    metrics.observe_cache('ownership', hit)
+    if not hit:
+        return load(model, user.pk)
+    ids.discard(LOADED)
+    return ids
+
+
+def is_owner(instance, user):
+    key = get_key(type(instance), user.pk)
+    pipe = get_redis_connection('default').pipeline(transaction=False)
+    pipe.sismember(key, LOADED)
+    pipe.sismember(key, str(instance.pk))
+    loaded, member = pipe.execute()
+    metrics.observe_cache('ownership', loaded)
+    if not loaded:
+        return str(instance.pk) in load(type(instance), user.pk)
+    return bool(member)
+
+
+def add(model, user_ids, object_ids):
+    if not object_ids:
+        return
+    pipe = get_redis_connection('default').pipeline(transaction=False)
+    for user_id in user_ids:
+        # Sets that were never loaded stay unmarked and reload on next read.
+        pipe.sadd(get_key(model, user_id), *[str(x) for x in object_ids])
+    pipe.execute()
+
+
+def remove(model, user_ids, object_ids):
+    if not object_ids:
+        return
+    pipe = get_redis_connection('default').pipeline(transaction=False)
+    for user_id in user_ids:
+        pipe.srem(get_key(model, user_id), *[str(x) for x in object_ids])
+    pipe.execute()
+
+
+def forget(model, user_ids):
+    keys = [get_key(model, user_id) for user_id in user_ids]
+    if keys:
+        get_redis_connection('default').delete(*keys)
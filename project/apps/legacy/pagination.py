@@ -0,0 +1,280 @@
+# Standard Library
+import hashlib
+import json
+from collections import OrderedDict
+
+# Third-Party
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+from rest_framework_json_api.pagination import JsonApiPageNumberPagination
+
+# Django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import InvalidPage
+from django.core.paginator import Page
+from django.core.paginator import PageNotAnInteger
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+# Local
+from . import metrics
+from .singleflight import get_digest
+from .singleflight import single_flight
+
+COUNT_KEY = 'legacy:count:{0}'
+
+AUTO = 'auto'
+EXACT = 'exact'
+CACHED = 'cached'
+ESTIMATE = 'estimate'
+PRECISIONS = (
+    AUTO,
+    EXACT,
+    CACHED,
+    ESTIMATE,
+)
+
+
+class HistoryPagination(CursorPagination):
+    """Keyset paging over transition history, newest first."""
+
+    cursor_query_param = 'page[cursor]'
+    page_size_query_param = 'page[size]'
+    max_page_size = 1000
+    ordering = (
+        '-timestamp',
+        '-id',
+    )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'results': data,
+            'meta': {
+                'pagination': OrderedDict([
+                    ('size', self.page_size),
+                ])
+            },
+            'links': OrderedDict([
+                ('next', self.get_next_link()),
+                ('prev', self.get_previous_link()),
+            ])
+        })
+
+
+def get_exact_count(queryset):
+    return queryset.count()
+
+
+def get_cached_count(queryset):
+    """Exact count, cached per distinct filtered SQL for COUNT_CACHE_TTL."""
+    try:
+        sql, params = queryset.order_by().query.get_compiler(queryset.db).as_sql()
+    except EmptyResultSet:
+        # .none(), or a filter such as __in=[] that can match nothing.
+        return 0
+    digest = hashlib.sha1(
+        "{0}:{1}:{2}".format(queryset.db, sql, params).encode('utf-8'),
+    ).hexdigest()
+    key = COUNT_KEY.format(digest)
+    count = cache.get(key)
+    metrics.observe_cache('count', count is not None)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.COUNT_CACHE_TTL)
+    return count
+
+
+def get_estimated_count(queryset):
+    """Planner row estimate, or None where no useful estimate exists."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    query = queryset.query
+    with connection.cursor() as cursor:
+        if not query.where and not query.distinct and not query.combinator:
+            # Unfiltered: the table statistics maintained by ANALYZE.
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            if row is None or row[0] < 0:
+                return None
+            return row[0]
+        try:
+            sql, params = queryset.order_by().query.get_compiler(queryset.db).as_sql()
+        except EmptyResultSet:
+            return 0
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def get_count(queryset, precision=AUTO):
+    """Return ``(count, precision)`` where precision is what was achieved.
+
+    ``auto`` estimates first and only counts exactly (cached) when the
+    estimate is below COUNT_EXACT_BELOW, where counting is cheap."""
+    if precision == EXACT:
+        return get_exact_count(queryset), EXACT
+    if precision == CACHED:
+        return get_cached_count(queryset), CACHED
+    estimate = get_estimated_count(queryset)
+    if estimate is None:
+        return get_cached_count(queryset), CACHED
+    if precision == AUTO and estimate < settings.COUNT_EXACT_BELOW:
+        return get_cached_count(queryset), CACHED
+    return estimate, ESTIMATE
+
+
+class EstimatedPage(Page):
+
+    def has_next(self):
+        return self.more
+
+
+class CountPaginator(Paginator):
+    """Paginator whose count may be a cached or estimated figure.
+
+    When the count is estimated, pages are not bounded by it; instead one
+    extra row is fetched to tell whether a next page exists."""
+
+    def __init__(self, object_list, per_page, precision=AUTO, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.precision = precision
+
+    @cached_property
+    def count(self):
+        count, self.precision = get_count(self.object_list, self.precision)
+        return count
+
+    def validate_number(self, number):
+        # Counting first settles which precision was achieved.
+        self.count
+        if self.precision != ESTIMATE:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise InvalidPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if self.precision != ESTIMATE:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise InvalidPage('That page contains no results')
+        page = EstimatedPage(rows[:self.per_page], number, self)
+        page.more = len(rows) > self.per_page
+        return page
+
+
+class CountPrecisionPagination(JsonApiPageNumberPagination):
+    """JSON:API page numbers with a ``page[count]`` precision choice.
+
+    Clients may ask for ``exact``, ``cached`` or ``estimate``; by default
+    large results are estimated from the planner.  The precision actually
+    used is reported as ``meta.pagination.precision``."""
+
+    precision_query_param = 'page[count]'
+
+    def get_precision(self, request):
+        precision = request.query_params.get(self.precision_query_param, AUTO)
+        if precision not in PRECISIONS:
+            return AUTO
+        return precision
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.precision = self.get_precision(request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, object_list, per_page):
+        return CountPaginator(object_list, per_page, precision=self.precision)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['meta']['pagination']['precision'] = self.page.paginator.precision
+        if self.request.method not in SAFE_METHODS:
+            # Page links are GETs; a POSTed lookup pages by POSTing again.
+            del response.data['links']
+        return response
+
+
+class SingleFlightPagination(CountPrecisionPagination):
+    """Share each distinct page between concurrent identical requests.
+
+    The page's primary keys and count are computed once per normalized
+    query (its SQL, page, size and precision) under a single-flight lease;
+    every request then loads those rows by key, so row data is current
+    even while the page membership is served stale."""
+
+    def get_digest(self, queryset, number, page_size):
+        sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+        return get_digest(queryset.db, sql, params, number, page_size, self.precision)
+
+    def compute(self, queryset, number, page_size):
+        # Only the keys are shared, so only the keys are read.
+        keys = queryset.prefetch_related(None).values_list('pk', flat=True)
+        paginator = self.django_paginator_class(keys, page_size)
+        if number in self.last_page_strings:
+            number = paginator.num_pages
+        try:
+            page = paginator.page(number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=number,
+                message=str(exc),
+            ))
+        return {
+            'pks': list(page),
+            'number': page.number,
+            'count': paginator.count,
+            'precision': paginator.precision,
+            'more': page.has_next(),
+        }
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.precision = self.get_precision(request)
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        number = request.query_params.get(self.page_query_param, 1)
+        try:
+            digest = self.get_digest(queryset, number, page_size)
+        except EmptyResultSet:
+            # .none(), or a filter that can match nothing: an empty page
+            # that takes no query, so there is nothing to share.
+            result = self.compute(queryset, number, page_size)
+        else:
+            result = single_flight(
+                queryset.model._meta.model_name,
+                digest,
+                lambda: self.compute(queryset, number, page_size),
+            )
+        paginator = self.django_paginator_class(queryset, page_size)
+        # The shared figures stand in for counting again.
+        paginator.__dict__['count'] = result['count']
+        paginator.precision = result['precision']
+        rows = queryset.filter(pk__in=result['pks']).in_bulk()
+        objects = [rows[pk] for pk in result['pks'] if pk in rows]
+        if result['precision'] == ESTIMATE:
+            self.page = EstimatedPage(objects, result['number'], paginator)
+            self.page.more = result['more']
+        else:
+            self.page = Page(objects, result['number'], paginator)
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.request = request
+        return list(self.page)
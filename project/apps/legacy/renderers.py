@@ -0,0 +1,76 @@
+# Standard Library
+import json
+
+# Third-Party
+import msgpack
+from rest_framework import parsers
+from rest_framework import renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_json_api import parsers as jsonapi_parsers
+from rest_framework_json_api import renderers as jsonapi_renderers
+
+# The JSON encoder's fallbacks (datetimes, decimals, UUIDs, lazy strings)
+# serve MessagePack too, so both encodings agree on every value.
+encode_default = JSONEncoder().default
+
+
+class _MessagePackEncoding(renderers.JSONRenderer):
+    """The byte encoding step of the JSON renderer, done with MessagePack."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
+
+
+class MessagePackRenderer(jsonapi_renderers.JSONRenderer, _MessagePackEncoding):
+    """JSON:API documents encoded as MessagePack.
+
+    The JSON:API renderer builds the document and hands it to the next
+    class in the MRO to encode, which here is MessagePack, not JSON."""
+
+    media_type = 'application/vnd.api+msgpack'
+    format = 'vnd.api+msgpack'
+    charset = None
+
+
+class PlainMessagePackRenderer(MessagePackRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+
+
+class _MessagePackDecoding(parsers.JSONParser):
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.UnpackException) as e:
+            raise ParseError("MessagePack parse error - {0}".format(e))
+
+
+class MessagePackParser(jsonapi_parsers.JSONParser, _MessagePackDecoding):
+    """JSON:API request documents encoded as MessagePack."""
+
+    media_type = 'application/vnd.api+msgpack'
+    renderer_class = MessagePackRenderer
+
+
+class PlainMessagePackParser(MessagePackParser):
+    media_type = 'application/msgpack'
+    renderer_class = PlainMessagePackRenderer
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets views negotiate text/event-stream.
+
+    Streaming views return the stream themselves; this only renders the
+    errors raised before streaming starts, as a single ``error`` event."""
+
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return "event: error\ndata: {0}\n\n".format(json.dumps(data)).encode('utf-8')
@@ -0,0 +1,339 @@
+"""
+Synthetic Groups, Persons, owner links and StateLog history.
+
+Rows are generated in fixed size chunks, each from its own RNG seeded by
+the run seed, the run's first ``bhs_id``, the model and the chunk number.
+A seed therefore produces the same rows over the same existing data
+however many workers load them, while a rerun on top of earlier seeded
+rows starts past their ``bhs_id`` and draws fresh primary keys.
+
+Each chunk is written with ``COPY`` in one transaction by a worker
+process with its own connection.  Signals are bypassed, so summary
+statistics are rebuilt once loading finishes.
+"""
+
+# Standard Library
+import datetime
+import io
+import random
+import uuid
+
+# Third-Party
+from django_fsm_log.models import StateLog
+
+# Django
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.db import models
+from django.db import transaction
+from django.utils.timezone import utc
+
+# Local
+from .geo import read_airports
+from .models import Group
+from .models import Person
+
+# Fixed so timestamps do not depend on when the seed runs.
+BASE_TIME = datetime.datetime(2019, 1, 1, tzinfo=utc)
+HISTORY_DAYS = 3650
+
+FIRST_NAMES = {
+    Person.GENDER.male: [
+        'James', 'John', 'Robert', 'Michael', 'William', 'David', 'Richard',
+        'Joseph', 'Thomas', 'Charles', 'Daniel', 'Matthew', 'Anthony', 'Mark',
+        'Paul', 'Steven', 'Andrew', 'Kenneth', 'Joshua', 'Kevin', 'Brian',
+        'George', 'Edward', 'Ronald', 'Timothy', 'Jason', 'Jeffrey', 'Ryan',
+    ],
+    Person.GENDER.female: [
+        'Mary', 'Patricia', 'Jennifer', 'Linda', 'Elizabeth', 'Barbara',
+        'Susan', 'Jessica', 'Sarah', 'Karen', 'Nancy', 'Lisa', 'Betty',
+        'Margaret', 'Sandra', 'Ashley', 'Kimberly', 'Emily', 'Donna',
+        'Michelle', 'Carol', 'Amanda', 'Melissa', 'Deborah', 'Laura', 'Ruth',
+    ],
+}
+
+LAST_NAMES = [
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller',
+    'Davis', 'Rodriguez', 'Martinez', 'Hernandez', 'Lopez', 'Gonzalez',
+    'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin',
+    'Lee', 'Perez', 'Thompson', 'White', 'Harris', 'Sanchez', 'Clark',
+    'Ramirez', 'Lewis', 'Robinson', 'Walker', 'Young', 'Allen', 'King',
+    'Wright', 'Scott', 'Torres', 'Nguyen', 'Hill', 'Flores', 'Green',
+    'Adams', 'Nelson', 'Baker', 'Hall', 'Rivera', 'Campbell', 'Mitchell',
+    'Carter', 'Roberts', 'Gomez', 'Phillips', 'Evans', 'Turner', 'Diaz',
+    'Parker', 'Cruz', 'Edwards', 'Collins', 'Reyes', 'Stewart', 'Morris',
+]
+
+ADJECTIVES = [
+    'Golden', 'Silver', 'Harmonic', 'Vocal', 'Southern', 'Northern',
+    'Midnight', 'Crimson', 'Blue', 'Grand', 'Heritage', 'Pioneer', 'Royal',
+    'Sterling', 'Evergreen', 'Mountain', 'River', 'Prairie', 'Coastal',
+]
+
+NOUNS = {
+    Group.KIND.chorus: ['Chorus', 'Chorale', 'Singers', 'Voices', 'Harmonizers'],
+    Group.KIND.quartet: ['Four', 'Quartet', 'Chord', 'Tones', 'Edition'],
+    Group.KIND.vlq: ['Ensemble', 'Company', 'Octet', 'Crew'],
+}
+
+KIND_CODES = {
+    Group.KIND.chorus: 'C',
+    Group.KIND.quartet: 'Q',
+    Group.KIND.vlq: 'V',
+}
+
+# Transition name to target status; both models share them.
+TRANSITIONS = {
+    'activate': 'active',
+    'deactivate': 'inactive',
+}
+
+
+def get_uuid(rng):
+    # Drawn from the chunk RNG rather than uuid4 so seeds repeat exactly.
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def get_timestamp(rng, after=None):
+    start = after or BASE_TIME - datetime.timedelta(days=HISTORY_DAYS)
+    seconds = (BASE_TIME - start).total_seconds()
+    return start + datetime.timedelta(seconds=rng.random() * seconds)
+
+
+def to_copy(value):
+    """Render a value in ``COPY`` text format."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (list, tuple)):
+        value = '{' + ','.join(value) + '}'
+    elif isinstance(value, (datetime.date, datetime.datetime)):
+        value = value.isoformat()
+    else:
+        value = str(value)
+    return value.replace(
+        '\\', '\\\\',
+    ).replace(
+        '\t', '\\t',
+    ).replace(
+        '\n', '\\n',
+    ).replace(
+        '\r', '\\r',
+    )
+
+
+class Table(object):
+    """Column defaults for ``COPY`` into a model's table.
+
+    Generators supply only the columns they care about; the rest take the
+    field default, null, or an empty value."""
+
+    def __init__(self, model, exclude_auto=True):
+        self.table = model._meta.db_table
+        self.template = {}
+        for field in model._meta.concrete_fields:
+            if exclude_auto and isinstance(field, models.AutoField):
+                continue
+            if field.has_default() and not callable(field.default):
+                value = field.get_default()
+            elif field.null:
+                value = None
+            elif isinstance(field, (models.CharField, models.TextField, models.FileField)):
+                value = ''
+            else:
+                value = 0
+            self.template[field.column] = value
+        self.columns = list(self.template)
+        self.buffer = io.StringIO()
+        self.count = 0
+
+    def add(self, **values):
+        row = dict(self.template, **values)
+        self.buffer.write('\t'.join(to_copy(row[column]) for column in self.columns))
+        self.buffer.write('\n')
+        self.count += 1
+
+    def copy(self, cursor):
+        if not self.count:
+            return 0
+        self.buffer.seek(0)
+        cursor.copy_expert(
+            "COPY {0} ({1}) FROM STDIN".format(
+                connection.ops.quote_name(self.table),
+                ', '.join(connection.ops.quote_name(column) for column in self.columns),
+            ),
+            self.buffer,
+        )
+        return self.count
+
+
+class Through(Table):
+
+    def __init__(self, model):
+        through = model.owners.through
+        super().__init__(through)
+        self.owned = through._meta.get_field(model._meta.model_name).column
+        self.user = through._meta.get_field('user').column
+
+
+class Seeder(object):
+    """Generate and load one chunk of a model's rows."""
+
+    def __init__(self, model, seed, chunk, context):
+        self.model = model
+        self.rng = random.Random("{0}:{1}:{2}:{3}".format(
+            seed,
+            context['bhs_id'],
+            model._meta.model_name,
+            chunk,
+        ))
+        self.context = context
+        self.objects = Table(model, exclude_auto=False)
+        self.owners = Through(model)
+        self.statelogs = Table(StateLog)
+
+    def get_status(self, object_id, created):
+        """Write a transition history and return the resulting status."""
+        rng = self.rng
+        status = self.model.STATUS.new
+        timestamp = created
+        for i in range(rng.randint(0, self.context['statelogs'] * 2)):
+            name = 'deactivate' if status == self.model.STATUS.active else 'activate'
+            target = getattr(self.model.STATUS, TRANSITIONS[name])
+            timestamp = get_timestamp(rng, after=timestamp)
+            self.statelogs.add(**{
+                'timestamp': timestamp,
+                'by_id': rng.choice(self.context['users']) if self.context['users'] else None,
+                'source_state': str(status),
+                'state': str(target),
+                'transition': name,
+                'content_type_id': self.context['content_type'],
+                'object_id': str(object_id),
+                'description': None,
+            })
+            status = target
+        return status, timestamp
+
+    def add_owners(self, object_id):
+        users = self.context['users']
+        if not users:
+            return
+        for user in self.rng.sample(users, min(len(users), self.rng.choice([0, 1, 1, 1, 2]))):
+            self.owners.add(**{
+                self.owners.owned: object_id,
+                self.owners.user: user,
+            })
+
+    def get_location(self):
+        airport = self.rng.choice(self.context['airports'])
+        location = airport['city']
+        if airport['region']:
+            location = "{0}, {1}".format(location, airport['region'].split('-')[-1])
+        return airport, location
+
+    def run(self, start, count):
+        for number in range(start, start + count):
+            self.generate(number)
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                return (
+                    self.objects.copy(cursor),
+                    self.owners.copy(cursor),
+                    self.statelogs.copy(cursor),
+                )
+
+
+class GroupSeeder(Seeder):
+
+    def generate(self, number):
+        rng = self.rng
+        object_id = get_uuid(rng)
+        created = get_timestamp(rng)
+        status, modified = self.get_status(object_id, created)
+        kind = rng.choices(
+            [Group.KIND.chorus, Group.KIND.quartet, Group.KIND.vlq],
+            weights=[30, 65, 5],
+        )[0]
+        airport, location = self.get_location()
+        name = "The {0} {1}".format(rng.choice(ADJECTIVES), rng.choice(NOUNS[kind]))
+        self.objects.add(
+            id=object_id,
+            created=created,
+            modified=modified,
+            name="{0} {1}".format(name, number),
+            status=status,
+            kind=kind,
+            gender=rng.choice([code for code, label in Group.GENDER]),
+            bhs_id=self.context['bhs_id'] + number,
+            code="{0}{1:05d}".format(KIND_CODES[kind], number),
+            email="group{0}@example.com".format(number),
+            location=location,
+            latitude=airport['latitude'],
+            longitude=airport['longitude'],
+        )
+        self.add_owners(object_id)
+
+
+class PersonSeeder(Seeder):
+
+    def generate(self, number):
+        rng = self.rng
+        object_id = get_uuid(rng)
+        created = get_timestamp(rng)
+        status, modified = self.get_status(object_id, created)
+        gender = rng.choice([Person.GENDER.male, Person.GENDER.female])
+        first_name = rng.choice(FIRST_NAMES[gender])
+        last_name = rng.choice(LAST_NAMES)
+        airport, location = self.get_location()
+        airports = [airport['code']] + [
+            rng.choice(self.context['airports'])['code'] for i in range(rng.randint(0, 2))
+        ]
+        self.objects.add(
+            id=object_id,
+            created=created,
+            modified=modified,
+            status=status,
+            first_name=first_name,
+            last_name=last_name,
+            birth_date=datetime.date(1940, 1, 1) + datetime.timedelta(days=rng.randint(0, 25000)),
+            part=rng.choice([code for code, label in Person.PART]),
+            gender=gender,
+            email="{0}.{1}.{2}@example.com".format(first_name, last_name, number).lower(),
+            location=location,
+            latitude=airport['latitude'],
+            longitude=airport['longitude'],
+            airports=airports,
+            bhs_id=self.context['bhs_id'] + number,
+        )
+        self.add_owners(object_id)
+
+
+SEEDERS = {
+    'group': GroupSeeder,
+    'person': PersonSeeder,
+}
+
+
+def get_context(model, users, statelogs):
+    """Values every chunk of ``model`` needs, computed once up front."""
+    last = model.objects.aggregate(last=models.Max('bhs_id'))['last'] or 0
+    return {
+        'users': [str(pk) for pk in users],
+        'statelogs': statelogs,
+        'content_type': ContentType.objects.get_for_model(model).pk,
+        'airports': list(read_airports()),
+        'bhs_id': last + 1,
+    }
+
+
+def seed_chunk(task):
+    """Pool entry point; returns ``(model name, objects, owners, statelogs)``."""
+    model_name, seed, chunk, start, count, context = task
+    seeder = SEEDERS[model_name](
+        Group if model_name == 'group' else Person,
+        seed,
+        chunk,
+        context,
+    )
+    return (model_name,) + seeder.run(start, count)
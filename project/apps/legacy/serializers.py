@@ -1,19 +1,43 @@
 # Third-Party
+from django_fsm_log.models import StateLog
 from dry_rest_permissions.generics import DRYPermissionsField
 from rest_framework.validators import UniqueTogetherValidator
 from rest_framework_json_api import serializers
 from rest_framework_json_api.relations import ResourceRelatedField
+
+# Django
 from django.contrib.auth import get_user_model
 
 # Local
+from .metrics import SerializerTimingMixin
 from .models import Group
 from .models import Person
 
 User = get_user_model()
 
 
-class GroupSerializer(serializers.ModelSerializer):
+class UserSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = User
+        resource_name = 'user'
+        fields = [
+            'id',
+            User.USERNAME_FIELD,
+        ]
+        read_only_fields = fields
+
+
+class GroupSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     permissions = DRYPermissionsField()
+    owners = ResourceRelatedField(
+        queryset=User.objects.all(),
+        many=True,
+        required=False,
+    )
+    included_serializers = {
+        'owners': UserSerializer,
+    }
 
     class Meta:
         model = Group
@@ -33,6 +57,8 @@ class GroupSerializer(serializers.ModelSerializer):
             'start_date',
             'end_date',
             'location',
+            'latitude',
+            'longitude',
             'facebook',
             'twitter',
             'youtube',
@@ -79,17 +105,18 @@ class GroupSerializer(serializers.ModelSerializer):
     #     return super().to_representation(instance)
 
 
-class PersonSerializer(serializers.ModelSerializer):
+class PersonSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     permissions = DRYPermissionsField()
-    # owners = ResourceRelatedField(
-    #     many=True,
-    #     read_only=True,
-    # )
-    # included_serializers = {
-    #     'owners': 'rest_framework_jwt.serializers.UserSerializer',
-    #     # 'members': 'apps.bhs.serializers.MemberSerializer',
-    #     # 'officers': 'apps.bhs.serializers.OfficerSerializer',
-    # }
+    owners = ResourceRelatedField(
+        queryset=User.objects.all(),
+        many=True,
+        required=False,
+    )
+    included_serializers = {
+        'owners': UserSerializer,
+        # 'members': 'apps.bhs.serializers.MemberSerializer',
+        # 'officers': 'apps.bhs.serializers.OfficerSerializer',
+    }
 
     class Meta:
         model = Person
@@ -105,6 +132,8 @@ class PersonSerializer(serializers.ModelSerializer):
             'birth_date',
             'spouse',
             'location',
+            'latitude',
+            'longitude',
             'part',
             'gender',
             'representing',
@@ -127,9 +156,8 @@ class PersonSerializer(serializers.ModelSerializer):
             'sort_name',
             'initials',
             'image_id',
-            'owners',
-            'current_through',
 
+            # 'current_through',
             # 'current_status',
             # 'current_district',
 
@@ -159,4 +187,19 @@ class PersonSerializer(serializers.ModelSerializer):
             # 'owners',
             # 'members',
             # 'officers',
-        ]
\ No newline at end of file
+        ]
+
+
+class StateLogSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = StateLog
+        fields = [
+            'id',
+            'timestamp',
+            'state',
+            'transition',
+            'description',
+            'by',
+        ]
+        read_only_fields = fields
@@ -0,0 +1,148 @@
+# Standard Library
+from functools import partial
+
+# Third-Party
+from django_fsm.signals import post_transition
+from rest_framework.authtoken.models import Token
+
+# Django
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+# Local
+from . import outbox
+from . import ownership
+from . import stats
+from . import streams
+from .authentication import get_credential_key
+from .authentication import get_user_key
+from .authentication import revoke
+from .models import Group
+from .models import Person
+from .objectcache import object_cache
+
+
+@receiver(m2m_changed, sender=Group.owners.through)
+@receiver(m2m_changed, sender=Person.owners.through)
+def owners_changed(sender, instance, action, reverse, model, pk_set, **kwargs):
+    owned = Group if sender is Group.owners.through else Person
+    if reverse:
+        user_ids = [instance.pk]
+        object_ids = pk_set
+    else:
+        user_ids = pk_set
+        object_ids = [instance.pk]
+    # Redis is not transactional; only touch it once the change has committed.
+    if action == 'post_add':
+        transaction.on_commit(partial(ownership.add, owned, list(user_ids), list(object_ids)))
+    elif action == 'post_remove':
+        transaction.on_commit(partial(ownership.remove, owned, list(user_ids), list(object_ids)))
+    elif action == 'pre_clear':
+        if reverse:
+            object_ids = list(model.objects.filter(
+                owners=instance,
+            ).values_list('id', flat=True))
+            transaction.on_commit(partial(ownership.forget, owned, list(user_ids)))
+        else:
+            user_ids = list(instance.owners.values_list('id', flat=True))
+            transaction.on_commit(partial(ownership.remove, owned, user_ids, list(object_ids)))
+    else:
+        return
+    for object_id in object_ids or []:
+        object_cache.invalidate_on_commit(owned(pk=object_id))
+        outbox.record(
+            owned(pk=object_id),
+            'owners',
+            change=action.split('_', 1)[1],
+            users=sorted(str(x) for x in user_ids or []),
+        )
+
+
+@receiver(pre_delete, sender=Group)
+@receiver(pre_delete, sender=Person)
+def owned_deleted(sender, instance, **kwargs):
+    transaction.on_commit(partial(
+        ownership.remove,
+        sender,
+        list(instance.owners.values_list('id', flat=True)),
+        [instance.pk],
+    ))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_save, sender=Person)
+def counted_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    stats.record_save(instance, created)
+
+
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Person)
+def counted_deleted(sender, instance, **kwargs):
+    stats.record_delete(instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_save, sender=Person)
+def outbox_saved(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        outbox.record(instance, 'created')
+    else:
+        outbox.record(instance, 'updated', fields=sorted(update_fields or []))
+
+
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Person)
+def outbox_deleted(sender, instance, **kwargs):
+    outbox.record(instance, 'deleted')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_save, sender=Person)
+def stream_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    streams.publish_on_commit(instance, 'created' if created else 'updated')
+
+
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Person)
+def stream_deleted(sender, instance, **kwargs):
+    streams.publish_on_commit(instance, 'deleted')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_save, sender=Person)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Person)
+@receiver(post_transition, sender=Group)
+@receiver(post_transition, sender=Person)
+def cached_changed(sender, instance, **kwargs):
+    object_cache.invalidate_on_commit(instance)
+
+
+@receiver(post_transition, sender=Group)
+@receiver(post_transition, sender=Person)
+def outbox_transitioned(sender, instance, name, source, target, **kwargs):
+    outbox.record(instance, 'transition', name=name, source=source, target=target)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, **kwargs):
+    cache.delete(get_user_key(instance.get_username()))
+    revoke(instance)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    cache.delete(get_credential_key('token', instance.key))
@@ -0,0 +1,102 @@
+"""
+Single-flight computation of expensive, shareable results.
+
+Results are cached with a fresh period followed by a stale period.  A
+short Redis lease (``cache.add``) picks one worker to compute a missing
+or stale result; while it does, identical callers wait a bounded time
+for a missing result, or are served the stale one at once.  A caller
+whose wait runs out gets a 503 with a Retry-After rather than compute
+too, so a slow result never stampedes the database.
+"""
+
+# Standard Library
+import hashlib
+import math
+import time
+import uuid
+
+# Django
+from django.conf import settings
+from django.core.cache import cache
+
+# Local
+from . import metrics
+from .exceptions import ResultPending
+
+RESULT_KEY = 'legacy:flight:{0}'
+LEASE_KEY = 'legacy:flight:lease:{0}'
+POLL_INTERVAL = 0.05
+
+
+def get_digest(*parts):
+    return hashlib.sha1(
+        ':'.join(str(part) for part in parts).encode('utf-8'),
+    ).hexdigest()
+
+
+def observe(name, result):
+    metrics.inc('legacy_single_flight_total', flight=name, result=result)
+
+
+class Lease(object):
+
+    def __init__(self, digest):
+        self.key = LEASE_KEY.format(digest)
+        self.token = uuid.uuid4().hex
+
+    def acquire(self):
+        return cache.add(self.key, self.token, settings.SINGLE_FLIGHT_LEASE)
+
+    def release(self):
+        # Not atomic, but a lease that outlived its TTL is never ours to drop.
+        if cache.get(self.key) == self.token:
+            cache.delete(self.key)
+
+
+def compute_and_store(key, compute, ttl, stale):
+    value = compute()
+    cache.set(key, (value, time.time() + ttl), ttl + stale)
+    return value
+
+
+def single_flight(name, digest, compute, ttl=None, stale=None, wait=None):
+    """Return the shared result for ``digest``, computing it at most once.
+
+    ``compute`` must return a picklable value.  It is called in this
+    process only when this caller holds the lease.  Raises ResultPending
+    when another caller holds it for longer than ``wait``."""
+    ttl = settings.SINGLE_FLIGHT_TTL if ttl is None else ttl
+    stale = settings.SINGLE_FLIGHT_STALE if stale is None else stale
+    wait = settings.SINGLE_FLIGHT_WAIT if wait is None else wait
+    key = RESULT_KEY.format(digest)
+    entry = cache.get(key)
+    if entry is not None and entry[1] > time.time():
+        observe(name, 'hit')
+        return entry[0]
+    lease = Lease(digest)
+    if lease.acquire():
+        try:
+            observe(name, 'computed')
+            return compute_and_store(key, compute, ttl, stale)
+        finally:
+            lease.release()
+    if entry is not None:
+        # Someone is already revalidating.
+        observe(name, 'stale')
+        return entry[0]
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            observe(name, 'waited')
+            return entry[0]
+        if lease.acquire():
+            # The holder failed or expired without storing a result.
+            try:
+                observe(name, 'computed')
+                return compute_and_store(key, compute, ttl, stale)
+            finally:
+                lease.release()
+    observe(name, 'timeout')
+    raise ResultPending(max(1, math.ceil(wait)))
@@ -0,0 +1,191 @@
+"""
+Summary counts of Groups and Persons per dimension value.
+
+The ``legacy_stat`` table is adjusted from the values each instance was
+loaded with once the writing transaction commits, so it tracks saves,
+transitions and deletes without writers queueing on the summary rows.
+Bulk writes that bypass signals, and deltas lost to a crash between the
+commit and the adjustment, are corrected by ``rebuild``.
+"""
+
+# Standard Library
+import logging
+from functools import partial
+
+# Django
+from django.apps import apps as django_apps
+from django.db import DatabaseError
+from django.db import connection
+from django.db import transaction
+from django.db.models import Count
+
+log = logging.getLogger(__name__)
+
+DIMENSIONS = {
+    'group': (
+        'kind',
+        'gender',
+        'status',
+    ),
+    'person': (
+        'part',
+        'gender',
+        'status',
+    ),
+}
+
+UPSERT_SQL = """
+    INSERT INTO legacy_stat (model, dimension, value, count)
+    VALUES {0}
+    ON CONFLICT (model, dimension, value)
+    DO UPDATE SET count = legacy_stat.count + EXCLUDED.count
+"""
+
+STAGE_SQL = """
+    CREATE TEMPORARY TABLE legacy_stat_stage (
+        model varchar(50),
+        dimension varchar(50),
+        value varchar(50),
+        count integer
+    ) ON COMMIT DROP
+"""
+
+# The summary rows are locked in the order writers upsert them, then
+# only the counts that differ are written.  No ON CONFLICT: the unique
+# constraint does not exist yet when the creating migration rebuilds.
+LOCK_SQL = """
+    SELECT 1 FROM legacy_stat ORDER BY model, dimension, value FOR UPDATE
+"""
+
+MATCH_SQL = """
+    stage.model = legacy_stat.model
+    AND stage.dimension = legacy_stat.dimension
+    AND stage.value = legacy_stat.value
+"""
+
+MERGE_SQL = [
+    LOCK_SQL,
+    """
+    UPDATE legacy_stat SET count = stage.count FROM legacy_stat_stage stage
+    WHERE {0} AND legacy_stat.count <> stage.count
+    """.format(MATCH_SQL),
+    """
+    INSERT INTO legacy_stat (model, dimension, value, count)
+    SELECT model, dimension, value, count FROM legacy_stat_stage stage
+    WHERE NOT EXISTS (SELECT 1 FROM legacy_stat WHERE {0})
+    """.format(MATCH_SQL),
+    """
+    DELETE FROM legacy_stat WHERE NOT EXISTS (
+        SELECT 1 FROM legacy_stat_stage stage WHERE {0}
+    )
+    """.format(MATCH_SQL),
+]
+
+
+def to_value(value):
+    return '' if value is None else str(value)
+
+
+def apply(deltas):
+    """Add ``{(model, dimension, value): delta}`` to the summary counts.
+
+    Deferred until the current transaction commits, and dropped with it
+    on rollback."""
+    rows = [(key, delta) for key, delta in deltas.items() if delta]
+    if rows:
+        transaction.on_commit(partial(upsert, rows))
+
+
+def upsert(rows):
+    params = []
+    for (model, dimension, value), delta in sorted(rows):
+        params.extend([model, dimension, value, delta])
+    # Sorted so concurrent writers lock summary rows in the same order.
+    sql = UPSERT_SQL.format(', '.join(['(%s, %s, %s, %s)'] * len(rows)))
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+    except DatabaseError:
+        # The write itself is committed, so failing the request would
+        # not undo it; the counts stay off until the next rebuild.
+        log.exception("Could not apply summary deltas %s", rows)
+
+
+def record_save(instance, created):
+    model = instance._meta.model_name
+    loaded = getattr(instance, '_loaded_values', None)
+    if not created and loaded is None:
+        # Not loaded from the database, so the old values are unknown.
+        return
+    deltas = {}
+    for dimension in DIMENSIONS[model]:
+        attname = instance._meta.get_field(dimension).attname
+        if attname in instance.get_deferred_fields():
+            continue
+        new = to_value(getattr(instance, attname))
+        if not created:
+            if attname not in loaded:
+                continue
+            old = to_value(loaded[attname])
+            if old == new:
+                continue
+            key = (model, dimension, old)
+            deltas[key] = deltas.get(key, 0) - 1
+        key = (model, dimension, new)
+        deltas[key] = deltas.get(key, 0) + 1
+    apply(deltas)
+
+
+def record_delete(instance):
+    model = instance._meta.model_name
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    deltas = {}
+    for dimension in DIMENSIONS[model]:
+        attname = instance._meta.get_field(dimension).attname
+        value = loaded.get(attname, getattr(instance, attname))
+        deltas[(model, dimension, to_value(value))] = -1
+    apply(deltas)
+
+
+def rebuild(apps=django_apps):
+    """Recount every dimension from the source tables.
+
+    The counts are staged and merged in at the end, so writers only wait
+    on the summary rows that changed, and only while they are merged."""
+    rows = []
+    for model_name, dimensions in DIMENSIONS.items():
+        model = apps.get_model('legacy', model_name)
+        for dimension in dimensions:
+            counts = model.objects.order_by().values(dimension).annotate(count=Count('pk'))
+            for row in counts:
+                rows.append((model_name, dimension, to_value(row[dimension]), row['count']))
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(STAGE_SQL)
+        cursor.executemany(
+            "INSERT INTO legacy_stat_stage (model, dimension, value, count) VALUES (%s, %s, %s, %s)",
+            rows,
+        )
+        for sql in MERGE_SQL:
+            cursor.execute(sql)
+    return len(rows)
+
+
+def get_summary():
+    """Return ``{model: {dimension: [{value, label, count}]}}``."""
+    Stat = django_apps.get_model('legacy', 'Stat')
+    summary = {
+        model: {dimension: [] for dimension in dimensions}
+        for model, dimensions in DIMENSIONS.items()
+    }
+    for stat in Stat.objects.filter(count__gt=0).order_by('model', 'dimension', 'value'):
+        dimensions = summary.get(stat.model, {})
+        if stat.dimension not in dimensions:
+            continue
+        field = django_apps.get_model('legacy', stat.model)._meta.get_field(stat.dimension)
+        value = int(stat.value) if stat.value else None
+        dimensions[stat.dimension].append({
+            'value': value,
+            'label': dict(field.flatchoices).get(value),
+            'count': stat.count,
+        })
+    return summary
@@ -0,0 +1,226 @@
+"""
+Live change notifications over a Redis Stream.
+
+Saves and deletes of Groups and Persons append a compact entry once
+their transaction commits.  Every web dyno reads the same stream, so
+fan-out needs no coordination, and stream ids double as SSE event ids:
+a reconnecting client resumes from its ``Last-Event-ID`` as long as the
+entry is still within the trimmed stream length.
+
+A stream holds its web thread for up to SSE_MAX_SECONDS, so each process
+serves at most SSE_MAX_STREAMS at once and each user at most
+SSE_MAX_STREAMS_PER_USER across dynos.
+"""
+
+# Standard Library
+import json
+import logging
+import re
+import threading
+import time
+import uuid
+from functools import partial
+
+# Third-Party
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+from rest_framework.exceptions import Throttled
+
+# Django
+from django.conf import settings
+from django.db import connections
+from django.db import transaction
+
+# Local
+from . import ownership
+from .exceptions import StreamsBusy
+
+log = logging.getLogger(__name__)
+
+STREAM_KEY = 'legacy:changes'
+STREAM_ID = re.compile(r'^\d+-\d+$')
+USER_STREAMS_KEY = 'legacy:changes:user:{0}'
+
+slots = threading.BoundedSemaphore(settings.SSE_MAX_STREAMS)
+
+
+def publish(fields):
+    try:
+        get_redis_connection('default').xadd(
+            STREAM_KEY,
+            fields,
+            maxlen=settings.SSE_STREAM_LENGTH,
+            approximate=True,
+        )
+    except RedisError:
+        log.exception("Could not publish change %s", fields)
+
+
+def publish_on_commit(instance, action):
+    fields = {
+        'type': instance._meta.model_name,
+        'id': str(instance.pk),
+        'action': action,
+        'status': str(instance.status),
+        'modified': instance.modified.isoformat() if instance.modified else '',
+    }
+    transaction.on_commit(partial(publish, fields))
+
+
+def get_start(redis, last_event_id):
+    """The id to read after: the client's last id, or the current tail.
+
+    An id that is not a stream id starts afresh rather than fail the read."""
+    if last_event_id and STREAM_ID.match(last_event_id):
+        return last_event_id
+    latest = redis.xrevrange(STREAM_KEY, count=1)
+    return latest[0][0].decode('utf-8') if latest else '0-0'
+
+
+def format_event(entry_id, fields):
+    data = {key.decode('utf-8'): value.decode('utf-8') for key, value in fields.items()}
+    data['status'] = int(data['status'])
+    return "id: {0}\nevent: {1}\ndata: {2}\n\n".format(
+        entry_id,
+        data['type'],
+        json.dumps(data, separators=(',', ':')),
+    )
+
+
+class Subscription(object):
+    """Which changes a client asked for, by type and optionally ownership."""
+
+    def __init__(self, types, user=None):
+        self.types = types
+        self.user = user
+        self.owned = {}
+        self.refreshed = None
+
+    def get_owned(self):
+        from .models import Group
+        from .models import Person
+        now = time.monotonic()
+        if self.refreshed is None or now - self.refreshed > settings.SSE_OWNED_REFRESH:
+            self.owned = {
+                model._meta.model_name: ownership.get_owned_ids(model, self.user)
+                for model in (Group, Person)
+            }
+            self.refreshed = now
+        return self.owned
+
+    def matches(self, fields):
+        kind = fields[b'type'].decode('utf-8')
+        if kind not in self.types:
+            return False
+        if self.user is None:
+            return True
+        return fields[b'id'].decode('utf-8') in self.get_owned().get(kind, ())
+
+
+def stream(subscription, last_event_id=None):
+    """Yield SSE frames until SSE_MAX_SECONDS pass; clients then reconnect."""
+    # A stream holds its thread for minutes, but needs no database.
+    connections.close_all()
+    redis = get_redis_connection('default')
+    deadline = time.monotonic() + settings.SSE_MAX_SECONDS
+    yield "retry: {0}\n\n".format(settings.SSE_RETRY_MILLISECONDS)
+    last = get_start(redis, last_event_id)
+    while time.monotonic() < deadline:
+        try:
+            result = redis.xread(
+                {STREAM_KEY: last},
+                count=settings.SSE_BATCH_SIZE,
+                block=settings.SSE_HEARTBEAT_SECONDS * 1000,
+            )
+        except RedisError:
+            log.exception("Change stream read failed")
+            return
+        if not result:
+            # Keeps proxies from closing an idle connection.
+            yield ": heartbeat\n\n"
+            continue
+        for key, entries in result:
+            for entry_id, fields in entries:
+                last = entry_id.decode('utf-8')
+                if subscription.matches(fields):
+                    yield format_event(last, fields)
+
+
+def claim_user_stream(user):
+    """Count a stream against ``user``; returns the claim to release."""
+    key = USER_STREAMS_KEY.format(user.pk)
+    claim = uuid.uuid4().hex
+    now = time.time()
+    try:
+        redis = get_redis_connection('default')
+        pipe = redis.pipeline()
+        # Streams end by then; older claims were never released.
+        pipe.zremrangebyscore(key, '-inf', now - settings.SSE_MAX_SECONDS - settings.SSE_HEARTBEAT_SECONDS)
+        pipe.zadd(key, {claim: now})
+        pipe.zcard(key)
+        pipe.expire(key, settings.SSE_MAX_SECONDS * 2)
+        count = pipe.execute()[2]
+        if count > settings.SSE_MAX_STREAMS_PER_USER:
+            redis.zrem(key, claim)
+            raise Throttled(
+                wait=settings.SSE_BUSY_RETRY_SECONDS,
+                detail='Too many change streams are open for this user.',
+            )
+    except RedisError:
+        log.exception("Could not count streams of user %s", user.pk)
+        return None
+    return claim
+
+
+def release_user_stream(user, claim):
+    if claim is None:
+        return
+    try:
+        get_redis_connection('default').zrem(USER_STREAMS_KEY.format(user.pk), claim)
+    except RedisError:
+        log.exception("Could not release stream of user %s", user.pk)
+
+
+class ClaimedStream(object):
+    """Iterate a stream's frames; closing it releases the stream's claims.
+
+    Django closes the response even when it was never iterated, which a
+    bare generator's ``finally`` would miss."""
+
+    def __init__(self, frames, release):
+        self.frames = frames
+        self.release = release
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.frames)
+
+    def close(self):
+        release, self.release = self.release, None
+        try:
+            self.frames.close()
+        finally:
+            if release is not None:
+                release()
+
+
+def open_stream(subscription, user, last_event_id=None):
+    """Claim a stream for ``user`` and return its frames.
+
+    Raises StreamsBusy when this process serves its maximum of streams, and
+    Throttled when the user has theirs open."""
+    if not slots.acquire(blocking=False):
+        raise StreamsBusy(settings.SSE_BUSY_RETRY_SECONDS)
+    try:
+        claim = claim_user_stream(user)
+    except BaseException:
+        slots.release()
+        raise
+
+    def release():
+        release_user_stream(user, claim)
+        slots.release()
+
+    return ClaimedStream(stream(subscription, last_event_id), release)
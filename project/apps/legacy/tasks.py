@@ -0,0 +1,375 @@
+# Standard Library
+import datetime
+import hashlib
+import json
+import logging
+import tempfile
+import time
+from functools import update_wrapper
+from itertools import takewhile
+
+# Third-Party
+import django_rq
+from django_fsm_log.models import StateLog
+from redis.exceptions import WatchError
+from reversion.models import Revision
+from reversion.models import Version
+from rq import Retry
+from rq.exceptions import NoSuchJobError
+from rq.job import Job
+from rq.job import JobStatus
+
+# Django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import get_storage_class
+from django.db import connection
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+# Local
+from . import metrics
+from .dbrouters import use_replica
+from .models import Group
+from .models import Person
+from .outbox import DeliveryError
+from .outbox import drain
+from .outbox import get_backoff
+from .outbox import get_next_due
+from .versioning import materialize
+
+log = logging.getLogger(__name__)
+
+UNIQUE_KEY = 'legacy:task:unique:{0}'
+BATCH_KEY = 'legacy:task:batch:{0}'
+SCHEDULED_KEY = 'legacy:task:scheduled:{0}'
+RESULT_KEY = 'legacy:task:result:{0}'
+
+
+def execute(name, args, kwargs, key):
+    """Entry point of every enqueued job; resolves and runs the task."""
+    return import_string(name).run(args, kwargs, key)
+
+
+class Task(object):
+    """A function with enqueue conventions layered over the RQ queues.
+
+    Calling the task runs it inline; ``delay`` enqueues it.  Duplicate
+    enqueues collapse into the pending job until it starts, batch tasks
+    receive every id deferred since the last run, failures retry with
+    exponential backoff, and results can be cached for ``result_ttl``."""
+
+    def __init__(self, func, queue='default', unique=True, retries=3,
+                 backoff=10, result_ttl=None, timeout=None, batch_size=None,
+                 replica=False, lock_ttl=3600):
+        self.func = func
+        self.name = "{0}.{1}".format(func.__module__, func.__name__)
+        self.queue = queue
+        self.unique = unique
+        self.retries = retries
+        self.backoff = backoff
+        self.result_ttl = result_ttl
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.replica = replica
+        self.lock_ttl = lock_ttl
+        update_wrapper(self, func)
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def get_key(self, args, kwargs):
+        payload = json.dumps([args, kwargs], sort_keys=True, default=str)
+        digest = hashlib.sha1(payload.encode('utf-8')).hexdigest()
+        return "{0}:{1}".format(self.name, digest)
+
+    def get_retry(self):
+        if not self.retries:
+            return None
+        return Retry(
+            max=self.retries,
+            interval=[self.backoff * 2 ** attempt for attempt in range(self.retries)],
+        )
+
+    def create_job(self, queue, key, args, kwargs, **options):
+        return queue.create_job(
+            execute,
+            args=(self.name, args, kwargs, key),
+            timeout=self.timeout,
+            description=self.name,
+            retry=self.get_retry(),
+            **options
+        )
+
+    def delay(self, *args, **kwargs):
+        queue = django_rq.get_queue(self.queue)
+        key = self.get_key(args, kwargs)
+        job = self.create_job(queue, key, args, kwargs)
+        if not self.unique:
+            return queue.enqueue_job(job)
+        lock = UNIQUE_KEY.format(key)
+        # The lock and the job it names are written together, so a lock
+        # whose job is gone is stale rather than an enqueue in flight.
+        with queue.connection.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(lock)
+                    existing = pipe.get(lock)
+                    if existing is not None:
+                        try:
+                            pending = Job.fetch(existing.decode('utf-8'), connection=queue.connection)
+                        except NoSuchJobError:
+                            log.warning("Replacing stale enqueue lock of %s", key)
+                        else:
+                            log.debug("Collapsed duplicate enqueue of %s", key)
+                            return pending
+                    pipe.multi()
+                    pipe.set(lock, job.id, ex=self.lock_ttl)
+                    queue.enqueue_job(job, pipeline=pipe)
+                    pipe.execute()
+                    return job
+                except WatchError:
+                    # The lock was taken or released meanwhile; look again.
+                    continue
+
+    def delay_at(self, when, *args, **kwargs):
+        """Enqueue a run for ``when``; needs workers run ``--with-scheduler``.
+
+        Until ``when`` further schedules of the same call are dropped."""
+        queue = django_rq.get_queue(self.queue)
+        key = self.get_key(args, kwargs)
+        seconds = max(int((when - timezone.now()).total_seconds()), 1)
+        if not queue.connection.set(SCHEDULED_KEY.format(key), when.isoformat(), nx=True, ex=seconds):
+            log.debug("Already scheduled %s", key)
+            return None
+        job = self.create_job(queue, key, args, kwargs, status=JobStatus.SCHEDULED)
+        return queue.schedule_job(job, when)
+
+    def defer(self, *ids):
+        """Queue ids for the next batch run of this task."""
+        if not ids:
+            return None
+        connection = django_rq.get_connection(self.queue)
+        connection.sadd(BATCH_KEY.format(self.name), *[str(x) for x in ids])
+        return self.delay()
+
+    def get_result(self, *args, **kwargs):
+        return cache.get(RESULT_KEY.format(self.get_key(args, kwargs)))
+
+    def get_or_delay(self, *args, **kwargs):
+        """Return the cached result, enqueueing a run when there is none."""
+        result = self.get_result(*args, **kwargs)
+        if result is None:
+            self.delay(*args, **kwargs)
+        return result
+
+    def run_batches(self, args, kwargs):
+        connection = django_rq.get_connection(self.queue)
+        key = BATCH_KEY.format(self.name)
+        results = []
+        while True:
+            ids = [x.decode('utf-8') for x in connection.spop(key, self.batch_size)]
+            if not ids:
+                return results
+            try:
+                results.append(self.func(ids, *args, **kwargs))
+            except Exception:
+                # Put the ids back so the retry picks them up.
+                connection.sadd(key, *ids)
+                raise
+
+    def run(self, args, kwargs, key):
+        if self.unique:
+            django_rq.get_connection(self.queue).delete(UNIQUE_KEY.format(key))
+        metrics.begin()
+        start = time.perf_counter()
+        outcome = 'failure'
+        try:
+            if self.replica:
+                with use_replica():
+                    result = self.call(args, kwargs)
+            else:
+                result = self.call(args, kwargs)
+            outcome = 'success'
+        finally:
+            metrics.observe(
+                'legacy_task_duration_seconds',
+                time.perf_counter() - start,
+                task=self.name,
+                outcome=outcome,
+            )
+            metrics.flush()
+        if self.result_ttl:
+            cache.set(RESULT_KEY.format(key), result, self.result_ttl)
+        return result
+
+    def call(self, args, kwargs):
+        if self.batch_size:
+            return self.run_batches(args, kwargs)
+        return self.func(*args, **kwargs)
+
+
+def task(queue='default', **options):
+    def decorator(func):
+        return Task(func, queue=queue, **options)
+    return decorator
+
+
+ARCHIVE_TABLE = 'legacy_statelog_archive'
+
+ARCHIVE_PARTITION_SQL = """
+    CREATE TABLE IF NOT EXISTS {partition} PARTITION OF {archive}
+    FOR VALUES FROM (%s) TO (%s)
+"""
+
+ARCHIVE_MOVE_SQL = """
+    WITH moved AS (
+        DELETE FROM {table} WHERE id IN (
+            SELECT id FROM {table}
+            WHERE "timestamp" < %s
+            ORDER BY "timestamp"
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING {columns}
+    )
+    INSERT INTO {archive} ({columns}) SELECT {columns} FROM moved
+"""
+
+
+def get_month_start(value):
+    return value.astimezone(datetime.timezone.utc).replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0,
+    )
+
+
+def get_next_month(value):
+    return (value + datetime.timedelta(days=32)).replace(day=1)
+
+
+@task(queue='low', retries=0)
+def archive_statelogs(days=None, batch_size=5000):
+    """Move state logs older than the retention window into monthly partitions."""
+    days = days or settings.STATELOG_RETENTION_DAYS
+    cutoff = timezone.now() - datetime.timedelta(days=days)
+    table = StateLog._meta.db_table
+    columns = ', '.join(
+        connection.ops.quote_name(field.column) for field in StateLog._meta.concrete_fields
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT min("timestamp") FROM {0} WHERE "timestamp" < %s'.format(table),
+            [cutoff],
+        )
+        oldest = cursor.fetchone()[0]
+        if oldest is None:
+            return 0
+        month = get_month_start(oldest)
+        while month < cutoff:
+            following = get_next_month(month)
+            cursor.execute(
+                ARCHIVE_PARTITION_SQL.format(
+                    partition="{0}_y{1:%Y}m{1:%m}".format(ARCHIVE_TABLE, month),
+                    archive=ARCHIVE_TABLE,
+                ),
+                [month, following],
+            )
+            month = following
+    moved = 0
+    while True:
+        # Short transactions keep row locks on the hot table brief.
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                ARCHIVE_MOVE_SQL.format(table=table, columns=columns, archive=ARCHIVE_TABLE),
+                [cutoff, batch_size],
+            )
+            count = cursor.rowcount
+        moved += count
+        log.info("Archived %s state logs", moved)
+        if count < batch_size:
+            return moved
+
+
+@task(queue='low', retries=0)
+def prune_versions(days=None, keep=None):
+    """Delete versions past the retention window, keeping the newest per object."""
+    days = days or settings.VERSION_RETENTION_DAYS
+    keep = keep or settings.VERSION_KEEP_MIN
+    cutoff = timezone.now() - datetime.timedelta(days=days)
+    pruned = 0
+    for model in [Group, Person]:
+        object_ids = Version.objects.get_for_model(model).filter(
+            revision__date_created__lt=cutoff,
+        ).values_list('object_id', flat=True).distinct().order_by()
+        for object_id in object_ids.iterator():
+            versions = list(Version.objects.get_for_object_reference(
+                model,
+                object_id,
+            ).select_related('revision').order_by('pk'))
+            stale = list(takewhile(
+                lambda version: version.revision.date_created < cutoff,
+                versions[:-keep],
+            ))
+            if not stale:
+                continue
+            with transaction.atomic():
+                # The oldest survivor may be a diff against a pruned version.
+                materialize(versions[len(stale)])
+                Version.objects.filter(pk__in=[version.pk for version in stale]).delete()
+            pruned += len(stale)
+    Revision.objects.filter(version__isnull=True).delete()
+    log.info("Pruned %s versions", pruned)
+    return pruned
+
+
+def schedule_next_drain(earliest):
+    due = get_next_due()
+    if due is not None:
+        drain_outbox.delay_at(max(due, earliest))
+
+
+@task(queue='default', retries=0)
+def drain_outbox(batch_size=None):
+    """Deliver pending outbox events to the configured sinks.
+
+    Not retried by RQ: the events carry their own backoff, and each drain
+    schedules the next for when the earliest backed-off event is due."""
+    try:
+        delivered = drain(batch_size)
+    except DeliveryError:
+        # Give a failing downstream at least the first backoff.
+        schedule_next_drain(timezone.now() + get_backoff(0))
+        raise
+    schedule_next_drain(timezone.now())
+    log.info("Delivered %s outbox events", delivered)
+    return delivered
+
+
+@task(queue='low', retries=0, replica=True, timeout=60 * 60 * 2)
+def export_snapshot(models=None, fmt='parquet', batch_size=None):
+    """Export Group and Person snapshots to EXPORT_STORAGE; returns the names."""
+    # pyarrow is only needed here; keep it out of every other task's import.
+    from .exports import FORMATS
+    from .exports import Exporter
+    storage = get_storage_class(settings.EXPORT_STORAGE)()
+    stamp = timezone.now().strftime('%Y%m%dT%H%M%SZ')
+    names = []
+    for model in [Group, Person]:
+        if models and model._meta.model_name not in models:
+            continue
+        with tempfile.TemporaryFile() as f:
+            rows = Exporter(model).write(
+                f,
+                fmt=fmt,
+                batch_size=batch_size or settings.EXPORT_BATCH_SIZE,
+            )
+            f.seek(0)
+            name = storage.save(
+                "exports/{0}-{1}.{2}".format(model._meta.model_name, stamp, FORMATS[fmt]),
+                File(f),
+            )
+        log.info("Exported %s %s rows to %s", rows, model._meta.model_name, name)
+        names.append(name)
+    return names
@@ -0,0 +1,21 @@
+# Third-Party
+import pytest
+from rest_framework.test import APIClient
+
+# Django
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+
+@pytest.fixture
+def client(db):
+    # Paging and object caches live in Redis; start every test cold.
+    cache.clear()
+    User = get_user_model()
+    staff = User._default_manager.create(**{
+        User.USERNAME_FIELD: 'staff@example.com',
+        'is_staff': True,
+    })
+    client = APIClient()
+    client.force_authenticate(staff)
+    return client
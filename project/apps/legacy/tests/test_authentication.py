@@ -0,0 +1,235 @@
+# Standard Library
+import base64
+import json
+import time
+import uuid
+
+# Third-Party
+import jwt
+import pytest
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+# Django
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+# First-Party
+from apps.legacy import authentication
+from apps.legacy.authentication import JWKS
+from apps.legacy.authentication import CachedBasicAuthentication
+from apps.legacy.authentication import CachedJSONWebTokenAuthentication
+from apps.legacy.authentication import CachedTokenAuthentication
+from apps.legacy.authentication import ClaimsCache
+from apps.legacy.authentication import get_credential_key
+
+KID = 'test-key'
+
+
+@pytest.fixture(scope='module')
+def private_key():
+    return rsa.generate_private_key(
+        public_exponent=65537,
+        key_size=2048,
+        backend=default_backend(),
+    )
+
+
+@pytest.fixture
+def signing(private_key, tmp_path, monkeypatch):
+    jwk = json.loads(RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update(kid=KID, use='sig')
+    path = tmp_path / 'jwks.json'
+    path.write_text(json.dumps({'keys': [jwk]}))
+    monkeypatch.setattr(authentication, 'jwks', JWKS("file://{0}".format(path), 3600))
+    monkeypatch.setattr(authentication, 'claims_cache', ClaimsCache(10))
+    return private_key
+
+
+@pytest.fixture
+def user(db):
+    User = get_user_model()
+    return User._default_manager.create(**{
+        User.USERNAME_FIELD: "{0}@example.com".format(uuid.uuid4().hex),
+    })
+
+
+def encode(key, settings, kid=KID, **claims):
+    payload = {
+        'iss': "https://{0}/".format(settings.JWT_AUTH['AUTH0_DOMAIN']),
+        'aud': settings.JWT_AUTH['JWT_AUDIENCE'],
+        'exp': int(time.time()) + 60,
+    }
+    payload.update(claims)
+    token = jwt.encode(payload, key, algorithm='RS256', headers={'kid': kid})
+    # PyJWT 1.x returns bytes.
+    return token.decode('utf-8') if isinstance(token, bytes) else token
+
+
+def authenticate(rf, token):
+    request = rf.get('/', HTTP_AUTHORIZATION="Bearer {0}".format(token))
+    return CachedJSONWebTokenAuthentication().authenticate(request)
+
+
+def test_valid_token_authenticates_subject(rf, settings, signing, user):
+    token = encode(signing, settings, sub=user.get_username())
+    assert authenticate(rf, token) == (user, token)
+
+
+def test_verified_claims_are_cached(rf, settings, signing, user, monkeypatch):
+    token = encode(signing, settings, sub=user.get_username())
+    authenticate(rf, token)
+    monkeypatch.setattr(jwt, 'decode', None)
+    assert authenticate(rf, token)[0] == user
+
+
+def test_expired_token_fails(rf, settings, signing, user):
+    token = encode(signing, settings, sub=user.get_username(), exp=int(time.time()) - 60)
+    with pytest.raises(AuthenticationFailed, match='expired'):
+        authenticate(rf, token)
+
+
+def test_wrong_audience_fails(rf, settings, signing, user):
+    token = encode(signing, settings, sub=user.get_username(), aud='someone-else')
+    with pytest.raises(AuthenticationFailed):
+        authenticate(rf, token)
+
+
+def test_unknown_key_fails(rf, settings, signing, user):
+    token = encode(signing, settings, kid='other', sub=user.get_username())
+    with pytest.raises(AuthenticationFailed, match='Unknown signing key'):
+        authenticate(rf, token)
+
+
+def test_missing_subject_fails(rf, settings, signing):
+    token = encode(signing, settings)
+    with pytest.raises(AuthenticationFailed, match='no subject'):
+        authenticate(rf, token)
+
+
+def test_unknown_subject_fails(rf, settings, signing, db):
+    token = encode(signing, settings, sub='nobody@example.com')
+    with pytest.raises(AuthenticationFailed):
+        authenticate(rf, token)
+
+
+@pytest.mark.parametrize('contents', [
+    None,
+    'not json',
+    '{"not": "keys"}',
+])
+def test_unavailable_keys_fail(rf, settings, signing, tmp_path, monkeypatch, contents):
+    path = tmp_path / 'broken.json'
+    if contents is not None:
+        path.write_text(contents)
+    monkeypatch.setattr(authentication, 'jwks', JWKS("file://{0}".format(path), 3600))
+    token = encode(signing, settings, sub='nobody@example.com')
+    with pytest.raises(AuthenticationFailed, match='Signing keys are unavailable'):
+        authenticate(rf, token)
+
+
+def count_fetches(monkeypatch, jwks):
+    fetches = []
+    fetch = jwks.fetch
+
+    def counted():
+        fetches.append(1)
+        return fetch()
+
+    monkeypatch.setattr(jwks, 'fetch', counted)
+    return fetches
+
+
+def test_failed_load_is_not_retried_every_request(rf, settings, signing, tmp_path, monkeypatch):
+    path = tmp_path / 'missing.json'
+    monkeypatch.setattr(authentication, 'jwks', JWKS("file://{0}".format(path), 3600))
+    fetches = count_fetches(monkeypatch, authentication.jwks)
+    token = encode(signing, settings, sub='nobody@example.com')
+    for _ in range(2):
+        with pytest.raises(AuthenticationFailed, match='Signing keys are unavailable'):
+            authenticate(rf, token)
+    assert len(fetches) == 1
+
+
+def test_failed_load_is_retried_after_min_refetch(rf, settings, signing, user, tmp_path, monkeypatch):
+    path = tmp_path / 'late.json'
+    monkeypatch.setattr(authentication, 'jwks', JWKS("file://{0}".format(path), 3600))
+    token = encode(signing, settings, sub=user.get_username())
+    with pytest.raises(AuthenticationFailed):
+        authenticate(rf, token)
+    path.write_text((tmp_path / 'jwks.json').read_text())
+    authentication.jwks.attempted -= JWKS.MIN_REFETCH
+    assert authenticate(rf, token) == (user, token)
+
+
+def test_unknown_keys_wait_for_min_refetch(rf, settings, signing, user, monkeypatch):
+    fetches = count_fetches(monkeypatch, authentication.jwks)
+    authenticate(rf, encode(signing, settings, sub=user.get_username()))
+    for _ in range(2):
+        token = encode(signing, settings, kid='other', sub=user.get_username())
+        with pytest.raises(AuthenticationFailed, match='Unknown signing key'):
+            authenticate(rf, token)
+    assert len(fetches) == 1
+
+
+@pytest.fixture
+def credentials(user):
+    # Verified credentials are cached in Redis; start every test cold.
+    cache.clear()
+    user.set_password('old')
+    user.save()
+    return user
+
+
+def basic(rf, username, password):
+    encoded = base64.b64encode("{0}:{1}".format(username, password).encode('utf-8'))
+    request = rf.get('/', HTTP_AUTHORIZATION="Basic {0}".format(encoded.decode('ascii')))
+    return CachedBasicAuthentication().authenticate(request)
+
+
+def token(rf, key):
+    request = rf.get('/', HTTP_AUTHORIZATION="Token {0}".format(key))
+    return CachedTokenAuthentication().authenticate(request)
+
+
+def test_password_change_revokes_cached_basic(rf, credentials):
+    username = credentials.get_username()
+    assert basic(rf, username, 'old') == (credentials, None)
+    assert cache.get(get_credential_key('basic', "{0}:old".format(username))) == credentials
+    credentials.set_password('new')
+    credentials.save()
+    with pytest.raises(AuthenticationFailed):
+        basic(rf, username, 'old')
+    assert basic(rf, username, 'new') == (credentials, None)
+
+
+def test_deactivation_revokes_cached_basic(rf, credentials):
+    username = credentials.get_username()
+    basic(rf, username, 'old')
+    credentials.is_active = False
+    credentials.save()
+    with pytest.raises(AuthenticationFailed):
+        basic(rf, username, 'old')
+
+
+def test_token_change_revokes_cached_token(rf, credentials):
+    old = Token.objects.create(user=credentials)
+    assert token(rf, old.key)[0] == credentials
+    assert cache.get(get_credential_key('token', old.key)) is not None
+    old.delete()
+    new = Token.objects.create(user=credentials)
+    with pytest.raises(AuthenticationFailed, match='Invalid token'):
+        token(rf, old.key)
+    assert token(rf, new.key)[0] == credentials
+
+
+def test_deactivation_revokes_cached_token(rf, credentials):
+    key = Token.objects.create(user=credentials).key
+    token(rf, key)
+    credentials.is_active = False
+    credentials.save()
+    with pytest.raises(AuthenticationFailed, match='inactive or deleted'):
+        token(rf, key)
@@ -0,0 +1,118 @@
+# Standard Library
+from unittest import mock
+
+# Third-Party
+import pytest
+
+# Django
+from django.db import DatabaseError
+from django.db import connections
+from django.db import transaction
+from django.http import HttpResponse
+
+# First-Party
+from apps.legacy import dbrouters
+from apps.legacy import middleware
+from apps.legacy.dbrouters import ReplicaRouter
+from apps.legacy.dbrouters import use_primary
+from apps.legacy.dbrouters import use_replica
+from apps.legacy.middleware import ReplicaMiddleware
+from apps.legacy.models import Group
+
+
+@pytest.fixture
+def replica(settings, monkeypatch):
+    monkeypatch.setattr(dbrouters, 'get_replicas', lambda: ['replica_0'])
+    monkeypatch.setattr(middleware, 'get_replicas', lambda: ['replica_0'])
+    settings.REPLICA_MAX_LAG = 5
+    settings.REPLICA_CHECK_INTERVAL = 10
+    lags = []
+    monkeypatch.setattr(dbrouters, 'get_lag', lambda alias: lags.append(alias) or 0)
+    monkeypatch.setattr(dbrouters, '_health', {})
+    return lags
+
+
+def test_reads_use_primary_by_default(replica):
+    assert ReplicaRouter().db_for_read(Group) == 'default'
+
+
+def test_use_replica_reads_from_healthy_replica(replica):
+    with use_replica():
+        assert ReplicaRouter().db_for_read(Group) == 'replica_0'
+    assert ReplicaRouter().db_for_read(Group) == 'default'
+
+
+def test_use_primary_overrides_use_replica(replica):
+    with use_replica():
+        with use_primary():
+            assert ReplicaRouter().db_for_read(Group) == 'default'
+        assert ReplicaRouter().db_for_read(Group) == 'replica_0'
+
+
+def test_writes_always_use_primary(replica):
+    with use_replica():
+        assert ReplicaRouter().db_for_write(Group) == 'default'
+
+
+def test_lagging_replica_is_skipped(replica, monkeypatch):
+    monkeypatch.setattr(dbrouters, 'get_lag', lambda alias: 60)
+    with use_replica():
+        assert ReplicaRouter().db_for_read(Group) == 'default'
+
+
+def test_unavailable_replica_is_skipped(replica, monkeypatch):
+    def fail(alias):
+        raise DatabaseError("connection refused")
+    replica_connection = mock.Mock()
+    monkeypatch.setattr(dbrouters, 'get_lag', fail)
+    monkeypatch.setattr(dbrouters, 'connections', {
+        'default': connections['default'],
+        'replica_0': replica_connection,
+    })
+    with use_replica():
+        assert ReplicaRouter().db_for_read(Group) == 'default'
+    replica_connection.close.assert_called_once_with()
+
+
+def test_replica_health_is_checked_once_per_interval(replica):
+    with use_replica():
+        ReplicaRouter().db_for_read(Group)
+        ReplicaRouter().db_for_read(Group)
+    assert replica == ['replica_0']
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reads_inside_transactions_use_primary(replica):
+    with use_replica(), transaction.atomic():
+        assert ReplicaRouter().db_for_read(Group) == 'default'
+
+
+def test_middleware_pins_client_to_primary_after_write(replica, rf):
+    routed = []
+
+    def get_response(request):
+        routed.append(getattr(dbrouters._state, 'replica', False))
+        return HttpResponse(status=201 if request.method == 'POST' else 200)
+
+    middleware = ReplicaMiddleware(get_response)
+    client = {'HTTP_AUTHORIZATION': 'Token test-pinning'}
+    middleware(rf.get('/legacy/group', REMOTE_ADDR='10.0.0.1'))
+    middleware(rf.get('/legacy/group', **client))
+    middleware(rf.post('/legacy/group', **client))
+    middleware(rf.get('/legacy/group', **client))
+    assert routed == [True, True, False, False]
+
+
+def test_middleware_routes_lookups_without_pinning(replica, rf):
+    routed = []
+
+    def get_response(request):
+        routed.append(getattr(dbrouters._state, 'replica', False))
+        return HttpResponse()
+
+    middleware = ReplicaMiddleware(get_response)
+    client = {'HTTP_AUTHORIZATION': 'Token test-lookup'}
+    middleware(rf.post('/legacy/group/lookup', **client))
+    middleware(rf.get('/legacy/group', **client))
+    middleware(rf.post('/legacy/group', **client))
+    assert routed == [True, True, False]
@@ -0,0 +1,72 @@
+# Standard Library
+import decimal
+import io
+
+# Third-Party
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+# Django
+from django.db import models
+
+# First-Party
+from apps.legacy.exports import Exporter
+from apps.legacy.exports import get_column
+from apps.legacy.models import Group
+from apps.legacy.models import Person
+
+
+@pytest.fixture
+def rows(db):
+    for i in range(3):
+        Group.objects.create(
+            name="Group {0}".format(i),
+            kind=Group.KIND.quartet,
+            gender=Group.GENDER.male,
+            bhs_id=i + 1,
+        )
+        Person.objects.create(first_name='Person', last_name=str(i), bhs_id=i + 1)
+
+
+def read(model, fmt):
+    sink = io.BytesIO()
+    count = Exporter(model).write(sink, fmt=fmt, batch_size=2)
+    sink.seek(0)
+    if fmt == 'arrow':
+        table = pa.ipc.open_file(sink).read_all()
+    else:
+        table = pq.read_table(sink)
+    assert count == table.num_rows
+    return table
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'arrow'])
+def test_export_groups(rows, fmt):
+    table = read(Group, fmt)
+    assert table.num_rows == 3
+    assert table.schema.metadata[b'model'] == b'legacy.Group'
+    assert table.schema.field('id').type == pa.string()
+    assert table.schema.field('bhs_id').type == pa.int64()
+    assert table.schema.field('modified').type == pa.timestamp('us', tz='UTC')
+    kind = table.column('kind')
+    assert pa.types.is_dictionary(kind.type)
+    assert kind.to_pylist() == [str(Group.KIND[Group.KIND.quartet])] * 3
+    assert sorted(table.column('name').to_pylist()) == ['Group 0', 'Group 1', 'Group 2']
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'arrow'])
+def test_export_persons(rows, fmt):
+    table = read(Person, fmt)
+    assert table.num_rows == 3
+    assert table.schema.names == Exporter(Person).schema.names
+    for name in ('status', 'part', 'gender'):
+        assert pa.types.is_dictionary(table.schema.field(name).type)
+    assert pa.types.is_list(table.schema.field('airports').type)
+
+
+def test_unlisted_field_types_export_as_text():
+    field = models.DecimalField(max_digits=5, decimal_places=2)
+    arrow_type, converter = get_column(field)
+    array = Exporter.to_array(None, [decimal.Decimal('1.50'), None], arrow_type, converter)
+    assert array.to_pylist() == ['1.50', None]
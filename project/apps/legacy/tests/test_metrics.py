@@ -0,0 +1,91 @@
+# Third-Party
+import pytest
+from django_redis import get_redis_connection
+from redis import Redis
+
+# First-Party
+from apps.legacy import metrics
+
+CACHE_HIT = 'legacy_cache_requests_total{cache="object",result="hit"}'
+
+
+@pytest.fixture(autouse=True)
+def keyspace(monkeypatch):
+    # Rendering reads the keyspace counters from INFO.
+    monkeypatch.setattr(Redis, 'info', lambda self, section=None: {
+        'keyspace_hits': 2,
+        'keyspace_misses': 1,
+    })
+
+
+@pytest.fixture
+def redis(client):
+    metrics.flush()
+    return get_redis_connection('default')
+
+
+def test_metrics_disabled_without_token(client, settings):
+    settings.METRICS_TOKEN = None
+    assert client.get('/metrics').status_code == 404
+
+
+def test_metrics_require_token(client, settings):
+    settings.METRICS_TOKEN = 'secret'
+    assert client.get('/metrics').status_code == 403
+    assert client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code == 403
+    response = client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+
+
+def test_middleware_records_requests(client, redis):
+    client.get('/legacy/group')
+    counters = {
+        field.decode('utf-8'): float(value)
+        for field, value in redis.hgetall(metrics.METRICS_KEY).items()
+    }
+    assert counters['legacy_requests_total{action="list",status="2xx",view="group"}'] == 1
+    assert any(field.startswith('legacy_request_duration_seconds_bucket{') for field in counters)
+
+
+def test_render_prometheus_text(redis):
+    metrics.begin()
+    metrics.inc('legacy_n_plus_one_total', view='group')
+    metrics.observe('legacy_task_duration_seconds', 0.02, task='drain')
+    metrics.flush()
+    lines = metrics.render().splitlines()
+    assert '# TYPE legacy_n_plus_one_total counter' in lines
+    assert 'legacy_n_plus_one_total{view="group"} 1.0' in lines
+    assert '# TYPE legacy_task_duration_seconds histogram' in lines
+    assert 'legacy_task_duration_seconds_bucket{le="0.01",task="drain"}' not in ' '.join(lines)
+    assert 'legacy_task_duration_seconds_bucket{le="0.025",task="drain"} 1.0' in lines
+    assert 'legacy_task_duration_seconds_bucket{le="+Inf",task="drain"} 1.0' in lines
+    assert 'legacy_task_duration_seconds_count{task="drain"} 1.0' in lines
+    assert 'legacy_redis_keyspace_hits_total 2.0' in lines
+
+
+def test_render_labels_gauges_by_worker(redis):
+    metrics.register_gauge('legacy_test_gauge', lambda: [({'pool': 'web'}, 3)])
+    try:
+        metrics.flush()
+    finally:
+        metrics._gauges.pop()
+    assert 'legacy_test_gauge{{pool="web",worker="{0}"}} 3.0'.format(
+        metrics.worker_id(),
+    ) in metrics.render().splitlines()
+
+
+def test_scoped_observations_wait_for_flush(redis, monkeypatch):
+    monkeypatch.setattr(metrics, 'UNSCOPED_FLUSH_INTERVAL', 0)
+    metrics.begin()
+    metrics.observe_cache('object', True)
+    assert redis.hget(metrics.METRICS_KEY, CACHE_HIT) is None
+    metrics.flush()
+    assert float(redis.hget(metrics.METRICS_KEY, CACHE_HIT)) == 1
+
+
+def test_unscoped_observations_are_flushed(redis, monkeypatch):
+    # As from a management command or an RQ job outside Task.run.
+    monkeypatch.setattr(metrics, 'UNSCOPED_FLUSH_INTERVAL', 0)
+    metrics.observe_cache('object', True)
+    assert float(redis.hget(metrics.METRICS_KEY, CACHE_HIT)) == 1
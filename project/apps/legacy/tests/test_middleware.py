@@ -0,0 +1,68 @@
+# Standard Library
+import zlib
+
+# Third-Party
+import brotli
+import pytest
+
+# Django
+from django.core.cache import cache
+from django.http import HttpResponse
+
+# First-Party
+from apps.legacy import middleware
+from apps.legacy.middleware import CompressionMiddleware
+from apps.legacy.middleware import compress
+from apps.legacy.middleware import compress_stream
+
+CHUNKS = [
+    b'event: change\ndata: {"id": 1}\n\n',
+    b'event: change\ndata: {"id": 2}\n\n',
+]
+
+
+def get_decompressor(encoding):
+    if encoding == 'br':
+        return brotli.Decompressor().process
+    return zlib.decompressobj(16 + zlib.MAX_WBITS).decompress
+
+
+@pytest.mark.parametrize('encoding', ['br', 'gzip'])
+def test_stream_chunks_decompress_as_they_arrive(encoding):
+    decompress = get_decompressor(encoding)
+    stream = compress_stream(iter(CHUNKS), encoding)
+    for chunk in CHUNKS:
+        assert decompress(next(stream)) == chunk
+    decompress(next(stream))
+    with pytest.raises(StopIteration):
+        next(stream)
+
+
+@pytest.mark.parametrize('encoding', ['br', 'gzip'])
+def test_compress_round_trips(encoding):
+    content = b''.join(CHUNKS) * 100
+    assert get_decompressor(encoding)(compress(content, encoding)) == content
+
+
+def test_large_bodies_are_compressed_once(rf, settings, monkeypatch):
+    # A list page: large, and without an ETag.
+    cache.clear()
+    settings.COMPRESSION_CACHE_MIN_SIZE = 4096
+    content = b''.join(CHUNKS) * 200
+    compressed = []
+
+    def counted(content, encoding):
+        compressed.append(encoding)
+        return compress(content, encoding)
+
+    monkeypatch.setattr(middleware, 'compress', counted)
+    compression = CompressionMiddleware(
+        lambda request: HttpResponse(content, content_type='application/vnd.api+json'),
+    )
+    responses = [
+        compression(rf.get('/legacy/group', HTTP_ACCEPT_ENCODING='br')) for _ in range(2)
+    ]
+    assert compressed == ['br']
+    assert responses[0].content == responses[1].content
+    assert get_decompressor('br')(responses[1].content) == content
+    assert responses[1]['Content-Encoding'] == 'br'
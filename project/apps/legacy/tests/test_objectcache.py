@@ -0,0 +1,65 @@
+# Standard Library
+import io
+
+# Third-Party
+import pytest
+
+# Django
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+# First-Party
+from apps.legacy.models import Airport
+from apps.legacy.models import Person
+from apps.legacy.objectcache import get_key
+from apps.legacy.objectcache import object_cache
+from apps.legacy.objectcache import strip
+
+
+@pytest.fixture
+def person(db):
+    User = get_user_model()
+    owner = User._default_manager.create(**{User.USERNAME_FIELD: 'before@example.com'})
+    person = Person.objects.create(first_name='Ada', last_name='Lovelace', bhs_id=1815)
+    person.owners.set([owner])
+    return person
+
+
+def test_cached_copies_drop_prefetched_relations(person):
+    instance = Person.objects.prefetch_related('owners').get(pk=person.pk)
+    assert 'owners' in instance._prefetched_objects_cache
+    assert not hasattr(strip(instance), '_prefetched_objects_cache')
+    assert 'owners' in instance._prefetched_objects_cache
+
+
+def test_keys_carry_schema_version(person):
+    prefix, model, version, pk = get_key(Person, person.pk).rsplit(':', 3)
+    assert (model, pk) == ('person', str(person.pk))
+    assert len(version) == 8
+
+
+def test_cached_retrieve_loads_owners_afresh(client, person, django_assert_num_queries):
+    url = "/legacy/person/{0}".format(person.pk)
+    assert client.get(url).json()['data']['attributes']['usernames'] == ['before@example.com']
+    owner = person.owners.get()
+    owner.username = 'after@example.com'
+    owner.save()
+    with django_assert_num_queries(1):
+        response = client.get(url)
+    assert response.json()['data']['attributes']['usernames'] == ['after@example.com']
+
+
+def test_geocoding_invalidates_cached_rows(client, person):
+    Airport.objects.update_or_create(code='BNA', defaults={
+        'name': 'Nashville International Airport',
+        'city': 'Nashville',
+        'region': 'US-TN',
+        'latitude': 36.12,
+        'longitude': -86.68,
+    })
+    Person.objects.filter(pk=person.pk).update(location='Nashville, TN', latitude=None)
+    cached = object_cache.get(Person, person.pk, lambda: Person.objects.get(pk=person.pk))
+    call_command('geocode_locations', stdout=io.StringIO())
+    instance = object_cache.get(Person, person.pk, lambda: Person.objects.get(pk=person.pk))
+    assert (instance.latitude, instance.longitude) == (36.12, -86.68)
+    assert instance.modified > cached.modified
@@ -0,0 +1,94 @@
+# Third-Party
+import pytest
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+# Django
+from django.utils import timezone
+
+# First-Party
+from apps.legacy import outbox
+from apps.legacy.models import OutboxEvent
+from apps.legacy.outbox import DeliveryError
+from apps.legacy.outbox import get_next_due
+from apps.legacy.outbox import retry_dead
+from apps.legacy.tasks import drain_outbox
+from apps.legacy.views import AtomicWritesMixin
+
+
+class WriteView(AtomicWritesMixin, APIView):
+    authentication_classes = []
+    permission_classes = []
+
+    def post(self, request):
+        OutboxEvent.objects.create(topic='group', action='updated', object_id='1')
+        if request.data.get('fail'):
+            raise ValidationError({'name': ["Invalid."]})
+        return Response(status=204)
+
+
+@pytest.mark.parametrize('fail, status, events', [
+    (False, 204, 1),
+    (True, 400, 0),
+])
+def test_error_responses_roll_back_writes(db, fail, status, events):
+    request = APIRequestFactory().post('/', {'fail': fail}, format='json')
+    response = WriteView.as_view()(request)
+    assert response.status_code == status
+    assert OutboxEvent.objects.count() == events
+
+
+class Sink(object):
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.delivered = []
+
+    def deliver(self, events):
+        if self.fail:
+            raise DeliveryError("Down")
+        self.delivered.extend(events)
+
+
+@pytest.fixture
+def scheduled(monkeypatch):
+    scheduled = []
+    monkeypatch.setattr(drain_outbox, 'delay_at', lambda when, *args, **kwargs: scheduled.append(when))
+    return scheduled
+
+
+def test_drain_delivers_and_deletes(db, monkeypatch, scheduled):
+    sink = Sink()
+    monkeypatch.setattr(outbox, '_sinks', [sink])
+    OutboxEvent.objects.create(topic='group', action='updated', object_id='1')
+    assert drain_outbox() == 1
+    assert [event['object_id'] for event in sink.delivered] == ['1']
+    assert not OutboxEvent.objects.exists()
+    assert scheduled == []
+
+
+def test_failed_drain_backs_off_and_schedules_retry(db, settings, monkeypatch, scheduled):
+    settings.OUTBOX_BACKOFF = 5
+    monkeypatch.setattr(outbox, '_sinks', [Sink(fail=True)])
+    event = OutboxEvent.objects.create(topic='group', action='updated', object_id='1')
+    start = timezone.now()
+    with pytest.raises(DeliveryError):
+        drain_outbox()
+    event.refresh_from_db()
+    assert event.attempts == 1
+    assert event.available >= start
+    assert scheduled == [event.available]
+
+
+def test_dead_events_stop_draining_until_revived(db, settings, monkeypatch, scheduled):
+    settings.OUTBOX_MAX_ATTEMPTS = 2
+    monkeypatch.setattr(outbox, '_sinks', [Sink(fail=True)])
+    OutboxEvent.objects.create(topic='group', action='updated', object_id='1', attempts=1)
+    with pytest.raises(DeliveryError):
+        drain_outbox()
+    assert get_next_due() is None
+    assert scheduled == []
+    assert retry_dead() == 1
+    assert get_next_due() is not None
@@ -0,0 +1,17 @@
+# Third-Party
+import pytest
+
+# First-Party
+from apps.legacy.models import Group
+from apps.legacy.pagination import get_cached_count
+from apps.legacy.pagination import get_estimated_count
+
+
+@pytest.mark.parametrize('get', [get_cached_count, get_estimated_count])
+@pytest.mark.parametrize('queryset', [
+    lambda: Group.objects.none(),
+    lambda: Group.objects.filter(pk__in=[]),
+])
+def test_empty_querysets_count_zero(db, django_assert_num_queries, get, queryset):
+    with django_assert_num_queries(0):
+        assert get(queryset()) == 0
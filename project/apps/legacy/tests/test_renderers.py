@@ -0,0 +1,60 @@
+# Third-Party
+import msgpack
+import pytest
+
+# First-Party
+from apps.legacy.models import Person
+
+MEDIA_TYPES = [
+    'application/vnd.api+msgpack',
+    'application/msgpack',
+]
+
+
+@pytest.fixture
+def person(db):
+    return Person.objects.create(first_name='Ada', last_name='Lovelace', bhs_id=1815)
+
+
+@pytest.mark.parametrize('media_type', MEDIA_TYPES)
+def test_msgpack_matches_json_document(client, person, media_type):
+    url = "/legacy/person/{0}".format(person.pk)
+    expected = client.get(url).json()
+    response = client.get(url, HTTP_ACCEPT=media_type)
+    assert response.status_code == 200
+    assert response['Content-Type'] == media_type
+    assert msgpack.unpackb(response.content, raw=False) == expected
+
+
+@pytest.mark.parametrize('media_type', MEDIA_TYPES)
+def test_msgpack_request_body_is_parsed(client, person, media_type):
+    body = msgpack.packb({
+        'data': {
+            'type': 'person',
+            'id': str(person.pk),
+            'attributes': {
+                'nick_name': 'Countess',
+            },
+        },
+    }, use_bin_type=True)
+    response = client.patch(
+        "/legacy/person/{0}".format(person.pk),
+        body,
+        content_type=media_type,
+        HTTP_ACCEPT=media_type,
+    )
+    assert response.status_code == 200
+    assert msgpack.unpackb(response.content, raw=False)['data']['attributes']['nick_name'] == 'Countess'
+    person.refresh_from_db()
+    assert person.nick_name == 'Countess'
+
+
+def test_invalid_msgpack_body_is_rejected(client, person):
+    response = client.patch(
+        "/legacy/person/{0}".format(person.pk),
+        b'\xc1',
+        content_type='application/vnd.api+msgpack',
+    )
+    assert response.status_code == 400
+    person.refresh_from_db()
+    assert person.nick_name == ''
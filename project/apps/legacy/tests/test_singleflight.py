@@ -0,0 +1,137 @@
+# Standard Library
+import time
+
+# Third-Party
+import pytest
+
+# First-Party
+from apps.legacy import singleflight
+from apps.legacy.exceptions import ResultPending
+from apps.legacy.singleflight import LEASE_KEY
+from apps.legacy.singleflight import RESULT_KEY
+from apps.legacy.singleflight import single_flight
+
+DIGEST = 'abc'
+RESULT = RESULT_KEY.format(DIGEST)
+LEASE = LEASE_KEY.format(DIGEST)
+
+
+class FakeCache(object):
+    """The few cache calls single-flight makes, over a dict."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, timeout=None):
+        self.data[key] = value
+
+    def add(self, key, value, timeout=None):
+        if key in self.data:
+            return False
+        self.data[key] = value
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = FakeCache()
+    monkeypatch.setattr(singleflight, 'cache', cache)
+    return cache
+
+
+class Compute(object):
+
+    def __init__(self, value='fresh'):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def run(compute, wait=0.2):
+    return single_flight('test', DIGEST, compute, ttl=5, stale=60, wait=wait)
+
+
+def test_miss_computes_stores_and_releases_the_lease(cache):
+    compute = Compute()
+    assert run(compute) == 'fresh'
+    assert compute.calls == 1
+    assert cache.data[RESULT][0] == 'fresh'
+    assert LEASE not in cache.data
+
+
+def test_lease_is_released_when_compute_fails(cache):
+    def compute():
+        raise RuntimeError()
+
+    with pytest.raises(RuntimeError):
+        run(compute)
+    assert LEASE not in cache.data
+
+
+def test_fresh_result_is_served_without_computing(cache):
+    cache.data[RESULT] = ('cached', time.time() + 5)
+    compute = Compute()
+    assert run(compute) == 'cached'
+    assert compute.calls == 0
+
+
+def test_stale_result_is_recomputed_by_the_lease_holder(cache):
+    cache.data[RESULT] = ('stale', time.time() - 1)
+    compute = Compute()
+    assert run(compute) == 'fresh'
+    assert compute.calls == 1
+
+
+def test_stale_result_is_served_while_another_caller_recomputes(cache):
+    cache.data[RESULT] = ('stale', time.time() - 1)
+    cache.data[LEASE] = 'other'
+    compute = Compute()
+    assert run(compute) == 'stale'
+    assert compute.calls == 0
+    assert cache.data[LEASE] == 'other'
+
+
+def test_waiters_get_the_holders_result(cache, monkeypatch):
+    cache.data[LEASE] = 'other'
+
+    def sleep(seconds):
+        # The holder stores its result while we poll.
+        cache.data[RESULT] = ('shared', time.time() + 5)
+
+    monkeypatch.setattr(singleflight.time, 'sleep', sleep)
+    compute = Compute()
+    assert run(compute) == 'shared'
+    assert compute.calls == 0
+
+
+def test_waiters_take_over_an_abandoned_lease(cache, monkeypatch):
+    cache.data[LEASE] = 'other'
+
+    def sleep(seconds):
+        # The holder's lease expires without a result.
+        cache.data.pop(LEASE, None)
+
+    monkeypatch.setattr(singleflight.time, 'sleep', sleep)
+    compute = Compute()
+    assert run(compute) == 'fresh'
+    assert compute.calls == 1
+    assert LEASE not in cache.data
+
+
+def test_waiters_give_up_without_computing(cache):
+    cache.data[LEASE] = 'other'
+    compute = Compute()
+    with pytest.raises(ResultPending) as excinfo:
+        run(compute, wait=0.1)
+    assert excinfo.value.wait == 1
+    assert excinfo.value.status_code == 503
+    assert compute.calls == 0
@@ -0,0 +1,65 @@
+# Third-Party
+import pytest
+
+# Django
+from django.db import transaction
+
+# First-Party
+from apps.legacy.models import Group
+from apps.legacy.models import Stat
+from apps.legacy.stats import rebuild
+
+# The deltas are applied on commit, which needs real transactions.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def get_count(dimension, value):
+    stat = Stat.objects.filter(model='group', dimension=dimension, value=str(value)).first()
+    return stat.count if stat else 0
+
+
+def create_group(bhs_id, kind=Group.KIND.quartet):
+    return Group.objects.create(
+        name="Group {0}".format(bhs_id),
+        kind=kind,
+        gender=Group.GENDER.male,
+        bhs_id=bhs_id,
+    )
+
+
+def test_counts_change_when_the_write_commits():
+    with transaction.atomic():
+        create_group(1)
+        assert get_count('kind', Group.KIND.quartet) == 0
+    assert get_count('kind', Group.KIND.quartet) == 1
+
+
+def test_rolled_back_writes_are_not_counted():
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            create_group(1)
+            raise RuntimeError()
+    assert get_count('kind', Group.KIND.quartet) == 0
+
+
+def test_changes_and_deletes_move_counts():
+    group = Group.objects.get(pk=create_group(1).pk)
+    group.kind = Group.KIND.chorus
+    group.save()
+    assert get_count('kind', Group.KIND.quartet) == 0
+    assert get_count('kind', Group.KIND.chorus) == 1
+    Group.objects.get(pk=group.pk).delete()
+    assert get_count('kind', Group.KIND.chorus) == 0
+
+
+def test_rebuild_corrects_drift():
+    create_group(1)
+    create_group(2)
+    # As after a bulk write, which sends no signals.
+    Group.objects.filter(bhs_id=2).update(kind=Group.KIND.chorus)
+    Stat.objects.create(model='group', dimension='kind', value='stale', count=3)
+    assert rebuild() == len(Stat.objects.all())
+    assert get_count('kind', Group.KIND.quartet) == 1
+    assert get_count('kind', Group.KIND.chorus) == 1
+    assert get_count('kind', 'stale') == 0
+    assert get_count('gender', Group.GENDER.male) == 2
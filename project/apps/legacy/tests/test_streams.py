@@ -0,0 +1,116 @@
+# Standard Library
+import json
+import threading
+
+# Third-Party
+import pytest
+from django_redis import get_redis_connection
+
+# Django
+from django.contrib.auth import get_user_model
+
+# First-Party
+from apps.legacy import streams
+from apps.legacy.models import Group
+from apps.legacy.streams import get_start
+from apps.legacy.streams import publish
+
+
+class Redis(object):
+
+    def xrevrange(self, key, count):
+        return [(b'1700000000000-3', {})]
+
+
+@pytest.mark.parametrize('last_event_id, start', [
+    (None, '1700000000000-3'),
+    ('', '1700000000000-3'),
+    ('1600000000000-0', '1600000000000-0'),
+    ('garbage', '1700000000000-3'),
+    ('1600000000000', '1700000000000-3'),
+    ('$', '1700000000000-3'),
+])
+def test_start_resumes_only_from_stream_ids(last_event_id, start):
+    assert get_start(Redis(), last_event_id) == start
+
+
+@pytest.fixture
+def changes(settings, monkeypatch):
+    settings.SSE_HEARTBEAT_SECONDS = 1
+    settings.SSE_MAX_SECONDS = 10
+    monkeypatch.setattr(streams, 'slots', threading.BoundedSemaphore(2))
+
+
+def publish_change(kind, pk):
+    publish({'type': kind, 'id': str(pk), 'action': 'updated', 'status': '0', 'modified': ''})
+
+
+def read_events(response):
+    """The events up to the first heartbeat, as (type, id) pairs."""
+    events = []
+    try:
+        for frame in response.streaming_content:
+            frame = frame.decode('utf-8') if isinstance(frame, bytes) else frame
+            if frame.startswith(': heartbeat'):
+                return events
+            if frame.startswith('id: '):
+                data = json.loads(frame.split('data: ', 1)[1])
+                events.append((data['type'], data['id']))
+    finally:
+        response.close()
+
+
+# The stream closes its database connection, which a test transaction
+# would not survive.
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('query, expected', [
+    ('', ['mine', 'theirs', 'person']),
+    ('type=group', ['mine', 'theirs']),
+    ('type=person', ['person']),
+    ('type=group&mine=1', ['mine']),
+])
+def test_changes_filter_by_type_and_ownership(client, changes, query, expected):
+    staff = get_user_model()._default_manager.get_by_natural_key('staff@example.com')
+    groups = {}
+    for name in ('mine', 'theirs'):
+        groups[name] = Group.objects.create(
+            name=name,
+            kind=Group.KIND.quartet,
+            gender=Group.GENDER.male,
+        )
+    groups['mine'].owners.set([staff])
+    # After what the saves themselves published.
+    start = get_start(get_redis_connection('default'), None)
+    publish_change('group', groups['mine'].pk)
+    publish_change('group', groups['theirs'].pk)
+    publish_change('person', 'person')
+    names = {str(group.pk): name for name, group in groups.items()}
+    names['person'] = 'person'
+    response = client.get("/legacy/changes?last_event_id={0}&{1}".format(start, query))
+    assert response.status_code == 200
+    assert [names[pk] for kind, pk in read_events(response)] == expected
+
+
+def test_streams_per_process_are_bounded(client, changes, monkeypatch):
+    monkeypatch.setattr(streams, 'slots', threading.BoundedSemaphore(1))
+    first = client.get('/legacy/changes')
+    busy = client.get('/legacy/changes', HTTP_ACCEPT='application/json')
+    assert busy.status_code == 503
+    assert busy['Retry-After'] == '30'
+    # Closed without ever being read.
+    first.close()
+    second = client.get('/legacy/changes')
+    assert second.status_code == 200
+    second.close()
+
+
+def test_streams_per_user_are_bounded(client, changes, settings):
+    settings.SSE_MAX_STREAMS_PER_USER = 1
+    first = client.get('/legacy/changes')
+    busy = client.get('/legacy/changes', HTTP_ACCEPT='application/json')
+    assert busy.status_code == 429
+    assert busy['Retry-After'] == '30'
+    first.close()
+    second = client.get('/legacy/changes')
+    assert second.status_code == 200
+    second.close()
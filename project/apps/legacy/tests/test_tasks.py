@@ -0,0 +1,108 @@
+# Standard Library
+import datetime
+
+# Third-Party
+import django_rq
+import pytest
+from rq.registry import ScheduledJobRegistry
+
+# Django
+from django.core.cache import cache
+from django.utils import timezone
+
+# First-Party
+from apps.legacy.tasks import UNIQUE_KEY
+from apps.legacy.tasks import task
+
+calls = []
+
+
+@task(timeout=30)
+def add(x, y):
+    calls.append((x, y))
+    return x + y
+
+
+@task(batch_size=2)
+def collect(ids):
+    calls.append(sorted(ids))
+    return len(ids)
+
+
+@task(result_ttl=60)
+def answer():
+    return 42
+
+
+@pytest.fixture
+def queue():
+    cache.clear()
+    del calls[:]
+    return django_rq.get_queue('default')
+
+
+def test_duplicate_enqueues_collapse(queue):
+    job = add.delay(1, 2)
+    assert add.delay(1, 2).id == job.id
+    assert add.delay(2, 1).id != job.id
+    assert len(queue.job_ids) == 2
+
+
+def test_started_job_releases_lock(queue):
+    job = add.delay(1, 2)
+    assert job.perform() == 3
+    assert add.delay(1, 2).id != job.id
+
+
+def test_stale_lock_is_replaced(queue):
+    key = add.get_key((1, 2), {})
+    queue.connection.set(UNIQUE_KEY.format(key), 'gone')
+    job = add.delay(1, 2)
+    assert job.id in queue.job_ids
+    assert queue.connection.get(UNIQUE_KEY.format(key)).decode('utf-8') == job.id
+
+
+def test_delay_and_delay_at_share_timeout_and_retries(queue):
+    job = add.delay(1, 2)
+    scheduled = add.delay_at(timezone.now() + datetime.timedelta(minutes=5), 1, 2)
+    for each in (job, scheduled):
+        assert each.timeout == 30
+        assert each.retries_left == 3
+        assert each.retry_intervals == [10, 20, 40]
+    assert scheduled.id in ScheduledJobRegistry(queue=queue).get_job_ids()
+
+
+def test_delay_at_drops_repeats_until_due(queue):
+    when = timezone.now() + datetime.timedelta(minutes=5)
+    assert add.delay_at(when, 1, 2) is not None
+    assert add.delay_at(when, 1, 2) is None
+
+
+def test_deferred_ids_run_in_one_batched_job(queue):
+    job = collect.defer(1, 2, 3)
+    assert collect.defer(4).id == job.id
+    assert job.perform() == [2, 2]
+    assert sorted(sum(calls, [])) == ['1', '2', '3', '4']
+
+
+def test_failed_batch_is_put_back(queue, monkeypatch):
+    job = collect.defer(1, 2)
+
+    def fail(ids):
+        raise RuntimeError(ids)
+
+    monkeypatch.setattr(collect, 'func', fail)
+    with pytest.raises(RuntimeError):
+        job.perform()
+    monkeypatch.undo()
+    assert collect.run_batches((), {}) == [2]
+    assert calls == [['1', '2']]
+
+
+def test_results_are_cached(queue):
+    assert answer.get_or_delay() is None
+    job = answer.delay()
+    assert job.perform() == 42
+    assert answer.get_result() == 42
+    assert answer.get_or_delay() == 42
+    assert queue.job_ids == [job.id]
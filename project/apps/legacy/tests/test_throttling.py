@@ -0,0 +1,103 @@
+# Third-Party
+import pytest
+from redis.exceptions import RedisError
+
+# Django
+from django.core.cache import cache
+
+# First-Party
+from apps.legacy import throttling
+from apps.legacy.throttling import EndpointRateThrottle
+from apps.legacy.throttling import RedisRateThrottle
+from apps.legacy.throttling import TokenRateThrottle
+from apps.legacy.views import ChangesView
+from apps.legacy.views import GroupViewSet
+
+# The last second of a window.
+START = 1000 * 60 + 59
+
+
+class FourPerMinute(RedisRateThrottle):
+    rate = '4/min'
+
+    def get_cache_key(self, request, view):
+        return 'legacy:throttle:test:client'
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    cache.clear()
+    now = [START]
+    monkeypatch.setattr(throttling.time, 'time', lambda: now[0])
+    return now
+
+
+def allow(rf, throttle=None):
+    throttle = throttle or FourPerMinute()
+    return throttle.allow_request(rf.get('/'), None), throttle
+
+
+def test_window_allows_up_to_rate(rf, clock):
+    assert all(allow(rf)[0] for _ in range(4))
+    allowed, throttle = allow(rf)
+    assert not allowed
+    assert throttle.wait() == 1
+
+
+def test_previous_window_is_weighted_by_overlap(rf, clock):
+    for _ in range(4):
+        allow(rf)
+    # Halfway into the next window, the previous four count as two.
+    clock[0] = START + 31
+    assert allow(rf)[0]
+    assert allow(rf)[0]
+    allowed, throttle = allow(rf)
+    assert not allowed
+    # Once 45 s are elapsed the previous window counts for one.
+    assert throttle.wait() == 15
+    clock[0] += 15
+    assert allow(rf)[0]
+
+
+def test_redis_errors_allow_requests(rf, clock, monkeypatch):
+    def fail(cls):
+        raise RedisError()
+
+    monkeypatch.setattr(RedisRateThrottle, 'get_script', classmethod(fail))
+    assert all(allow(rf)[0] for _ in range(5))
+
+
+def test_token_scheme_is_case_insensitive(rf):
+    throttle = TokenRateThrottle()
+    keys = {
+        throttle.get_cache_key(rf.get('/', HTTP_AUTHORIZATION=header), None)
+        for header in ('Bearer abc', 'bearer abc', 'BEARER  abc')
+    }
+    assert len(keys) == 1
+    assert throttle.get_cache_key(rf.get('/', HTTP_AUTHORIZATION='Bearer abd'), None) not in keys
+
+
+@pytest.mark.parametrize('view, action, scope', [
+    (GroupViewSet, 'list', 'endpoint'),
+    (GroupViewSet, 'lookup', 'bulk'),
+    (ChangesView, None, 'stream'),
+])
+def test_endpoint_scopes(rf, clock, django_user_model, view, action, scope):
+    view = view()
+    view.action = action
+    request = rf.get('/')
+    request.user = django_user_model(pk=1)
+    throttle = EndpointRateThrottle()
+    assert throttle.allow_request(request, view)
+    assert throttle.scope == scope
+    assert throttle.rate == throttle.THROTTLE_RATES[scope]
+    assert "{0}.{1}:1".format(view.__class__.__name__, action or 'get') in throttle.key
+
+
+def test_headers_report_tightest_quota(client):
+    response = client.get('/legacy/group')
+    assert response.status_code == 200
+    # Of the user (1200/min) and endpoint (600/min) quotas.
+    assert response['X-RateLimit-Limit'] == '600'
+    assert response['X-RateLimit-Remaining'] == '599'
+    assert 0 < int(response['X-RateLimit-Reset']) <= 60
@@ -0,0 +1,192 @@
+# Standard Library
+import json
+
+# Third-Party
+import pytest
+
+# Django
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.test.utils import CaptureQueriesContext
+
+# First-Party
+from apps.legacy.exceptions import PreconditionFailed
+from apps.legacy.models import Group
+from apps.legacy.models import Person
+
+
+@pytest.fixture
+def owners(db):
+    User = get_user_model()
+    return [
+        User._default_manager.create(**{
+            User.USERNAME_FIELD: "owner{0}@example.com".format(i),
+        })
+        for i in range(3)
+    ]
+
+
+@pytest.fixture
+def groups(owners):
+    groups = []
+    for i in range(5):
+        group = Group.objects.create(
+            name="Group {0}".format(i),
+            kind=Group.KIND.quartet,
+            gender=Group.GENDER.male,
+            bhs_id=i + 1,
+        )
+        group.owners.set(owners[:i % 3 + 1])
+        groups.append(group)
+    return groups
+
+
+@pytest.fixture
+def persons(owners):
+    persons = []
+    for i in range(5):
+        person = Person.objects.create(first_name='Person', last_name=str(i), bhs_id=i + 1)
+        person.owners.set(owners[:i % 3 + 1])
+        persons.append(person)
+    return persons
+
+
+# On a cold cache: the size estimate and count, the page's keys, then the
+# rows by key and their owners.  None of these depend on the number of
+# rows or owners, nor on include=owners.
+LIST_QUERIES = 5
+# The row and its owners.
+RETRIEVE_QUERIES = 2
+
+
+@pytest.mark.parametrize('include', ['', '?include=owners'])
+def test_group_list_queries(client, groups, django_assert_num_queries, include):
+    with django_assert_num_queries(LIST_QUERIES):
+        response = client.get('/legacy/group' + include)
+    assert response.status_code == 200
+    if include:
+        assert len(response.json()['included']) == 3
+
+
+@pytest.mark.parametrize('include', ['', '?include=owners'])
+def test_group_retrieve_queries(client, groups, django_assert_num_queries, include):
+    with django_assert_num_queries(RETRIEVE_QUERIES):
+        response = client.get("/legacy/group/{0}{1}".format(groups[2].pk, include))
+    assert response.status_code == 200
+    assert len(response.json()['data']['relationships']['owners']['data']) == 3
+
+
+@pytest.mark.parametrize('include', ['', '?include=owners'])
+def test_person_list_queries(client, persons, django_assert_num_queries, include):
+    with django_assert_num_queries(LIST_QUERIES):
+        response = client.get('/legacy/person' + include)
+    assert response.status_code == 200
+    if include:
+        assert len(response.json()['included']) == 3
+
+
+@pytest.mark.parametrize('include', ['', '?include=owners'])
+def test_person_retrieve_queries(client, persons, django_assert_num_queries, include):
+    with django_assert_num_queries(RETRIEVE_QUERIES):
+        response = client.get("/legacy/person/{0}{1}".format(persons[2].pk, include))
+    assert response.status_code == 200
+    assert len(response.json()['data']['relationships']['owners']['data']) == 3
+
+
+@pytest.mark.parametrize('url', ['/legacy/group', '/legacy/person'])
+def test_unknown_airport_gives_empty_page(client, url, django_assert_num_queries):
+    # Only the airport lookup; the empty page itself takes no query.
+    with django_assert_num_queries(1):
+        response = client.get(url, {'filter[near]': 'ZZZ'})
+    assert response.status_code == 200
+    assert response.json()['data'] == []
+    assert response.json()['meta']['pagination']['count'] == 0
+
+
+def test_lookup_pages_by_post_without_links(client, groups):
+    body = {'filter': {'bhs_id.in': [1, 2, 3]}}
+    response = client.post('/legacy/group/lookup?page[size]=2', body, format='json')
+    assert response.status_code == 200
+    assert len(response.json()['data']) == 2
+    assert 'links' not in response.json()
+    assert response.json()['meta']['pagination']['pages'] == 2
+    response = client.post('/legacy/group/lookup?page[size]=2&page[number]=2', body, format='json')
+    assert len(response.json()['data']) == 1
+
+
+def patch_group(client, group, headers=None, **attributes):
+    body = {
+        'data': {
+            'type': 'group',
+            'id': str(group.pk),
+            'attributes': attributes,
+        },
+    }
+    return client.patch(
+        "/legacy/group/{0}".format(group.pk),
+        json.dumps(body),
+        content_type='application/vnd.api+json',
+        **(headers or {})
+    )
+
+
+@pytest.mark.parametrize('tag', ['{0}', 'W/{0}', '"other", {0}', '*'])
+def test_if_match_accepts_current_etag(client, groups, tag):
+    etag = client.get("/legacy/group/{0}".format(groups[0].pk))['ETag']
+    response = patch_group(client, groups[0], {'HTTP_IF_MATCH': tag.format(etag)}, name='Renamed')
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+    assert Group.objects.get(pk=groups[0].pk).name == 'Renamed'
+
+
+def test_if_match_rejects_stale_etag(client, groups):
+    etag = client.get("/legacy/group/{0}".format(groups[0].pk))['ETag']
+    assert patch_group(client, groups[0], name='First').status_code == 200
+    response = patch_group(client, groups[0], {'HTTP_IF_MATCH': etag}, name='Second')
+    assert response.status_code == 412
+    assert Group.objects.get(pk=groups[0].pk).name == 'First'
+
+
+def test_save_writes_only_changed_columns(groups):
+    group = Group.objects.get(pk=groups[0].pk)
+    group.name = 'Renamed'
+    with CaptureQueriesContext(connection) as queries:
+        group.save()
+    updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "legacy_group"')]
+    assert len(updates) == 1
+    assigned = updates[0].split(' SET ')[1].split(' WHERE ')[0]
+    assert sorted(column.split(' = ')[0] for column in assigned.split(', ')) == ['"modified"', '"name"']
+
+
+def test_update_requires_expected_modified(groups):
+    first = Group.objects.get(pk=groups[0].pk)
+    second = Group.objects.get(pk=groups[0].pk)
+    first._expected_modified = first.modified
+    second._expected_modified = second.modified
+    first.name = 'First'
+    first.save()
+    # The saved copy now expects its own write.
+    first.name = 'Again'
+    first.save()
+    second.name = 'Second'
+    with pytest.raises(PreconditionFailed), transaction.atomic():
+        second.save()
+    assert Group.objects.get(pk=groups[0].pk).name == 'Again'
+
+
+def test_unchanged_save_is_skipped(groups, django_assert_num_queries):
+    group = Group.objects.get(pk=groups[0].pk)
+    saved = []
+
+    def receiver(sender, instance, **kwargs):
+        saved.append(instance)
+
+    post_save.connect(receiver, sender=Group)
+    try:
+        with django_assert_num_queries(0):
+            group.save()
+    finally:
+        post_save.disconnect(receiver, sender=Group)
+    assert saved == []
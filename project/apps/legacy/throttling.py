@@ -0,0 +1,163 @@
+# Standard Library
+import hashlib
+import logging
+import time
+
+# Third-Party
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+from rest_framework.authentication import get_authorization_header
+from rest_framework.throttling import SimpleRateThrottle
+
+log = logging.getLogger(__name__)
+
+# Sliding window counter: the previous window's count is weighted by how
+# much of it still overlaps the sliding window.  Checked and incremented
+# atomically so concurrent requests can never overshoot the limit.
+SLIDING_WINDOW = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local elapsed = tonumber(ARGV[3])
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local count = tonumber(redis.call('GET', KEYS[1]) or '0')
+if previous * (window - elapsed) / window + count + 1 > limit then
+    return {0, previous, count}
+end
+count = redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], window * 2)
+return {1, previous, count}
+"""
+
+
+class RedisRateThrottle(SimpleRateThrottle):
+    """Sliding window throttle kept in Redis rather than per-key histories."""
+
+    cache_format = 'legacy:throttle:%(scope)s:%(ident)s'
+    script = None
+
+    @classmethod
+    def get_script(cls):
+        if RedisRateThrottle.script is None:
+            RedisRateThrottle.script = get_redis_connection('default').register_script(
+                SLIDING_WINDOW,
+            )
+        return RedisRateThrottle.script
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        window = self.duration
+        now = time.time()
+        current = int(now // window)
+        elapsed = now - current * window
+        try:
+            allowed, previous, count = self.get_script()(
+                keys=[
+                    "{0}:{1}".format(self.key, current),
+                    "{0}:{1}".format(self.key, current - 1),
+                ],
+                args=[self.num_requests, window, elapsed],
+            )
+        except RedisError:
+            log.exception("Throttle check failed; allowing request")
+            return True
+        weighted = previous * (window - elapsed) / window + count
+        remaining = max(0, int(self.num_requests - weighted))
+        self.record_quota(request, remaining, window - elapsed)
+        if allowed:
+            return True
+        if previous:
+            # When the weighted previous window has decayed enough to fit.
+            self.wait_time = max(
+                0,
+                (window - elapsed) - (self.num_requests - count - 1) * window / previous,
+            )
+        else:
+            self.wait_time = window - elapsed
+        return False
+
+    def record_quota(self, request, remaining, reset):
+        # Report the tightest quota across throttles on the Django request.
+        http_request = getattr(request, '_request', request)
+        quota = getattr(http_request, '_throttle_quota', None)
+        if quota is None or remaining < quota[1]:
+            http_request._throttle_quota = (self.num_requests, remaining, int(reset) + 1)
+
+    def wait(self):
+        return getattr(self, 'wait_time', None)
+
+
+class AnonRateThrottle(RedisRateThrottle):
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request),
+        }
+
+
+class UserRateThrottle(RedisRateThrottle):
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if not (request.user and request.user.is_authenticated):
+            return None
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': request.user.pk,
+        }
+
+
+class TokenRateThrottle(RedisRateThrottle):
+    scope = 'token'
+
+    def get_cache_key(self, request, view):
+        auth = get_authorization_header(request).split()
+        if not auth:
+            return None
+        # Schemes are case insensitive; one credential gets one bucket.
+        credentials = b' '.join([auth[0].lower()] + auth[1:])
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': hashlib.sha1(credentials).hexdigest(),
+        }
+
+
+class EndpointRateThrottle(RedisRateThrottle):
+    """Per client budget for each endpoint.
+
+    Views pick a scope with ``throttle_scope`` or per action with
+    ``throttle_scopes``, so bulk and export endpoints get their own rates."""
+
+    scope = 'endpoint'
+
+    def __init__(self):
+        # The rate depends on the view, so it is resolved per request.
+        pass
+
+    def allow_request(self, request, view):
+        action = getattr(view, 'action', None) or request.method.lower()
+        self.scope = getattr(view, 'throttle_scopes', {}).get(
+            action,
+            getattr(view, 'throttle_scope', None) or 'endpoint',
+        )
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        self.endpoint = "{0}.{1}".format(view.__class__.__name__, action)
+        return super().allow_request(request, view)
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': "{0}:{1}".format(self.endpoint, ident),
+        }
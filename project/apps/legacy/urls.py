@@ -2,9 +2,14 @@
 # Third-Party
 from rest_framework import routers
 
+# Django
+from django.urls import path
+
 # Local
+from .views import ChangesView
 from .views import GroupViewSet
 from .views import PersonViewSet
+from .views import StatsView
 
 router = routers.DefaultRouter(
     trailing_slash=False,
@@ -13,4 +18,7 @@ router = routers.DefaultRouter(
 router.register(r'group', GroupViewSet)
 router.register(r'person', PersonViewSet)
 
-urlpatterns = router.urls
+urlpatterns = router.urls + [
+    path('stats', StatsView.as_view()),
+    path('changes', ChangesView.as_view()),
+]
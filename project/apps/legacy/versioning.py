@@ -0,0 +1,137 @@
+"""
+Diff-based serialization format for django-reversion.
+
+Registered as the ``legacy_diff`` serialization module.  Each version
+stores only the fields that changed since the previous version of the
+same object, plus a full snapshot every ``VERSION_SNAPSHOT_EVERY``
+versions.  Deserializing walks back to the nearest snapshot, so
+reversion's revert, recover and history views work unchanged.
+"""
+
+# Standard Library
+import json
+
+# Django
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.base import DeserializationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.serializers.json import Serializer as JSONSerializer
+from django.core.serializers.python import Deserializer as PythonDeserializer
+
+FORMAT = 'legacy_diff'
+
+
+def dumps(payload):
+    return json.dumps(payload, cls=DjangoJSONEncoder)
+
+
+def parse(version):
+    """Return a version's payload, treating plain JSON versions as snapshots."""
+    data = json.loads(version.serialized_data)
+    if version.format != FORMAT:
+        return {'snapshot': data}
+    return data
+
+
+def expand(payload):
+    """Rebuild the full serialized objects for a payload.
+
+    Returns the objects and the number of diffs applied on top of the
+    nearest snapshot."""
+    from reversion.models import Version
+    chain = []
+    while 'snapshot' not in payload:
+        chain.append(payload)
+        base = Version.objects.filter(pk=payload['base']).first()
+        if base is None:
+            raise DeserializationError(
+                "Base version {0} is missing".format(payload['base'])
+            )
+        payload = parse(base)
+    objects = payload['snapshot']
+    for diff in reversed(chain):
+        objects[0]['fields'].update(diff['changes'])
+    return objects, len(chain)
+
+
+def compact(data):
+    from reversion.models import Version
+    objects = json.loads(data)
+    if len(objects) != 1:
+        return dumps({'snapshot': objects})
+    current = objects[0]
+    model = apps.get_model(current['model'])
+    previous = Version.objects.get_for_object_reference(model, current['pk']).first()
+    if previous is None:
+        return dumps({'snapshot': objects})
+    try:
+        base, depth = expand(parse(previous))
+    except (DeserializationError, ValueError):
+        return dumps({'snapshot': objects})
+    if depth + 1 >= settings.VERSION_SNAPSHOT_EVERY:
+        return dumps({'snapshot': objects})
+    fields = base[0]['fields']
+    return dumps({
+        'base': previous.pk,
+        'changes': {
+            name: value for name, value in current['fields'].items()
+            if name not in fields or fields[name] != value
+        },
+    })
+
+
+def get_changes(versions):
+    """Yield ``(version, changes)`` for versions ordered oldest first.
+
+    Diff versions already carry their changes; snapshots are compared
+    against the running state, so no extra queries are made."""
+    state = None
+    for version in versions:
+        payload = parse(version)
+        if 'snapshot' in payload:
+            fields = payload['snapshot'][0]['fields']
+            if state is None:
+                changes = fields
+            else:
+                changes = {
+                    name: value for name, value in fields.items()
+                    if state.get(name) != value
+                }
+            state = dict(fields)
+        else:
+            changes = payload['changes']
+            if state is None:
+                state = dict(expand(payload)[0][0]['fields'])
+            else:
+                state.update(changes)
+        yield version, changes
+
+
+def materialize(version):
+    """Rewrite a diff version as a snapshot so its bases can be pruned."""
+    payload = parse(version)
+    if 'snapshot' in payload:
+        return
+    objects, depth = expand(payload)
+    version.format = FORMAT
+    version.serialized_data = dumps({'snapshot': objects})
+    version.save(update_fields=['format', 'serialized_data'])
+
+
+class Serializer(JSONSerializer):
+
+    def getvalue(self):
+        return compact(super().getvalue())
+
+
+def Deserializer(stream_or_string, **options):
+    if not isinstance(stream_or_string, (bytes, str)):
+        stream_or_string = stream_or_string.read()
+    if isinstance(stream_or_string, bytes):
+        stream_or_string = stream_or_string.decode()
+    try:
+        objects, depth = expand(json.loads(stream_or_string))
+    except (ValueError, KeyError) as e:
+        raise DeserializationError() from e
+    yield from PythonDeserializer(objects, **options)
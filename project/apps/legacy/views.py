@@ -1,6 +1,8 @@
 
 # Standard Library
+import hmac
 import logging
+from functools import partial
 
 # Third-Party
 from django_fsm import TransitionNotAllowed
@@ -8,30 +10,159 @@ from dry_rest_permissions.generics import DRYPermissions
 from rest_framework import status
 from rest_framework import viewsets
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework_json_api.django_filters import DjangoFilterBackend
 
 # Django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Prefetch
+from django.db.models import prefetch_related_objects
+from django.http import Http404
+from django.http import HttpResponse
+from django.http import HttpResponseForbidden
+from django.http import StreamingHttpResponse
 from django.utils.text import slugify
 
 # Local
+from .exceptions import PreconditionFailed
 from .filtersets import GroupFilterset
 from .filtersets import PersonFilterset
+from .metrics import render as render_metrics
 from .models import Group
 from .models import Person
+from .objectcache import object_cache
+from .pagination import HistoryPagination
+from .renderers import EventStreamRenderer
 from .serializers import GroupSerializer
 from .serializers import PersonSerializer
+from .serializers import StateLogSerializer
+from .stats import get_summary
+from .streams import Subscription
+from .streams import open_stream
 
 log = logging.getLogger(__name__)
 
 
-class GroupViewSet(viewsets.ModelViewSet):
+def get_owners_queryset():
+    # Owners are rendered as linkage and for ``include=owners``; loading
+    # them in one query per page keeps both from querying per row.
+    User = get_user_model()
+    return User.objects.only('id', User.USERNAME_FIELD)
+
+
+class AtomicWritesMixin(object):
+    """Run unsafe requests in one transaction.
+
+    Outbox events then commit or roll back with the change.  DRF itself
+    only rolls back under ATOMIC_REQUESTS, so an exception handled into an
+    error response marks the transaction for rollback here.  Actions in
+    ``replica_safe_actions`` only read, so they run outside a transaction,
+    where the replica middleware may route them to a replica."""
+
+    replica_safe_actions = ()
+
+    def dispatch(self, request, *args, **kwargs):
+        action = getattr(self, 'action_map', {}).get(request.method.lower())
+        if request.method in SAFE_METHODS or action in self.replica_safe_actions:
+            return super().dispatch(request, *args, **kwargs)
+        with transaction.atomic():
+            return super().dispatch(request, *args, **kwargs)
+
+    def handle_exception(self, exc):
+        response = super().handle_exception(exc)
+        if self.request.method not in SAFE_METHODS and response.status_code >= 400:
+            transaction.set_rollback(True)
+        return response
+
+
+class ConditionalMixin(object):
+    """ETags derived from ``modified`` and ``If-Match`` on writes.
+
+    The precondition is checked at read and enforced again by the UPDATE
+    itself, so no row lock is held between the two."""
+
+    etag_actions = (
+        'retrieve',
+        'update',
+        'partial_update',
+        'activate',
+        'deactivate',
+    )
+
+    @staticmethod
+    def get_etag(instance):
+        return '"{0}"'.format(int(instance.modified.timestamp() * 1000000))
+
+    def check_if_match(self, instance):
+        header = self.request.META.get('HTTP_IF_MATCH')
+        if header is None:
+            return
+        # Compression weakens ETags on the way out; compare opaque tags.
+        tags = [tag.strip() for tag in header.split(',')]
+        tags = [tag[2:] if tag.startswith('W/') else tag for tag in tags]
+        if '*' not in tags and self.get_etag(instance) not in tags:
+            raise PreconditionFailed()
+        instance._expected_modified = instance.modified
+
+    def get_object(self):
+        instance = super().get_object()
+        if self.request.method not in SAFE_METHODS:
+            self.check_if_match(instance)
+        self.etag_object = instance
+        return instance
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        instance = getattr(self, 'etag_object', None)
+        if instance is not None and self.action in self.etag_actions and response.status_code < 300:
+            response['ETag'] = self.get_etag(instance)
+        return response
+
+
+class CachedObjectMixin(object):
+    """Serve ``retrieve`` from the object cache.
+
+    Filtered lookups and every other action read the database, so writes
+    always start from the current row."""
+
+    def get_object(self):
+        query_params = self.request.query_params
+        if self.action != 'retrieve' or any(key.startswith('filter[') for key in query_params):
+            return super().get_object()
+        model = self.get_queryset().model
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        try:
+            pk = model._meta.pk.to_python(lookup)
+        except ValidationError:
+            raise Http404
+        queryset = self.get_queryset()
+        instance = object_cache.get(
+            model,
+            pk,
+            partial(get_object_or_404, queryset, pk=pk),
+        )
+        # Cached copies carry no relations; a fresh load already has them.
+        prefetch_related_objects([instance], *queryset._prefetch_related_lookups)
+        self.check_object_permissions(self.request, instance)
+        return instance
+
+
+class GroupViewSet(AtomicWritesMixin, ConditionalMixin, CachedObjectMixin, viewsets.ModelViewSet):
     queryset = Group.objects.select_related(
         # 'owner',
         # 'parent',
     ).prefetch_related(
-        # 'owners',
+        Prefetch('owners', queryset=get_owners_queryset()),
         # 'children',
         # 'awards',
         # 'appearances',
@@ -54,6 +185,12 @@ class GroupViewSet(viewsets.ModelViewSet):
         DRYPermissions,
     ]
     resource_name = "group"
+    throttle_scopes = {
+        'lookup': 'bulk',
+    }
+    replica_safe_actions = (
+        'lookup',
+    )
 
     @action(methods=['post'], detail=True)
     def activate(self, request, pk=None, **kwargs):
@@ -83,11 +220,45 @@ class GroupViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(object)
         return Response(serializer.data)
 
+    @action(methods=['get'], detail=True)
+    def history(self, request, pk=None, **kwargs):
+        object = self.get_object()
+        self.resource_name = 'statelog'
+        paginator = HistoryPagination()
+        page = paginator.paginate_queryset(
+            object.statelogs.all(),
+            request,
+            view=self,
+        )
+        serializer = StateLogSerializer(
+            page,
+            many=True,
+            context=self.get_serializer_context(),
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(methods=['post'], detail=False, parser_classes=[JSONParser])
+    def lookup(self, request, **kwargs):
+        """List by a POSTed filter; further pages re-POST with ``page[number]``."""
+        filterset = self.filterset_class.from_lookup(
+            request.data,
+            self.get_queryset(),
+            request,
+        )
+        queryset = filterset.qs
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
 
-class PersonViewSet(viewsets.ModelViewSet):
+class PersonViewSet(AtomicWritesMixin, ConditionalMixin, CachedObjectMixin, viewsets.ModelViewSet):
     queryset = Person.objects.select_related(
         # 'user',
     ).prefetch_related(
+        Prefetch('owners', queryset=get_owners_queryset()),
         # 'assignments',
         # 'members',
         # 'officers',
@@ -103,6 +274,12 @@ class PersonViewSet(viewsets.ModelViewSet):
         DRYPermissions,
     ]
     resource_name = "person"
+    throttle_scopes = {
+        'lookup': 'bulk',
+    }
+    replica_safe_actions = (
+        'lookup',
+    )
 
     @action(methods=['post'], detail=True)
     def activate(self, request, pk=None, **kwargs):
@@ -131,3 +308,106 @@ class PersonViewSet(viewsets.ModelViewSet):
         object.save()
         serializer = self.get_serializer(object)
         return Response(serializer.data)
+
+    @action(methods=['get'], detail=True)
+    def history(self, request, pk=None, **kwargs):
+        object = self.get_object()
+        self.resource_name = 'statelog'
+        paginator = HistoryPagination()
+        page = paginator.paginate_queryset(
+            object.statelogs.all(),
+            request,
+            view=self,
+        )
+        serializer = StateLogSerializer(
+            page,
+            many=True,
+            context=self.get_serializer_context(),
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(methods=['post'], detail=False, parser_classes=[JSONParser])
+    def lookup(self, request, **kwargs):
+        """List by a POSTed filter; further pages re-POST with ``page[number]``."""
+        filterset = self.filterset_class.from_lookup(
+            request.data,
+            self.get_queryset(),
+            request,
+        )
+        queryset = filterset.qs
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+
+class StatsView(APIView):
+    """Group and Person counts per kind, part, gender and status."""
+
+    permission_classes = [
+        IsAuthenticated,
+    ]
+    resource_name = False
+
+    def get(self, request, **kwargs):
+        return Response(get_summary())
+
+
+class ChangesView(APIView):
+    """Server-Sent Events stream of Group and Person changes.
+
+    ``type`` limits the stream to group and/or person, ``mine`` to objects
+    the user owns.  Reconnects resume after ``Last-Event-ID`` (also
+    accepted as ``last_event_id``, for the first connection).  When too
+    many streams are open the answer is 503, or 429 for the user's own,
+    with a Retry-After."""
+
+    permission_classes = [
+        IsAuthenticated,
+    ]
+    renderer_classes = [
+        EventStreamRenderer,
+        JSONRenderer,
+    ]
+    resource_name = False
+    throttle_scope = 'stream'
+    types = (
+        'group',
+        'person',
+    )
+
+    def get(self, request, **kwargs):
+        types = [
+            kind for kind in request.query_params.get('type', '').split(',') if kind
+        ] or list(self.types)
+        mine = request.query_params.get('mine', '').lower() in ('1', 'true')
+        subscription = Subscription(
+            [kind for kind in types if kind in self.types],
+            user=request.user if mine else None,
+        )
+        last_event_id = (
+            request.META.get('HTTP_LAST_EVENT_ID') or
+            request.query_params.get('last_event_id')
+        )
+        response = StreamingHttpResponse(
+            open_stream(subscription, request.user, last_event_id),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+def metrics_view(request):
+    # Disabled rather than public when no token is configured.
+    if not settings.METRICS_TOKEN:
+        raise Http404
+    expected = "Bearer {0}".format(settings.METRICS_TOKEN)
+    if not hmac.compare_digest(request.META.get('HTTP_AUTHORIZATION', ''), expected):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        render_metrics(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -65,6 +65,15 @@ JWT_AUTH = {
     'AUTH0_CONNECTION': get_env_variable("AUTH0_CONNECTION"),
     'JWT_AUDIENCE': get_env_variable("AUTH0_CLIENT_ID"),
 }
+JWKS_URL = os.environ.get(
+    "AUTH0_JWKS_URL",
+    "https://{0}/.well-known/jwks.json".format(JWT_AUTH['AUTH0_DOMAIN']),
+)
+JWKS_REFRESH_SECONDS = 60 * 60
+JWT_CLAIMS_CACHE_SIZE = 10000
+JWT_USER_CACHE_TTL = 60 * 5
+# Successful Basic and Token verifications, revoked on user save
+AUTH_CACHE_TTL = 60
 
 # File Management
 DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
@@ -76,6 +85,11 @@ MEDIA_URL = '/media/'
 
 # Middleware
 MIDDLEWARE = [
+    'apps.legacy.middleware.MetricsMiddleware',
+    'apps.legacy.middleware.CompressionMiddleware',
+    'apps.legacy.middleware.NPlusOneMiddleware',
+    'apps.legacy.middleware.ReplicaMiddleware',
+    'apps.legacy.middleware.RateLimitHeadersMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -110,6 +124,12 @@ TEMPLATES = [
 ]
 
 # Database
+# Connection budget: each gunicorn thread keeps its own connection for
+# conn_max_age, so a web dyno holds up to WEB_CONCURRENCY x WEB_THREADS
+# connections to each database, and every RQ worker one more.  Keep the
+# total across dynos under the plan's limit (20 on hobby-dev), or set
+# DATABASE_POOL_MAX_SIZE so a process's threads share a bounded pool.
+# Change streams give their connection back before they start waiting.
 DATABASES = {
     'default': dj_database_url.parse(
         get_env_variable("DATABASE_URL"),
@@ -117,6 +137,36 @@ DATABASES = {
     ),
 }
 
+# Read replicas, as a comma-separated list of database URLs
+DATABASE_REPLICA_URLS = os.environ.get("DATABASE_REPLICA_URLS", "")
+for index, url in enumerate(filter(None, DATABASE_REPLICA_URLS.split(','))):
+    DATABASES['replica_{0}'.format(index)] = dj_database_url.parse(
+        url.strip(),
+        conn_max_age=600,
+    )
+DATABASE_ROUTERS = [
+    'apps.legacy.dbrouters.ReplicaRouter',
+]
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", 10))
+REPLICA_MAX_LAG = float(os.environ.get("REPLICA_MAX_LAG", 5))
+REPLICA_CHECK_INTERVAL = 10
+
+# Connection pooling (a max size of 0 keeps persistent per-thread connections)
+DATABASE_POOL_MAX_SIZE = int(os.environ.get("DATABASE_POOL_MAX_SIZE", 0))
+if DATABASE_POOL_MAX_SIZE:
+    for database in DATABASES.values():
+        database.update({
+            'ENGINE': 'apps.legacy.backends.postgresql_pool',
+            'CONN_MAX_AGE': 0,
+            'POOL': {
+                'MIN_SIZE': int(os.environ.get("DATABASE_POOL_MIN_SIZE", 1)),
+                'MAX_SIZE': DATABASE_POOL_MAX_SIZE,
+                'TIMEOUT': 10,
+                'CHECK_AFTER': 30,
+                'MAX_IDLE': 300,
+            },
+        })
+
 # CORS Configuration
 CORS_ORIGIN_ALLOW_ALL = True
 
@@ -134,6 +184,42 @@ CACHES = {
     },
 }
 
+# Metrics (/metrics answers 404 without a token)
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+# N+1 Detection (sample rate 0 disables)
+NPLUSONE_SAMPLE_RATE = float(os.environ.get("NPLUSONE_SAMPLE_RATE", 0))
+NPLUSONE_THRESHOLD = int(os.environ.get("NPLUSONE_THRESHOLD", 10))
+
+# Geocoding and proximity search
+GEOCODE_CACHE_TTL = 60 * 60 * 24 * 7
+NEAR_DEFAULT_RADIUS = int(os.environ.get("NEAR_DEFAULT_RADIUS", 100))
+
+# API response compression
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 1024))
+COMPRESSION_BROTLI_QUALITY = 4
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_CACHE_TTL = 60 * 10
+COMPRESSION_CACHE_MIN_SIZE = int(os.environ.get("COMPRESSION_CACHE_MIN_SIZE", 256 * 1024))
+
+# List counts: exact below this planner estimate, estimated above it
+COUNT_EXACT_BELOW = int(os.environ.get("COUNT_EXACT_BELOW", 10000))
+COUNT_CACHE_TTL = int(os.environ.get("COUNT_CACHE_TTL", 60 * 5))
+
+# Single-flight list pages: fresh, then served stale while one worker recomputes
+SINGLE_FLIGHT_TTL = int(os.environ.get("SINGLE_FLIGHT_TTL", 5))
+SINGLE_FLIGHT_STALE = int(os.environ.get("SINGLE_FLIGHT_STALE", 60))
+SINGLE_FLIGHT_LEASE = int(os.environ.get("SINGLE_FLIGHT_LEASE", 30))
+SINGLE_FLIGHT_WAIT = float(os.environ.get("SINGLE_FLIGHT_WAIT", 5))
+
+# Group and Person detail cache: per-worker LRU in front of Redis
+OBJECT_CACHE_SIZE = int(os.environ.get("OBJECT_CACHE_SIZE", 5000))
+OBJECT_CACHE_TTL = int(os.environ.get("OBJECT_CACHE_TTL", 60 * 60))
+OBJECT_CACHE_LOCAL_TTL = 60
+
+# Most values a single POSTed lookup filter may carry
+LOOKUP_MAX_VALUES = int(os.environ.get("LOOKUP_MAX_VALUES", 1000))
+
 # Sessions
 SESSION_ENGINE = "django.contrib.sessions.backends.cache"
 SESSION_CACHE_ALIAS = "default"
@@ -155,6 +241,45 @@ RQ_QUEUES = {
 }
 RQ_SHOW_ADMIN_LINK = True
 
+# Outbox (change events delivered by the drain_outbox task)
+OUTBOX_SINKS = [
+    'apps.legacy.outbox.WebhookSink',
+]
+OUTBOX_WEBHOOK_URLS = [url for url in os.environ.get("OUTBOX_WEBHOOK_URLS", "").split(',') if url]
+OUTBOX_WEBHOOK_SECRET = os.environ.get("OUTBOX_WEBHOOK_SECRET")
+OUTBOX_WEBHOOK_TIMEOUT = 5
+OUTBOX_BATCH_SIZE = 500
+OUTBOX_BACKOFF = 5
+OUTBOX_BACKOFF_MAX = 60 * 60
+OUTBOX_MAX_ATTEMPTS = 20
+
+# Live change stream (Server-Sent Events)
+SSE_STREAM_LENGTH = 10000
+SSE_MAX_SECONDS = int(os.environ.get("SSE_MAX_SECONDS", 300))
+SSE_HEARTBEAT_SECONDS = 15
+SSE_RETRY_MILLISECONDS = 3000
+SSE_BATCH_SIZE = 100
+SSE_OWNED_REFRESH = 30
+# Each open stream holds a web thread; keep some free for other requests.
+SSE_MAX_STREAMS = int(os.environ.get("SSE_MAX_STREAMS", 2))
+SSE_MAX_STREAMS_PER_USER = int(os.environ.get("SSE_MAX_STREAMS_PER_USER", 3))
+SSE_BUSY_RETRY_SECONDS = 30
+
+# Analytics exports (Parquet / Arrow snapshots)
+EXPORT_STORAGE = os.environ.get("EXPORT_STORAGE", 'cloudinary_storage.storage.RawMediaCloudinaryStorage')
+EXPORT_BATCH_SIZE = 50000
+
+# State log retention, after which rows move to the archive partitions
+STATELOG_RETENTION_DAYS = int(os.environ.get("STATELOG_RETENTION_DAYS", 365))
+
+# Versioning (diff-based django-reversion storage)
+SERIALIZATION_MODULES = {
+    'legacy_diff': 'apps.legacy.versioning',
+}
+VERSION_SNAPSHOT_EVERY = 10
+VERSION_RETENTION_DAYS = int(os.environ.get("VERSION_RETENTION_DAYS", 365))
+VERSION_KEEP_MIN = 5
+
 # Algolia
 ALGOLIA = {
     'APPLICATION_ID': get_env_variable("ALGOLIASEARCH_APPLICATION_ID"),
@@ -169,38 +294,46 @@ DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 # Rest Framework (JSONAPI)
 REST_FRAMEWORK = {
     'PAGE_SIZE': 100,
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework_json_api.pagination.JsonApiPageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'apps.legacy.pagination.SingleFlightPagination',
     'EXCEPTION_HANDLER': 'rest_framework_json_api.exceptions.exception_handler',
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework_json_api.parsers.JSONParser',
+        'apps.legacy.renderers.MessagePackParser',
+        'apps.legacy.renderers.PlainMessagePackParser',
         'rest_framework.parsers.FormParser',
         'rest_framework.parsers.MultiPartParser',
         'rest_framework.parsers.JSONParser'
     ],
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework_json_api.renderers.JSONRenderer',
+        'apps.legacy.renderers.MessagePackRenderer',
+        'apps.legacy.renderers.PlainMessagePackRenderer',
         'rest_framework.renderers.JSONRenderer',
         'rest_framework.renderers.AdminRenderer',
     ],
     'DEFAULT_METADATA_CLASS': 'rest_framework_json_api.metadata.JSONAPIMetadata',
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.BasicAuthentication',
-        'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
-        'rest_framework_jwt.authentication.JSONWebTokenAuthentication',
+        'apps.legacy.authentication.DispatchingAuthentication',
     ],
     'TEST_REQUEST_RENDERER_CLASSES': (
         'rest_framework.renderers.JSONRenderer',
     ),
     'TEST_REQUEST_DEFAULT_FORMAT': 'vnd.api+json',
-    # 'DEFAULT_THROTTLE_CLASSES': (
-    #     'rest_framework.throttling.AnonRateThrottle',
-    #     'rest_framework.throttling.UserRateThrottle'
-    # ),
-    # 'DEFAULT_THROTTLE_RATES': {
-    #     'anon': '100/day',
-    #     'user': '1000/day'
-    # }
+    'DEFAULT_THROTTLE_CLASSES': [
+        'apps.legacy.throttling.AnonRateThrottle',
+        'apps.legacy.throttling.UserRateThrottle',
+        'apps.legacy.throttling.TokenRateThrottle',
+        'apps.legacy.throttling.EndpointRateThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': os.environ.get("THROTTLE_RATE_ANON", '300/min'),
+        'user': os.environ.get("THROTTLE_RATE_USER", '1200/min'),
+        'token': os.environ.get("THROTTLE_RATE_TOKEN", '1200/min'),
+        'endpoint': os.environ.get("THROTTLE_RATE_ENDPOINT", '600/min'),
+        'bulk': os.environ.get("THROTTLE_RATE_BULK", '60/min'),
+        'export': os.environ.get("THROTTLE_RATE_EXPORT", '10/hour'),
+        'stream': os.environ.get("THROTTLE_RATE_STREAM", '30/min'),
+    },
 }
 
 # JSONAPI
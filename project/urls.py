@@ -8,6 +8,9 @@ from django.urls import path
 from django.urls import re_path
 from django.views.static import serve
 
+# First-Party
+from apps.legacy.views import metrics_view
+
 urlpatterns = [
     path('', lambda r: HttpResponseRedirect('admin/')),
     path('admin/', admin.site.urls),
@@ -15,6 +18,7 @@ urlpatterns = [
     path('jwt/', include('rest_framework_jwt.urls')),
     path('log/', include('django_fsm_log.urls')),
     path('rq/', include('django_rq.urls')),
+    path('metrics', metrics_view),
     path('robots.txt', lambda r: HttpResponse("User-agent: *\nDisallow: /", content_type="text/plain")),
 ]
 